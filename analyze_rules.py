@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Report and optionally drop rules that can never be applied."""
+
+import montesniere
+
+if __name__ == '__main__':
+    montesniere.analyze.main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of montesniere on the test suite.
+
+Usage:
+    python3 benchmark.py [--rules RULES] [--repeat N] ascii
+    python3 benchmark.py [--rules RULES] [--repeat N] merge [--dependents N]
+"""
+
+import argparse
+import copy
+import itertools
+import os
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import nltk.parse as nlp
+import nltk.sem.logic as nll
+
+import montesniere
+
+TOP = os.path.dirname(os.path.abspath(__file__))
+RULES = os.path.join(TOP, 'rules/heuristic_rules.json')
+TESTSUITE = os.path.join(TOP, 'test/testsuite.xml')
+
+def readTestSuite(filename=TESTSUITE):
+    """Return the conll strings of all sentences of the test suite."""
+    tree = ET.parse(filename)
+    conlls = []
+    for tag in ('p_conll', 'h_conll'):
+        conlls.extend(e.text.strip() for e in tree.iter(tag))
+    return conlls
+
+def legacyToASCII(s):
+    """The transliteration used before the table was precompiled."""
+    transDict = {chr(n):chr(n) for n in range(0,128)}
+    germanLower = {'ß':'ss', 'ä': 'ae', 'ö': 'oe', 'ü': 'ue'}
+    germanUpper = {'ẞ':'SS', 'Ä': 'AE', 'Ö': 'OE', 'Ü': 'UE'}
+    transDict.update(germanLower)
+    transDict.update(germanUpper)
+    sList = list(s)
+    for i in range(0, len(sList)):
+        if sList[i] not in transDict:
+            sList[i] = '?'
+    s = ''.join(sList)
+    t = str.maketrans(transDict)
+    return s.translate(t)
+
+def timeAssignment(assigner, conlls, repeat):
+    """Return the seconds assigning to all sentences takes, at best."""
+    best = None
+    for _ in range(repeat):
+        depGraphs = [nlp.DependencyGraph(c) for c in conlls]
+        start = time.perf_counter()
+        for depGraph in depGraphs:
+            assigner.assignToDependencyGraph(depGraph)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def benchmarkASCII(args):
+    """Compare the legacy and the cached ascii transliteration."""
+    assign = montesniere.assign
+    conlls = readTestSuite()
+    lemmas = [node['lemma'] for c in conlls
+            for node in nlp.DependencyGraph(c).nodes.values()
+            if node['lemma'] is not None]
+
+    print('{} sentences, {} lemmas, {} distinct'.format(
+        len(conlls), len(lemmas), len(set(lemmas))))
+    nonASCII = [l for l in lemmas if not l.isascii()]
+    for title, values in [('all lemmas', lemmas),
+            ('the {} non-ascii lemmas'.format(len(nonASCII)), nonASCII)]:
+        print('Transliterating {} {} times:'.format(title, args.repeat))
+        for name, function in [('legacy', legacyToASCII),
+                ('table', assign._toASCII),
+                ('table and cache', assign._valueToASCII)]:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for value in values:
+                    function(value)
+            print('  {:<16} {:8.2f} ms'.format(name,
+                (time.perf_counter() - start) * 1000))
+
+    print('Assigning to all sentences, best of {}:'.format(args.repeat))
+    plain = assign.SemRepAssigner.fromfile(args.rules)
+    print('  {:<16} {:8.2f} ms'.format('no ascii',
+        timeAssignment(plain, conlls, args.repeat) * 1000))
+    ascii = assign.SemRepAssigner.fromfile(args.rules, ascii=True)
+    cached = assign._valueToASCII
+    try:
+        assign._valueToASCII = legacyToASCII
+        print('  {:<16} {:8.2f} ms'.format('legacy ascii',
+            timeAssignment(ascii, conlls, args.repeat) * 1000))
+    finally:
+        assign._valueToASCII = cached
+    print('  {:<16} {:8.2f} ms'.format('cached ascii',
+        timeAssignment(ascii, conlls, args.repeat) * 1000))
+
+class LegacyMerger(montesniere.merge.SemMerger):
+    """A SemMerger merging the expressions like before the merges were
+    planned and the expressions shared.
+
+    _merge is the one of the baseline: it deep-copies the expressions at
+    every level of the search, tries the ordered pairs of expressions
+    and backtracks on failure.
+    """
+
+    def _merge(self, mergeDict):
+        # Don't change values of original dict. (Emulation of pass by value)
+        mergeDict = copy.deepcopy(mergeDict)
+
+        if len(mergeDict) == 1:
+            return list(mergeDict.values())[0]
+        else:
+            applicationTries = itertools.chain.from_iterable(
+                    (i, tuple(reversed(i)))
+                    for i in itertools.combinations(mergeDict.keys(), 2))
+            for t in applicationTries:
+                expr0, expr1 = mergeDict[t[0]], mergeDict[t[1]]
+                if legacyIsApplicableTo(expr0, expr1):
+                    firstMerge = expr0.applyto(expr1)
+                    # Generate new mergeDict without keys for expr1 and expr2
+                    newMergeDict = {
+                            k:v for k,v in mergeDict.items()
+                            if k != t[0] and k != t[1]
+                            }
+                    # But include the result of the application under a new key.
+                    newMergeDict[t] = firstMerge
+                    try:
+                        merged = self._merge(newMergeDict).simplify()
+                    except montesniere.merge.NoMergePossibleException:
+                        # The rest of the children cannot be merged.
+                        # Start with a different attempt at the first merge.
+                        continue
+                    return merged
+            else:
+                # If all attempts to apply any type to another one fail,
+                # raise an Exception.
+                errMsg = "Could not merge the following types:"
+                for v in mergeDict.values():
+                    errMsg = "{0}\n{1}".format(errMsg, v)
+                raise montesniere.merge.NoMergePossibleException(errMsg)
+
+def legacyIsApplicableTo(expr1, expr2, strict=False):
+    """The isApplicableTo of the baseline, comparing types with ==."""
+    if not isinstance(expr1.type, nll.ComplexType):
+        return False
+
+    elif expr1.type.first == expr2.type:
+        return True
+
+    elif (not strict) and expr1.type.first.matches(expr2.type):
+        print("Warning: Type is not definite, application may be incorrect!")
+        return True
+
+    return False
+
+def countDependents(depGraph):
+    """Return the highest number of dependents of a node in a graph."""
+    return max(sum(len(deps) for deps in node['deps'].values())
+            for address, node in depGraph.nodes.items() if address != 0)
+
+def timeMerge(merger, depGraphs):
+    """Return the seconds merging all graphs takes and the failures."""
+    failures = 0
+    start = time.perf_counter()
+    for depGraph in depGraphs:
+        try:
+            merger(depGraph).getSemantics()
+        except montesniere.merge.NoMergePossibleException:
+            failures += 1
+    return time.perf_counter() - start, failures
+
+def benchmarkMerge(args):
+    """Compare the ways of merging the representations.
+
+    The plans of merges are cached across sentences. Each way is
+    therefore timed once with an empty cache (cold) and then as the best
+    of the repetitions with the cache filled (warm). The peak memory is
+    traced with an empty cache.
+    """
+    SemMerger = montesniere.merge.SemMerger
+    assigner = montesniere.assign.SemRepAssigner.fromfile(args.rules,
+            ascii=True)
+    conlls = [c for c in readTestSuite()
+            if countDependents(nlp.DependencyGraph(c)) >= args.dependents]
+
+    def assignedGraphs():
+        depGraphs = [nlp.DependencyGraph(c) for c in conlls]
+        for depGraph in depGraphs:
+            assigner.assignToDependencyGraph(depGraph)
+        return depGraphs
+
+    print('{} sentences with a node with {} or more dependents'.format(
+        len(conlls), args.dependents))
+    print('Merging all sentences, cold and best of {} warm:'.format(
+        args.repeat))
+    print('  {:<16} {:>10} {:>10} {:>12} {:>9}'.format('', 'cold ms',
+        'warm ms', 'peak KiB', 'failures'))
+    for name, merger in [('legacy', LegacyMerger),
+            ('shared', SemMerger),
+            ('deferred', lambda depGraph: SemMerger(depGraph,
+                deferNormalization=True)),
+            ('terms', lambda depGraph: SemMerger(depGraph, useTerms=True)),
+            ('terms deferred', lambda depGraph: SemMerger(depGraph,
+                deferNormalization=True, useTerms=True))]:
+        SemMerger.clearPlanCache()
+        SemMerger.clearTermTable()
+        cold, failures = timeMerge(merger, assignedGraphs())
+
+        SemMerger.clearPlanCache()
+        SemMerger.clearTermTable()
+        depGraphs = assignedGraphs()
+        tracemalloc.start()
+        try:
+            timeMerge(merger, depGraphs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        best = None
+        for _ in range(args.repeat):
+            elapsed, _ = timeMerge(merger, assignedGraphs())
+            if best is None or elapsed < best:
+                best = elapsed
+        print('  {:<16} {:10.2f} {:10.2f} {:12.1f} {:>9}'.format(name,
+            cold * 1000, best * 1000, peak / 1024, failures))
+    SemMerger.clearPlanCache()
+    SemMerger.clearTermTable()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description='Benchmark montesniere on the test suite.')
+    parser.add_argument('--rules', default=RULES,
+            help='a json file holding rules')
+    parser.add_argument('--repeat', type=int, default=5,
+            help='the number of repetitions')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+    subparsers.add_parser('ascii',
+            help='ascii transliteration of the assigned representations')
+    mergeParser = subparsers.add_parser('merge',
+            help='time and memory of merging the representations')
+    mergeParser.add_argument('--dependents', type=int, default=4,
+            help='the least number of dependents of a node in a sentence')
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'ascii':
+        benchmarkASCII(args)
+    elif args.benchmark == 'merge':
+        benchmarkMerge(args)
+
+if __name__ == '__main__':
+    main()
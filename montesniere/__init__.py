@@ -1,4 +1,17 @@
+from . import analyze
 from . import assign
+from . import batch
+from . import beta
+from . import codegen
 from . import condition
+from . import decision
+from . import features
+from . import index
 from . import merge
 from . import normalize
+from . import optimize
+from . import profiler
+from . import semparse
+from . import semtypes
+from . import template
+from . import terms
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Static analysis of rule lists.
+
+A SemRepAssigner applies the first rule whose conditions a node
+satisfies. A rule can therefore never be applied if its conditions
+contradict each other (unsatisfiable), or if every node satisfying them
+also satisfies the conditions of an earlier rule (shadowed or, if the
+rules are the same, duplicated). Such rules can be dropped without
+changing any assignment.
+
+The analysis is conservative: A rule is only reported if this follows
+from its conditions for certain. Conditions with paths, transeunda or
+custom subjects are only compared for equality.
+
+Usage:
+    python3 analyze_rules.py RULES [--prune OUT] [--corpus CONLL ...]
+"""
+
+import argparse
+import json
+import sys
+
+import nltk.parse as nlp
+
+from .codegen import describe
+
+class RuleAnalysis:
+    """The result of analyzing a list of rules.
+
+    Attributes:
+        rules: The analyzed list of SemRepRule objects.
+        unsatisfiable: A list of the numbers of the rules whose
+            conditions cannot all be satisfied.
+        shadowed: A dictionary mapping the numbers of shadowed rules to
+            the number of an earlier rule applying to all their nodes.
+        duplicated: A dictionary mapping the numbers of duplicated rules
+            to the number of the earlier equal rule.
+    """
+
+    def __init__(self, rules):
+        """Initialize RuleAnalysis by analyzing rules.
+
+        Args:
+            rules: A list of SemRepRule objects.
+
+        Returns:
+            The initialized RuleAnalysis.
+        """
+        self.rules = list(rules)
+        self.unsatisfiable = []
+        self.shadowed = {}
+        self.duplicated = {}
+        constraints = [_Constraints(r.conditions) for r in self.rules]
+        satisfiable = [c.satisfiable() for c in constraints]
+        for j, cj in enumerate(constraints):
+            if not satisfiable[j]:
+                self.unsatisfiable.append(j)
+                continue
+            for i in range(j):
+                if not satisfiable[i] or not cj.impliesAll(constraints[i]):
+                    continue
+                if _sameRule(self.rules[i], self.rules[j]):
+                    self.duplicated[j] = i
+                else:
+                    self.shadowed[j] = i
+                break
+
+    @property
+    def removable(self):
+        """A sorted list of the numbers of the rules that can be dropped."""
+        return sorted(set(self.unsatisfiable) | set(self.shadowed)
+                | set(self.duplicated))
+
+    def prune(self):
+        """Return the list of rules without the removable ones."""
+        removable = set(self.removable)
+        return [r for n, r in enumerate(self.rules) if n not in removable]
+
+    def report(self, depGraphs=None):
+        """Return a text report of the analysis.
+
+        Args:
+            depGraphs: A list of nltk.parse.DependencyGraph objects on
+                which the savings of pruning are measured or None.
+
+        Returns:
+            A string holding the report.
+        """
+        lines = ['{} rules: {} unsatisfiable, {} shadowed, {} duplicated'
+                .format(len(self.rules), len(self.unsatisfiable),
+                    len(self.shadowed), len(self.duplicated))]
+        for n in self.removable:
+            if n in self.shadowed:
+                reason = 'shadowed by rule {}'.format(self.shadowed[n])
+            elif n in self.duplicated:
+                reason = 'duplicate of rule {}'.format(self.duplicated[n])
+            else:
+                reason = 'unsatisfiable'
+            lines.append('  rule {}: {}'.format(n, reason))
+            for cond in self.rules[n].conditions:
+                lines.append('    {}'.format(describe(cond)))
+        removed = [self.rules[n] for n in self.removable]
+        lines.append('Pruning removes {} rules with {} conditions.'.format(
+            len(removed), sum(len(r.conditions) for r in removed)))
+        if depGraphs is not None:
+            before = countTests(self.rules, depGraphs)
+            after = countTests(self.prune(), depGraphs)
+            saved = before - after
+            lines.append(
+                    'On {} graphs, pruning saves {} of {} condition tests '
+                    '({:.1%}).'.format(len(depGraphs), saved, before,
+                        saved / before if before else 0))
+        return '\n'.join(lines)
+
+def countTests(rules, depGraphs):
+    """Count the conditions a linear scan over rules tests on graphs."""
+    tests = 0
+    for depGraph in depGraphs:
+        for address in list(depGraph.nodes):
+            for r in rules:
+                for cond in r.testOrder:
+                    tests += 1
+                    if not cond(depGraph, address):
+                        break
+                else:
+                    break
+    return tests
+
+def _sameRule(rule, other):
+    """Check whether two rules assign the same under the same conditions."""
+    return (set(rule.conditions) == set(other.conditions)
+            and rule.semRepPat == other.semRepPat
+            and rule.semSig == other.semSig)
+
+class _Constraints:
+    """The constraints a conjunction of conditions puts on a node.
+
+    Conditions without a path and transeunda are translated into
+    constraints on the node's values: For each key other than 'deps' the
+    allowed and forbidden values, and for 'deps' the required and allowed
+    labels, the allowed and forbidden numbers of labels and the label
+    sets that must not be contained in or contain the node's labels. All
+    other conditions are kept as they are.
+    """
+
+    def __init__(self, conditions):
+        self.allowed = {}
+        self.forbidden = {}
+        self.required = set()
+        self.allowedLabels = None
+        self.counts = None
+        self.forbiddenCounts = set()
+        self.notSupersets = []
+        self.notSubsets = []
+        self.opaque = set()
+        for cond in conditions:
+            self.add(_atom(cond))
+
+    def add(self, atom):
+        kind, key, obj = atom
+        if kind == 'in':
+            self.allowed[key] = self.allowed.get(key, obj) & obj
+        elif kind == 'notIn':
+            self.forbidden[key] = self.forbidden.get(key, frozenset()) | obj
+        elif kind == 'superset':
+            self.required |= obj
+        elif kind == 'subset':
+            if self.allowedLabels is None:
+                self.allowedLabels = obj
+            else:
+                self.allowedLabels = self.allowedLabels & obj
+        elif kind == 'notSuperset':
+            self.notSupersets.append(obj)
+        elif kind == 'notSubset':
+            self.notSubsets.append(obj)
+        elif kind == 'count':
+            self.counts = obj if self.counts is None else self.counts & obj
+        elif kind == 'notCount':
+            self.forbiddenCounts |= obj
+        else:
+            self.opaque.add(obj)
+
+    def satisfiable(self):
+        """Check whether some node could satisfy the constraints.
+
+        Returns False only if the constraints certainly contradict each
+        other.
+        """
+        for key, values in self.allowed.items():
+            if not values - self.forbidden.get(key, frozenset()):
+                return False
+        if (self.allowedLabels is not None
+                and not self.required <= self.allowedLabels):
+            return False
+        if self.counts is not None and not any(
+                self.possibleCount(n) for n in self.counts):
+            return False
+        if (self.allowedLabels is not None
+                and not any(self.possibleCount(n)
+                    for n in range(len(self.allowedLabels) + 1))):
+            return False
+        if any(o <= self.required for o in self.notSupersets):
+            return False
+        if self.allowedLabels is not None and any(
+                self.allowedLabels <= o for o in self.notSubsets):
+            return False
+        return not any(_flipped(c) in self.opaque for c in self.opaque)
+
+    def possibleCount(self, n):
+        """Check whether the node could have n labels in its deps."""
+        if n in self.forbiddenCounts or n < len(self.required):
+            return False
+        if self.counts is not None and n not in self.counts:
+            return False
+        if self.allowedLabels is not None and n > len(self.allowedLabels):
+            return False
+        return True
+
+    def impliesAll(self, other):
+        """Check whether these constraints imply all of other."""
+        return all(self.implies(a) for a in other.atoms())
+
+    def atoms(self):
+        """Yield atoms equivalent to the constraints."""
+        for key, values in self.allowed.items():
+            yield ('in', key, values)
+        for key, values in self.forbidden.items():
+            yield ('notIn', key, values)
+        if self.required:
+            yield ('superset', 'deps', frozenset(self.required))
+        if self.allowedLabels is not None:
+            yield ('subset', 'deps', self.allowedLabels)
+        for o in self.notSupersets:
+            yield ('notSuperset', 'deps', o)
+        for o in self.notSubsets:
+            yield ('notSubset', 'deps', o)
+        if self.counts is not None:
+            yield ('count', 'deps', self.counts)
+        if self.forbiddenCounts:
+            yield ('notCount', 'deps', frozenset(self.forbiddenCounts))
+        for c in self.opaque:
+            yield ('opaque', None, c)
+
+    def implies(self, atom):
+        """Check whether these constraints imply an atom."""
+        kind, key, obj = atom
+        if kind == 'in':
+            if key not in self.allowed:
+                return False
+            return self.allowed[key] - self.forbidden.get(key, frozenset()) \
+                    <= obj
+        elif kind == 'notIn':
+            forbidden = self.forbidden.get(key, frozenset())
+            if key in self.allowed:
+                return not (self.allowed[key] - forbidden) & obj
+            return obj <= forbidden
+        elif kind == 'superset':
+            return obj <= self.required
+        elif kind == 'subset':
+            return (self.allowedLabels is not None
+                    and self.allowedLabels <= obj)
+        elif kind == 'notSuperset':
+            if self.allowedLabels is not None and not obj <= self.allowedLabels:
+                return True
+            return any(o <= obj for o in self.notSupersets)
+        elif kind == 'notSubset':
+            return (not self.required <= obj
+                    or any(obj <= o for o in self.notSubsets))
+        elif kind == 'count':
+            if self.counts is not None:
+                candidates = self.counts
+            elif self.allowedLabels is not None:
+                candidates = range(len(self.allowedLabels) + 1)
+            else:
+                return False
+            return all(n in obj for n in candidates if self.possibleCount(n))
+        elif kind == 'notCount':
+            return not any(self.possibleCount(n) for n in obj)
+        else:
+            return obj in self.opaque
+
+def _atom(cond):
+    """Translate a condition into an atom (kind, key, obj)."""
+    path = getattr(cond.subj, 'path', None)
+    key = getattr(cond.subj, 'key', None)
+    if path != () or cond.transeunda:
+        return ('opaque', None, cond)
+    obj = frozenset(cond.obj)
+    if key != 'deps':
+        kinds = {'element': ('in', 'notIn'), 'notElement': ('notIn', 'in')}
+        if cond.rel not in kinds:
+            return ('opaque', None, cond)
+        return (kinds[cond.rel][cond.negated], key, obj)
+
+    if cond.rel == 'cardinality':
+        # Like makeCardinalityFixedObj, convert strings to integers.
+        counts = set()
+        for o in obj:
+            try:
+                counts.add(int(o))
+            except ValueError:
+                pass
+        obj = frozenset(counts)
+    elif cond.rel == 'notCardinality':
+        # Like makeNotCardinalityFixedObj, only use integers.
+        obj = frozenset(o for o in obj if isinstance(o, int))
+    elif cond.rel in ('exist', 'notExist'):
+        obj = frozenset({0})
+    kinds = {
+            'superset': ('superset', 'notSuperset'),
+            'notSuperset': ('notSuperset', 'superset'),
+            'subset': ('subset', 'notSubset'),
+            'notSubset': ('notSubset', 'subset'),
+            'cardinality': ('count', 'notCount'),
+            'notCardinality': ('notCount', 'count'),
+            'exist': ('notCount', 'count'),
+            'notExist': ('count', 'notCount'),
+            }
+    if cond.rel not in kinds:
+        return ('opaque', None, cond)
+    return (kinds[cond.rel][cond.negated], key, obj)
+
+def _flipped(cond):
+    """Return the condition with the opposite negation."""
+    return type(cond)(cond.subj, cond.rel, cond.obj, cond.transeunda,
+            not cond.negated)
+
+def main(argv=None):
+    """Analyze a rule file from the command line.
+
+    Args:
+        argv: A list of the command line arguments or None to use
+            sys.argv.
+    """
+    # Imported here, as the assign module imports this one.
+    from .assign import SemRepAssigner
+
+    parser = argparse.ArgumentParser(
+            prog='analyze_rules.py',
+            description='Find rules that can never be applied.')
+    parser.add_argument('rules', help='a json file holding rules')
+    parser.add_argument('--prune', metavar='OUT',
+            help='write the rules without the removable ones to OUT')
+    parser.add_argument('--corpus', metavar='CONLL', nargs='+',
+            help='conll files to measure the savings on')
+    args = parser.parse_args(argv)
+
+    assigner = SemRepAssigner.fromfile(args.rules)
+    analysis = RuleAnalysis(assigner.rules)
+    depGraphs = None
+    if args.corpus:
+        depGraphs = []
+        for conllFile in args.corpus:
+            with open(conllFile) as f:
+                try:
+                    depGraphs.append(nlp.DependencyGraph(f.read()))
+                except (AssertionError, ValueError):
+                    print('Skipping {}: not a valid conll file.'.format(
+                        conllFile), file=sys.stderr)
+    print(analysis.report(depGraphs))
+
+    if args.prune:
+        with open(args.rules) as f:
+            jsonRules = json.load(f)
+        removable = set(analysis.removable)
+        with open(args.prune, 'w') as f:
+            json.dump([r for n, r in enumerate(jsonRules)
+                if n not in removable], f, indent=4, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
+import hashlib
 import json
-
-import nltk.sem.logic as nll
-
-from .condition import Condition
-
-tlp = nll.LogicParser(type_check=True)
+import os
+import pickle
+import re
+import string
+import tempfile
+import time
+
+from .analyze import RuleAnalysis
+from .batch import GraphArrays, selectRules
+from .codegen import CompiledRules
+from .condition import Condition, ConditionTable
+from .decision import DecisionDAG, TooManyStatesException
+from .index import RuleIndex
+from .semparse import SemRepParser
+from .semtypes import internExpressionTypes, internSignature, internType
+from .template import SemRepTemplate
+
+tlp = SemRepParser(type_check=True)
+
+# The version of the format of rule caches. Caches written with another
+# version are not used.
+CACHE_VERSION = 2
 
 class SemRepRule:
     """A rule assigning a semantic representation if conditions are met.
@@ -26,6 +44,18 @@ class SemRepRule:
             method with the correct node as an argument.
         semSig: A dictionary mapping expressions from the semRepPat to
             a string representation of their types.
+        template: A SemRepTemplate compiled from semRepPat and semSig or
+            None if they cannot be compiled into a template.
+        asciiTemplate: The SemRepTemplate used for ascii-compatible
+            representations or None.
+        fieldKeys: A set of the keys of a node that the semRepPat and
+            the semSig refer to or None if they refer to the node in
+            other ways.
+        resultType: The interned nltk.sem.logic type of the semantic
+            representations built from the template or None if the rule
+            has no template.
+        testOrder: The list of the conditions in the order in which
+            they are tested. It can be set by a ConditionOptimizer.
     """
 
     def __init__(self, conditions, semRepPat, semSig):
@@ -52,6 +82,18 @@ class SemRepRule:
         """
         self.semRepPat = semRepPat
         self.semSig = semSig
+        self.template = _compileTemplate(semRepPat, semSig)
+        asciiSig = {_toASCII(k): _toASCII(v) for k, v in semSig.items()}
+        if _toASCII(semRepPat) == semRepPat and asciiSig == semSig:
+            self.asciiTemplate = self.template
+        else:
+            self.asciiTemplate = _compileTemplate(_toASCII(semRepPat), asciiSig)
+        # Only the names of constants differ between the templates, so
+        # their types are the same.
+        self.resultType = None
+        if self.template is not None:
+            self.resultType = self.template.type
+        self.fieldKeys = _fieldKeys([semRepPat] + list(semSig))
         self.conditions = []
         if len(conditions) > 0:
             if isinstance(conditions[0], Condition):
@@ -63,6 +105,13 @@ class SemRepRule:
             else:
                 raise TypeError(
                         'conditions is not a list of str or Condition objects')
+        self.testOrder = self.conditions
+
+    def __setstate__(self, state):
+        # The type of an unpickled rule has to be interned again.
+        self.__dict__.update(state)
+        if self.resultType is not None:
+            self.resultType = internType(self.resultType)
 
     @classmethod
     def fromstring(cls, s):
@@ -70,33 +119,81 @@ class SemRepRule:
         # TODO: Implement this.
         pass
 
-    def testConditions(self, depGraph, address):
+    def testConditions(self, depGraph, address, memo=None, optimizer=None,
+            onTest=None):
         """Test if a node satisfies all conditions of this SemRepRule.
 
         Args:
             depGraph: An nltk.parse.DependencyGraph object.
             address: An integer denoting the address of a node in the
                 depGraph
+            memo: A dictionary mapping pairs of an address and a
+                Condition to the result of the condition for the node in
+                the depGraph. Results are looked up in and added to it.
+                Default: None
+            optimizer: A ConditionOptimizer recording the result of
+                each tested condition. Default: None
+            onTest: A function called with each tested condition and
+                its result, also if the result is taken from the memo.
+                Default: None
         Returns:
             True, if all conditions are satisfied.
             False, if one or more conditions are not satisfied.
         """
-        for cond in self.conditions:
-            if not cond(depGraph, address):
+        if onTest is not None:
+            return self._testConditionsReporting(depGraph, address, memo,
+                    optimizer, onTest)
+        for cond in self.testOrder:
+            if memo is None:
+                satisfied = cond(depGraph, address)
+                if optimizer is not None:
+                    optimizer.record(cond, satisfied)
+            else:
+                try:
+                    satisfied = memo[address, cond]
+                except KeyError:
+                    satisfied = cond(depGraph, address)
+                    memo[address, cond] = satisfied
+                    if optimizer is not None:
+                        optimizer.record(cond, satisfied)
+            if not satisfied:
                 # One condition is not satisfied.
                 return False
         else:
             # All conditions are satisfied.
             return True
 
+    def _testConditionsReporting(self, depGraph, address, memo, optimizer,
+            onTest):
+        """Test the conditions like testConditions and report each one.
+
+        This is kept apart from testConditions, so that testing without
+        onTest does not check for it at every condition.
+        """
+        for cond in self.testOrder:
+            if memo is None:
+                satisfied = cond(depGraph, address)
+                if optimizer is not None:
+                    optimizer.record(cond, satisfied)
+            else:
+                try:
+                    satisfied = memo[address, cond]
+                except KeyError:
+                    satisfied = cond(depGraph, address)
+                    memo[address, cond] = satisfied
+                    if optimizer is not None:
+                        optimizer.record(cond, satisfied)
+            onTest(cond, satisfied)
+            if not satisfied:
+                return False
+        else:
+            return True
+
     def assignSemRep(self, node, ascii=False):
         """Assign the semantic representation of this rule to a node.
 
-        Format this rule's semRepPat with the given node, do the same
-        with the expressions in this rule's semSig. Then parse the
-        formatted semRepPat into a logic expression using the formatted
-        semSig as a signature. Add the resulting logic representation to
-        the node's dictionary under the new key 'semrep'.
+        Build the representation with buildSemRep and add it to the
+        node's dictionary under the new key 'semrep'.
 
         Args:
             node: A node of an nltk.parse.DependencyGraph object.
@@ -104,12 +201,86 @@ class SemRepRule:
                 representation should be ascii-compatible.
                 Default: False
         """
+        node['semrep'] = self.buildSemRep(node, ascii)
+
+    def buildSemRep(self, node, ascii=False):
+        """Build the semantic representation of this rule for a node.
+
+        Format this rule's semRepPat with the given node, do the same
+        with the expressions in this rule's semSig. Then parse the
+        formatted semRepPat into a logic expression using the formatted
+        semSig as a signature.
+
+        If the rule has a template that the node's values can be put
+        into, the representation is built from the template instead,
+        which yields the same expression without parsing.
+
+        Args:
+            node: A node of an nltk.parse.DependencyGraph object or a
+                dictionary of its fields as returned by bindFields.
+            ascii: A boolean indicating whether the representation
+                should be ascii-compatible. Default: False
+
+        Returns:
+            The nltk.sem.logic.Expression for the node.
+        """
+        if ascii:
+            template = self.asciiTemplate
+            transliterate = _valueToASCII
+        else:
+            template = self.template
+            transliterate = None
+        if template is not None:
+            semRep = template.instantiate(node, transliterate)
+            if semRep is not None:
+                return semRep
+
         expr = self.semRepPat.format(node)
         exprSig = {k.format(node): v for k, v in self.semSig.items()}
         if ascii:
             expr = _toASCII(expr)
             exprSig = {_toASCII(k): _toASCII(v) for k, v in exprSig.items()}
-        node['semrep'] = tlp.parse(expr, signature=exprSig)
+        semRep = tlp.parse(expr, signature=internSignature(exprSig))
+        internExpressionTypes(semRep)
+        return semRep
+
+    def semType(self, node, ascii=False):
+        """Return the type of this rule's representation for a node.
+
+        The type is found without building the representation. It is
+        the resultType if the node's values can be put into the
+        template. Otherwise, the representation would be parsed, and its
+        type could only be found by building it.
+
+        Args:
+            node: A node of an nltk.parse.DependencyGraph object or a
+                dictionary of its fields as returned by bindFields.
+            ascii: A boolean indicating whether the representation
+                should be ascii-compatible. Default: False
+
+        Returns:
+            The interned nltk.sem.logic type or None if it is not known
+            without building the representation.
+        """
+        if ascii:
+            template = self.asciiTemplate
+            transliterate = _valueToASCII
+        else:
+            template = self.template
+            transliterate = None
+        if template is None or not template.accepts(node, transliterate):
+            return None
+        return self.resultType
+
+    def bindFields(self, node):
+        """Return the fields of a node that this rule's semRepPat uses.
+
+        The returned dictionary can be passed to buildSemRep in place of
+        the node, also after the node has been changed.
+        """
+        if self.fieldKeys is None:
+            return dict(node)
+        return {k: node[k] for k in self.fieldKeys if k in node}
 
     def __str__(self):
         s = '<SemRepRule: conditions={0.conditions}, semRepPat={0.semRepPat}>'
@@ -124,27 +295,114 @@ class SemRepAssigner:
 
     Attributes:
         rules: A list of SemRepRule objects.
+        index: A RuleIndex over the rules or None if the rules are tested
+            without an index.
+        dag: A DecisionDAG compiled from the rules or None if the rules
+            are tested one after the other.
+        verify: A boolean indicating whether each selected rule is
+            compared against the result of a linear scan over the rules.
+        memoized: A boolean indicating whether the results of conditions
+            are cached per node while a DependencyGraph is assigned to.
+        batch: A boolean indicating whether the rules are selected for
+            all nodes of a DependencyGraph at once.
+        lazy: A boolean indicating whether semantic representations are
+            only built when they are first read.
+        optimizer: A ConditionOptimizer measuring the conditions while
+            assigning or None.
+        compiled: The CompiledRules used to select rules or None if the
+            rules have not been compiled.
+        profiler: A RuleProfiler recording the cost of each rule or
+            None.
     """
 
-    def __init__(self, rules, ascii=False):
+    def __init__(self, rules, ascii=False, indexed=True, dag=False,
+            verify=False, memoized=True, batch=False, lazy=False,
+            optimizer=None, prune=False, profiler=None):
         """Initialize SemRepAssigner with the given rules.
 
-        The rules should be a sorted iterable, e. g. a list.
+        The rules should be a sorted iterable, e. g. a list. If indexed is
+        True, an index is built over the rules, so that each node is
+        only tested against the rules that could match its tag and rel.
+        If dag is True, the rules are compiled into a DecisionDAG
+        instead, which tests each distinct condition at most once per
+        node. If the DecisionDAG would have more states than
+        montesniere.decision.MAX_STATES, the rules are indexed instead.
+        Changes to the list of rules are reflected in neither.
+        If batch is True, whole DependencyGraphs are assigned to by
+        evaluating each condition for all nodes at once, which needs
+        NumPy. If lazy is True, assigning only records the selected rule
+        and the node's fields; the representation is built when the
+        node's 'semrep' is first read. If an optimizer is given, it
+        records the results of the conditions tested, and the conditions
+        of the rules are ordered by it after each DependencyGraph. If
+        prune is True, rules that a RuleAnalysis finds can never be
+        applied are dropped first. If a profiler is given, it records
+        the cost of each rule; without one, nothing is measured.
 
         Args:
             rules: A list of SemRepRule objects.
             ascii: A boolean indicating whether the assigned
                 representations should be ascii-compatible.
                 Default: False
+            indexed: A boolean indicating whether the rules should be
+                indexed. Default: True
+            dag: A boolean indicating whether the rules should be
+                compiled into a decision DAG, if it does not exceed
+                montesniere.decision.MAX_STATES states. Default: False
+            verify: A boolean indicating whether each selected rule
+                should be compared against the rule selected by a linear
+                scan. Default: False
+            memoized: A boolean indicating whether the result of each
+                distinct condition should be cached per node, so that
+                rules sharing a condition object do not test it again.
+                Default: True
+            batch: A boolean indicating whether the conditions should be
+                evaluated for all nodes of a DependencyGraph at once.
+                Default: False
+            lazy: A boolean indicating whether the representations
+                should only be built when they are first read.
+                Default: False
+            optimizer: A ConditionOptimizer ordering the conditions of
+                the rules by the results measured while assigning.
+                Default: None
+            prune: A boolean indicating whether rules that can never be
+                applied should be dropped. Default: False
+            profiler: A RuleProfiler recording how often each rule is
+                tested and fires and how long this takes. Default: None
 
         Returns:
             The initialized SemRepAssigner.
         """
+        if prune:
+            rules = RuleAnalysis(rules).prune()
         self.rules = rules
         self.ascii = ascii
+        self.dag = None
+        if dag:
+            try:
+                self.dag = DecisionDAG(rules)
+            except TooManyStatesException:
+                # Fall back to the index.
+                indexed = True
+        self.index = None
+        if indexed and self.dag is None:
+            self.index = RuleIndex(rules)
+        self.verify = verify
+        self.memoized = memoized
+        self.batch = batch
+        self.lazy = lazy
+        self.optimizer = optimizer
+        self.profiler = profiler
+        self.compiled = None
+        # The rules as they were at initialization, referred to by number
+        # from lazy semantic representations.
+        self._lazyRules = tuple(rules)
+        self._ruleNumbers = {}
+        for n, r in enumerate(self._lazyRules):
+            self._ruleNumbers.setdefault(r, n)
 
     @classmethod
-    def fromfile(cls, filename, ascii=False):
+    def fromfile(cls, filename, ascii=False, cache=None, **kwargs):
         """Read a SemRepAssigner from a json file and return it.
 
         The json file has to hold an array of objects (the rules).
@@ -155,26 +413,62 @@ class SemRepAssigner:
         requirements imposed by SemRepRule. The value of 'semSig' has to
         be an object (i. e. a python dict) meeting the requirements
         imposed by SemRepRule.
+
+        If a cache file is given, the rules with their parsed conditions
+        and templates are loaded from it instead, provided that it was
+        written for the same content of the json file. Otherwise, the
+        rules are read from the json file and written to the cache.
         
         Args:
             filename: The name of json file.
             ascii: A boolean indicating whether the assigned
                 representations should be ascii-compatible.
                 Default: False
+            cache: The name of a file caching the compiled rules or
+                None if no cache should be used. Default: None
+            kwargs: Further keyword arguments passed on to the
+                initialization of the SemRepAssigner.
 
         Returns:
             A SemRepAssigner object with the rules from the json file.
         Raises:
             ValueError if filename does not denote a valid json file.
         """
-        with open(filename) as f:
+        with open(filename, 'rb') as f:
+            content = f.read()
+        contentHash = hashlib.sha256(content).hexdigest()
+        rules = None
+        if cache is not None:
+            rules = _loadRuleCache(cache, contentHash)
+        if rules is None:
             try:
-                json_rules = json.load(f)
+                json_rules = json.loads(content.decode('utf-8'))
             except ValueError:
                 raise
-        rules = [SemRepRule(r['conditions'], r['semRepPat'], r['semSig'])
-                for r in json_rules]
-        return cls(rules, ascii)
+            # Equal conditions of different rules share one Condition
+            # object.
+            table = ConditionTable()
+            rules = [
+                    SemRepRule([table.fromstring(c) for c in r['conditions']],
+                        r['semRepPat'], r['semSig'])
+                    for r in json_rules]
+            if cache is not None:
+                _writeRuleCache(cache, contentHash, rules)
+        return cls(rules, ascii, **kwargs)
+
+    def compile(self):
+        """Compile the rules into a generated Python function.
+
+        From then on, rules are selected by the compiled function, which
+        tests the conditions of all rules in a single call per node.
+        The generated source can be read from the source attribute of
+        the returned object.
+
+        Returns:
+            The CompiledRules object.
+        """
+        self.compiled = CompiledRules(self.rules)
+        return self.compiled
 
     def assignToDependencyGraph(self, depGraph):
         """Assign semantic representations to DependencyGraph nodes.
@@ -186,44 +480,317 @@ class SemRepAssigner:
         Args:
             depGraph: An nltk.parse.DependencyGraph object.
         """
+        if self.batch:
+            arrays = GraphArrays(depGraph)
+            selected = selectRules(self.rules, arrays)
+            for address, rule in zip(arrays.addresses, selected):
+                self._applyRule(depGraph, address, rule)
+            return
+
+        memo = {} if self.memoized else None
         for address in depGraph.nodes:
-            self.assignToNode(depGraph, address)
+            self.assignToNode(depGraph, address, memo)
+        if self.optimizer is not None:
+            self.optimizer.optimize(self.rules)
     
-    def assignToNode(self, depGraph, address):
+    def assignTypes(self, depGraph):
+        """Assign the types of semantic representations to graph nodes.
+
+        The dictionaries corresponding to the nodes in the depGraph are
+        extended with a 'semtype' key under which the type of the
+        representation that the selected rule would assign is stored,
+        without building the representation. Nodes without a matching
+        rule get no 'semtype'; nodes whose type is not known without
+        building the representation (see SemRepRule.semType) get None.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+        """
+        if self.batch:
+            arrays = GraphArrays(depGraph)
+            selected = zip(arrays.addresses, selectRules(self.rules, arrays))
+        else:
+            memo = {} if self.memoized else None
+            selected = [(address, self.selectRule(depGraph, address, memo))
+                    for address in list(depGraph.nodes)]
+        for address, rule in selected:
+            if rule is not None:
+                node = depGraph.get_by_address(address)
+                node['semtype'] = rule.semType(node, self.ascii)
+
+    def assignToNode(self, depGraph, address, memo=None):
         """Assign a semantic representation to a DependencyGraph node.
 
         Args:
             depGraph: An nltk.parse.DependencyGraph object.
             address: An integer denoting a node in the depGraph.
+            memo: A dictionary caching the results of conditions for the
+                nodes of the depGraph as used by
+                SemRepRule.testConditions. Default: None
+
+        Raises:
+            RuleMismatchException if verify is set and the selected rule
+                differs from the one selected by a linear scan.
         """
-        for r in self.rules:
-            if r.testConditions(depGraph, address):
-                r.assignSemRep(depGraph.get_by_address(address), self.ascii)
-                break
+        rule = self.selectRule(depGraph, address, memo)
+        self._applyRule(depGraph, address, rule)
+
+    def _applyRule(self, depGraph, address, rule):
+        """Assign the semantic representation of a selected rule."""
+        if self.verify:
+            expected = _firstMatch(self.rules, depGraph, address)
+            if rule is not expected:
+                errMsg = 'Selected {} for node {} instead of {}.'
+                raise RuleMismatchException(
+                        errMsg.format(rule, address, expected))
+        if rule is not None and self.profiler is not None:
+            start = time.perf_counter()
+            self._assignRule(depGraph, address, rule)
+            self.profiler.recordAssignment(rule,
+                    time.perf_counter() - start)
+        elif rule is not None:
+            self._assignRule(depGraph, address, rule)
         else:
             # No rule's conditions are satisfied.
             # Assign default semrep here.
             pass
 
+    def _assignRule(self, depGraph, address, rule):
+        """Assign the semantic representation of a rule to a node."""
+        if self.lazy:
+            node = _lazyNode(depGraph, address)
+            node['semrep'] = LazySemRep(self._lazyRules,
+                    self._ruleNumbers[rule], rule.bindFields(node),
+                    self.ascii)
+        else:
+            rule.assignSemRep(depGraph.get_by_address(address), self.ascii)
+
+    def selectRule(self, depGraph, address, memo=None):
+        """Select the first rule whose conditions a node satisfies.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+            address: An integer denoting a node in the depGraph.
+            memo: A dictionary caching the results of conditions as used
+                by SemRepRule.testConditions. Default: None
+
+        Returns:
+            The selected SemRepRule or None if no rule matches.
+        """
+        if self.compiled is not None:
+            return self.compiled.select(depGraph, address)
+        elif self.dag is not None:
+            return self.dag.select(depGraph, address)
+        elif self.index is not None:
+            rules = self.index.candidates(depGraph.get_by_address(address))
+        else:
+            rules = self.rules
+        if self.profiler is not None:
+            return self.profiler.firstMatch(rules, depGraph, address, memo,
+                    self.optimizer)
+        return _firstMatch(rules, depGraph, address, memo, self.optimizer)
+
+class LazySemRep:
+    """The semantic representation of a node that is not built yet.
+
+    Attributes:
+        rules: A sequence of SemRepRule objects.
+        ruleNumber: The index of the rule selected for the node in
+            rules.
+        fields: A dictionary of the node's fields used by the rule.
+        ascii: A boolean indicating whether the representation should
+            be ascii-compatible.
+    """
+
+    __slots__ = ('rules', 'ruleNumber', 'fields', 'ascii')
+
+    def __init__(self, rules, ruleNumber, fields, ascii=False):
+        self.rules = rules
+        self.ruleNumber = ruleNumber
+        self.fields = fields
+        self.ascii = ascii
+
+    def build(self):
+        """Build the semantic representation and return it."""
+        rule = self.rules[self.ruleNumber]
+        return rule.buildSemRep(self.fields, self.ascii)
+
+class LazyNode(dict):
+    """A node building lazy semantic representations when they are read.
+
+    Reading a LazySemRep value with node[key] or node.get(key) builds
+    the representation and replaces the LazySemRep with it. Other ways
+    of reading the values, e. g. node.items(), return the LazySemRep.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazySemRep):
+            value = value.build()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+class RuleMismatchException(Exception):
+    pass
+
+def _firstMatch(rules, depGraph, address, memo=None, optimizer=None):
+    """Return the first rule whose conditions a node satisfies or None."""
+    for r in rules:
+        if r.testConditions(depGraph, address, memo, optimizer):
+            return r
+    return None
+
+def _loadRuleCache(cache, contentHash):
+    """Load rules from a cache file.
+
+    Returns:
+        The list of SemRepRule objects or None if the cache file does
+        not exist, cannot be read or was written for other content.
+    """
+    try:
+        with open(cache, 'rb') as f:
+            cached = pickle.load(f)
+    except Exception:
+        # Missing, damaged or outdated caches are simply rebuilt.
+        return None
+    if (not isinstance(cached, dict)
+            or cached.get('version') != CACHE_VERSION
+            or cached.get('hash') != contentHash):
+        return None
+    return cached['rules']
+
+def _writeRuleCache(cache, contentHash, rules):
+    """Write rules to a cache file.
+
+    The file is replaced atomically, so that processes reading the cache
+    at the same time never see a partial file. If the cache cannot be
+    written, the rules are simply not cached.
+    """
+    cached = {'version': CACHE_VERSION, 'hash': contentHash, 'rules': rules}
+    directory = os.path.dirname(os.path.abspath(cache))
+    try:
+        fd, tmpName = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return
+    replaced = False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cached, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpName, cache)
+        replaced = True
+    except (OSError, pickle.PicklingError, AttributeError, TypeError):
+        pass
+    finally:
+        # The temporary file is removed on any error, also on errors
+        # that are passed on.
+        if not replaced:
+            try:
+                os.unlink(tmpName)
+            except OSError:
+                pass
+
+def _lazyNode(depGraph, address):
+    """Return a node of a DependencyGraph as a LazyNode.
+
+    If the node is a plain dictionary, it is replaced with a LazyNode
+    holding the same values, also as the root of the depGraph.
+    """
+    node = depGraph.get_by_address(address)
+    if isinstance(node, LazyNode):
+        return node
+    lazyNode = LazyNode(node)
+    depGraph.nodes[address] = lazyNode
+    if depGraph.root is node:
+        depGraph.root = lazyNode
+    return lazyNode
+
+def _fieldKeys(patterns):
+    """Return the node keys that the format fields of patterns refer to.
+
+    Returns:
+        A set of keys or None if a field does not have the form
+        {[key]}.
+
+    >>> sorted(_fieldKeys(['{[lemma]}(x)', '{[word]}']))
+    ['lemma', 'word']
+    >>> _fieldKeys(['{0[lemma]}']) is None
+    True
+    """
+    keys = set()
+    for pattern in patterns:
+        try:
+            parsed = list(string.Formatter().parse(pattern))
+        except ValueError:
+            return None
+        for _, fieldName, _, _ in parsed:
+            if fieldName is None:
+                continue
+            match = re.fullmatch(r'\[([^\[\]]+)\]', fieldName)
+            if match is None:
+                return None
+            keys.add(match.group(1))
+    return keys
+
+def _compileTemplate(semRepPat, semSig):
+    """Return a SemRepTemplate or None if it cannot be compiled."""
+    try:
+        return SemRepTemplate(semRepPat, semSig)
+    except ValueError:
+        return None
+
+class _ASCIITable(dict):
+    """A translation table for str.translate making strings ascii.
+
+    Ascii characters are kept, German umlauts and sharp s are
+    transcribed, and all other characters are replaced with '?'.
+    """
+
+    def __init__(self):
+        dict.__init__(self, {n: chr(n) for n in range(0, 128)})
+        germanLower = {'ß':'ss', 'ä': 'ae', 'ö': 'oe', 'ü': 'ue'}
+        germanUpper = {'ẞ':'SS', 'Ä': 'AE', 'Ö': 'OE', 'Ü': 'UE'}
+        self.update({ord(k): v for k, v in germanLower.items()})
+        self.update({ord(k): v for k, v in germanUpper.items()})
+
+    def __missing__(self, key):
+        self[key] = '?'
+        return '?'
+
+# The table used by _toASCII, built once.
+_ASCII_TABLE = _ASCIITable()
+
 def _toASCII(s):
-    """Replace non-ascii characters to make a string ascii-compatible."""
-    # XXX: This is an ugly hack. There has to be a proper way to do this.
-
-    transDict = {chr(n):chr(n) for n in range(0,128)}
-    germanLower = {'ß':'ss', 'ä': 'ae', 'ö': 'oe', 'ü': 'ue'}
-    germanUpper = {'ẞ':'SS', 'Ä': 'AE', 'Ö': 'OE', 'Ü': 'UE'}
-    transDict.update(germanLower)
-    transDict.update(germanUpper)
-
-    # Replace all characters that are not in the transDict with '?'.
-    sList = list(s)
-    for i in range(0, len(sList)):
-        if sList[i] not in transDict:
-            sList[i] = '?'
-
-    s = ''.join(sList)
-    t = str.maketrans(transDict)
-    return s.translate(t)
+    """Replace non-ascii characters to make a string ascii-compatible.
+
+    >>> _toASCII('Größe')
+    'Groesse'
+    >>> _toASCII('Żubr')
+    '?ubr'
+    """
+    if s.isascii():
+        return s
+    return s.translate(_ASCII_TABLE)
+
+def _valueToASCII(value):
+    """Return the ascii form of a node's value, caching it per value.
+
+    Only values that are not ascii already are cached.
+    """
+    if value.isascii():
+        return value
+    return _cachedToASCII(value)
+
+# Only the most recently used non-ascii values of nodes, e. g. lemmas, are
+# cached, so that the cache does not grow with every new lemma.
+@functools.lru_cache(maxsize=4096)
+def _cachedToASCII(value):
+    return _toASCII(value)
 
 def demo():
     import nltk.parse as nlp
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Vectorized evaluation of conditions over whole DependencyGraphs.
+
+This module needs NumPy. It is only imported by SemRepAssigner if the
+batch mode is used.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Keys of a node that hold a single hashable value.
+SCALAR_KEYS = {'address', 'word', 'lemma', 'ctag', 'tag', 'feats', 'head',
+        'rel'}
+
+# Relations that can be evaluated on whole columns of scalar values.
+SCALAR_RELATIONS = {'element', 'notElement'}
+
+# Relations that can be evaluated on the deps matrix.
+DEPS_RELATIONS = {'subset', 'notSubset', 'superset', 'notSuperset',
+        'cardinality', 'notCardinality', 'exist', 'notExist'}
+
+class GraphArrays:
+    """Columnar NumPy arrays holding the features of a graph's nodes.
+
+    Every node of the graph is a row. One additional row stands for the
+    empty node that nltk returns for addresses not in the graph, e. g.
+    the head of the root. Scalar features are stored as integer ids into
+    a vocabulary local to the graph, the heads as row numbers and the
+    labels of each node's deps as a boolean matrix.
+
+    Attributes:
+        depGraph: The nltk.parse.DependencyGraph object.
+        addresses: A list of the addresses of the nodes, in the order of
+            the rows.
+        size: The number of nodes in the graph.
+        head: An array holding the row of each row's head.
+        deps: A boolean array with a row for each node and a column for
+            each dependency label occurring in the graph.
+        depLabels: A dictionary mapping dependency labels to columns of
+            deps.
+        edges: A dictionary mapping dependency labels to a pair of
+            arrays holding the rows of the heads and of the dependents.
+        counts: An array holding the number of deps labels of each row.
+    """
+
+    def __init__(self, depGraph):
+        """Initialize GraphArrays by reading the nodes of a graph.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+
+        Raises:
+            ImportError if NumPy is not available.
+        """
+        if np is None:
+            raise ImportError('The batch mode of montesniere needs NumPy.')
+        self.depGraph = depGraph
+        self.addresses = list(depGraph.nodes)
+        self.size = len(self.addresses)
+        self._nodes = [depGraph.nodes[a] for a in self.addresses]
+        # The extra row for addresses not in the graph. Like nltk's
+        # default node, all its values are None and it has no deps.
+        self._nodes.append({k: None for k in SCALAR_KEYS})
+        self._nodes[-1]['deps'] = {}
+        self._rows = {a: r for r, a in enumerate(self.addresses)}
+        missing = self.size
+        if None in self._rows:
+            missing = self._rows[None]
+
+        self.head = np.array(
+                [self._rows.get(n['head'], missing) for n in self._nodes[:-1]]
+                + [missing], dtype=np.intp)
+
+        self.depLabels = {}
+        heads = {}
+        dependents = {}
+        for r, n in enumerate(self._nodes):
+            for label, children in n['deps'].items():
+                self.depLabels.setdefault(label, len(self.depLabels))
+                heads.setdefault(label, []).extend([r] * len(children))
+                dependents.setdefault(label, []).extend(
+                        self._rows.get(c, missing) for c in children)
+        self.deps = np.zeros((len(self._nodes), len(self.depLabels)),
+                dtype=bool)
+        for r, n in enumerate(self._nodes):
+            for label in n['deps']:
+                self.deps[r, self.depLabels[label]] = True
+        self.edges = {
+                label: (np.array(heads[label], dtype=np.intp),
+                    np.array(dependents[label], dtype=np.intp))
+                for label in heads}
+        self.counts = self.deps.sum(axis=1)
+        self._columns = {}
+
+    def column(self, key):
+        """Return the ids and the vocabulary of the values under key.
+
+        Returns:
+            A pair of an integer array holding an id for the value of
+            each row and a dictionary mapping the values to their ids.
+        """
+        try:
+            return self._columns[key]
+        except KeyError:
+            pass
+        vocabulary = {}
+        ids = np.array(
+                [vocabulary.setdefault(n[key], len(vocabulary))
+                    for n in self._nodes],
+                dtype=np.intp)
+        self._columns[key] = (ids, vocabulary)
+        return ids, vocabulary
+
+def evaluate(cond, arrays):
+    """Evaluate a condition for all nodes of a graph at once.
+
+    Conditions whose subject or relation cannot be vectorized are
+    evaluated node by node.
+
+    Args:
+        cond: A Condition object.
+        arrays: The GraphArrays of the graph.
+
+    Returns:
+        A boolean array holding the result for each node, in the order
+        of arrays.addresses.
+    """
+    subjResults = _evaluateSubj(cond, arrays)
+    if subjResults is None:
+        return np.array(
+                [cond(arrays.depGraph, a) for a in arrays.addresses],
+                dtype=bool)
+
+    satisfied = subjResults.copy()
+    if cond.transeunda:
+        rels, vocabulary = arrays.column('rel')
+        passable = _members(cond.transeunda, vocabulary)[rels]
+        current = np.arange(len(satisfied))
+        active = passable.copy()
+        # A chain of heads can be at most as long as the number of rows.
+        for _ in range(len(satisfied)):
+            if not active.any():
+                break
+            current[active] = arrays.head[current[active]]
+            satisfied[active] |= subjResults[current[active]]
+            active &= passable[current]
+
+    satisfied = satisfied[:arrays.size]
+    if cond.negated:
+        return ~satisfied
+    return satisfied
+
+def selectRules(rules, arrays):
+    """Select the first matching rule for every node of a graph.
+
+    The conditions are evaluated for all nodes at once, and each
+    distinct condition only once.
+
+    Args:
+        rules: A list of SemRepRule objects.
+        arrays: The GraphArrays of the graph.
+
+    Returns:
+        A list holding the selected SemRepRule or None for each node, in
+        the order of arrays.addresses.
+    """
+    selected = np.full(arrays.size, -1, dtype=np.intp)
+    unselected = np.ones(arrays.size, dtype=bool)
+    results = {}
+    for n, r in enumerate(rules):
+        if not unselected.any():
+            break
+        matching = unselected.copy()
+        for cond in r.conditions:
+            try:
+                condResults = results[cond]
+            except KeyError:
+                condResults = evaluate(cond, arrays)
+                results[cond] = condResults
+            matching &= condResults
+            if not matching.any():
+                break
+        selected[matching] = n
+        unselected &= ~matching
+    return [rules[n] if n >= 0 else None for n in selected]
+
+def _evaluateSubj(cond, arrays):
+    """Apply a condition's relation to its subject in all rows.
+
+    Returns:
+        A boolean array with an entry for every row or None if the
+        condition cannot be vectorized.
+    """
+    path = getattr(cond.subj, 'path', None)
+    key = getattr(cond.subj, 'key', None)
+    if path is None:
+        return None
+    if key == 'deps' and cond.rel in DEPS_RELATIONS:
+        results = _depsRelation(cond.rel, cond.obj, arrays)
+    elif key in SCALAR_KEYS and cond.rel in SCALAR_RELATIONS:
+        values, vocabulary = arrays.column(key)
+        results = _members(cond.obj, vocabulary)[values]
+        if cond.rel == 'notElement':
+            results = ~results
+    else:
+        return None
+
+    # Walk the path backwards, so that each row learns whether any node
+    # reached from it satisfies the relation.
+    for t in reversed(path):
+        if t == '^':
+            results = results[arrays.head]
+        else:
+            reached = np.zeros(len(results), dtype=bool)
+            if t in arrays.edges:
+                heads, dependents = arrays.edges[t]
+                np.logical_or.at(reached, heads, results[dependents])
+            results = reached
+    return results
+
+def _depsRelation(rel, obj, arrays):
+    """Apply a set relation to the deps labels of all rows."""
+    inObj = np.zeros(len(arrays.depLabels), dtype=bool)
+    for label in obj:
+        if label in arrays.depLabels:
+            inObj[arrays.depLabels[label]] = True
+    counts = arrays.counts
+
+    if rel in ('subset', 'notSubset'):
+        results = ~arrays.deps[:, ~inObj].any(axis=1)
+    elif rel in ('superset', 'notSuperset'):
+        if len(obj) > inObj.sum():
+            # Some labels of obj do not occur in the graph at all.
+            results = np.zeros(len(counts), dtype=bool)
+        else:
+            results = arrays.deps[:, inObj].all(axis=1)
+    elif rel == 'cardinality':
+        cardinalities = []
+        for o in obj:
+            try:
+                cardinalities.append(int(o))
+            except ValueError:
+                pass
+        results = np.isin(counts, cardinalities)
+    elif rel == 'notCardinality':
+        # Like makeNotCardinalityFixedObj, only use members that already
+        # are integers.
+        results = ~np.isin(counts, [o for o in obj if isinstance(o, int)])
+    else:
+        results = counts > 0
+
+    if rel in ('notSubset', 'notSuperset', 'notExist'):
+        return ~results
+    return results
+
+def _members(values, vocabulary):
+    """Return a boolean array telling which ids stand for the values.
+
+    Indexing the array with a column of ids is cheaper than np.isin for
+    the small vocabularies of single graphs.
+    """
+    members = np.zeros(len(vocabulary), dtype=bool)
+    members[[vocabulary[v] for v in values if v in vocabulary]] = True
+    return members
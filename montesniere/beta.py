@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Beta-normalization of nltk.sem.logic expressions in one walk."""
+
+import nltk.sem.logic as nll
+
+def betaNormalize(expr):
+    """Return the beta-normal form of an expression.
+
+    Unlike nltk's simplify, which substitutes the argument of each
+    application into a copy of the function before simplifying the
+    result again, the expression is walked once and the substitutions
+    are carried along in an environment. Only the bodies of lambda
+    expressions that are applied are walked a second time, to
+    substitute their arguments, and only where the substituted variables
+    occur. Bound variables are only renamed if they would capture a free
+    variable of a substituted argument. Parts of the expression without
+    applications or substitutions are shared with the result.
+
+    The result is alpha-equivalent to the one of simplify if simplify
+    reaches the beta-normal form.
+
+    The expression is walked with an explicit stack, so that deeply
+    nested expressions do not exceed the recursion limit of Python.
+    Only expressions other than variables, constants, applications,
+    binders, negations and binary operators are left to nltk.
+
+    >>> lp = nll.LogicParser()
+    >>> expr = lp.parse(r'(\\P Q. exists x. (P(x) & Q(x)))(\\x. taube(x))')
+    >>> betaNormalize(expr)
+    <LambdaExpression \\Q.exists x.(taube(x) & Q(x))>
+    >>> betaNormalize(lp.parse(r'\\Q. ((\\x. (P(x) & Q(x)))(peter))'))
+    <LambdaExpression \\Q.(P(peter) & Q(peter))>
+
+    Args:
+        expr: An nltk.sem.logic.Expression.
+
+    Returns:
+        The beta-normal nltk.sem.logic.Expression.
+    """
+    return _normalize(expr, {}, frozenset(), False)
+
+# The kinds of expressions.
+_APPLICATION = 0
+_VARIABLE = 1
+_CONSTANT = 2
+_BINDER = 3
+_NEGATION = 4
+_BINARY = 5
+_OTHER = 6
+
+# The kinds of the classes of expressions seen so far.
+_kinds = {}
+
+# The step of visiting an expression on the stack of _normalize. The
+# other steps build the normal form of an expression of a kind from
+# those of its parts.
+_VISIT = -1
+
+def _kind(expr):
+    """Return the kind of an expression."""
+    cls = expr.__class__
+    try:
+        return _kinds[cls]
+    except KeyError:
+        pass
+    if issubclass(cls, nll.ApplicationExpression):
+        kind = _APPLICATION
+    elif issubclass(cls, nll.ConstantExpression):
+        kind = _CONSTANT
+    elif issubclass(cls, nll.AbstractVariableExpression):
+        kind = _VARIABLE
+    elif issubclass(cls, nll.VariableBinderExpression):
+        kind = _BINDER
+    elif issubclass(cls, nll.NegatedExpression):
+        kind = _NEGATION
+    elif issubclass(cls, nll.BinaryExpression):
+        kind = _BINARY
+    else:
+        kind = _OTHER
+    _kinds[cls] = kind
+    return kind
+
+def _normalize(expr, env, envFree, normal):
+    """Normalize an expression under substitutions.
+
+    Args:
+        expr: An nltk.sem.logic.Expression.
+        env: A dictionary mapping Variables to the normal expressions
+            substituted for them.
+        envFree: A frozenset of the Variables free in the values of env.
+        normal: A bool denoting whether expr is normal already, so that
+            it only needs to be walked for the substitutions.
+    """
+    # The normal forms of the parts, the last one on top.
+    results = []
+    freeMemo = {}
+    # Each entry holds a step, an expression and the data of the step:
+    # env, envFree and normal to visit the expression with, or the
+    # Variable to build a binder with.
+    stack = [(_VISIT, expr, (env, envFree, normal))]
+    while stack:
+        step, expr, data = stack.pop()
+        if step == _APPLICATION:
+            argument = results.pop()
+            function = results.pop()
+            if _kind(function) == _BINDER and isinstance(function,
+                    nll.LambdaExpression):
+                # The normal form of the application is that of the
+                # normal body with the argument substituted.
+                variable = function.variable
+                if (_kind(argument) in (_VARIABLE, _CONSTANT)
+                        and argument.variable == variable):
+                    # The variable is substituted by itself.
+                    data = ({}, frozenset(), True)
+                else:
+                    data = ({variable: argument}, _free(argument, freeMemo),
+                            True)
+                stack.append((_VISIT, function.term, data))
+            elif function is expr.function and argument is expr.argument:
+                results.append(expr)
+            else:
+                results.append(nll.ApplicationExpression(function, argument))
+            continue
+        elif step == _BINDER:
+            term = results.pop()
+            if data is expr.variable and term is expr.term:
+                results.append(expr)
+            else:
+                results.append(expr.__class__(data, term))
+            continue
+        elif step == _NEGATION:
+            term = results.pop()
+            if term is expr.term:
+                results.append(expr)
+            else:
+                results.append(nll.NegatedExpression(term))
+            continue
+        elif step == _BINARY:
+            second = results.pop()
+            first = results.pop()
+            if first is expr.first and second is expr.second:
+                results.append(expr)
+            else:
+                results.append(expr.__class__(first, second))
+            continue
+
+        env, envFree, normal = data
+        kind = _kind(expr)
+        if normal and not env:
+            # Nothing is substituted in the normal expression.
+            results.append(expr)
+
+        elif kind == _APPLICATION:
+            stack.append((_APPLICATION, expr, None))
+            stack.append((_VISIT, expr.argument, data))
+            stack.append((_VISIT, expr.function, data))
+
+        elif kind == _VARIABLE or kind == _CONSTANT:
+            results.append(env.get(expr.variable, expr))
+
+        elif kind == _BINDER:
+            variable = expr.variable
+            if variable in env:
+                env = {v: e for v, e in env.items() if v != variable}
+            if variable in envFree:
+                # Rename the variable, so that it does not capture a free
+                # variable of a substituted expression.
+                newVariable = nll.unique_variable(pattern=variable,
+                        ignore=envFree)
+                env = dict(env)
+                env[variable] = nll.VariableExpression(newVariable)
+                envFree = envFree | {newVariable}
+                variable = newVariable
+            stack.append((_BINDER, expr, variable))
+            stack.append((_VISIT, expr.term, (env, envFree, normal)))
+
+        elif kind == _NEGATION:
+            stack.append((_NEGATION, expr, None))
+            stack.append((_VISIT, expr.term, data))
+
+        elif kind == _BINARY:
+            stack.append((_BINARY, expr, None))
+            stack.append((_VISIT, expr.second, data))
+            stack.append((_VISIT, expr.first, data))
+
+        else:
+            # Other expressions are left to nltk.
+            for variable, value in env.items():
+                expr = expr.replace(variable, value, True)
+            results.append(expr.simplify())
+    return results[0]
+
+def _free(expr, memo):
+    """Return the frozenset of the Variables free in an expression.
+
+    Like the free method of nltk, constants are not included. The
+    expression is walked with an explicit stack.
+
+    Args:
+        expr: An nltk.sem.logic.Expression.
+        memo: A dictionary mapping the ids of the expressions walked
+            before to pairs of the expression and its free Variables.
+            The expressions are kept, so that their ids are not reused.
+    """
+    root = expr
+    # The expressions whose free Variables are needed, the next one on
+    # top. An expression stays on the stack until those of its parts are
+    # known.
+    stack = [expr]
+    while stack:
+        expr = stack[-1]
+        if id(expr) in memo:
+            stack.pop()
+            continue
+        kind = _kind(expr)
+        if kind == _CONSTANT:
+            free = frozenset()
+        elif kind == _VARIABLE:
+            free = frozenset([expr.variable])
+        elif kind == _OTHER:
+            free = frozenset(expr.free())
+        else:
+            if kind == _APPLICATION:
+                parts = (expr.function, expr.argument)
+            elif kind == _BINARY:
+                parts = (expr.first, expr.second)
+            else:
+                parts = (expr.term,)
+            missing = [p for p in parts if id(p) not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            free = memo[id(parts[0])][1]
+            if len(parts) == 2:
+                free = free | memo[id(parts[1])][1]
+            if kind == _BINDER:
+                free = free - {expr.variable}
+        stack.pop()
+        memo[id(expr)] = (expr, free)
+    return memo[id(root)][1]
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Compilation of rule lists into generated Python code."""
+
+import itertools
+import linecache
+
+from .features import LABELS, graphFeatures
+
+# Numbers for the file names of the generated sources.
+_sourceNumbers = itertools.count()
+
+class CompiledRules:
+    """A list of rules compiled into a single Python function.
+
+    The conditions of all rules are written out as plain comparisons on
+    the values of a node in the source of one function, which returns
+    the number of the first rule whose conditions the node satisfies.
+    Conditions that cannot be written out this way, e. g. those with
+    custom subject functions, are called from the generated code.
+
+    Attributes:
+        rules: The list of SemRepRule objects that were compiled.
+        source: A string holding the generated Python source.
+        function: The compiled function. It takes a DependencyGraph and
+            an address and returns a rule number or -1.
+    """
+
+    def __init__(self, rules):
+        """Initialize CompiledRules by generating and compiling the source.
+
+        Args:
+            rules: A list of SemRepRule objects.
+
+        Returns:
+            The initialized CompiledRules.
+        """
+        self.rules = list(rules)
+        generator = _SourceGenerator()
+        self.source = generator.generate(self.rules)
+        # Register the source, so that it shows in tracebacks.
+        filename = '<montesniere rules {}>'.format(next(_sourceNumbers))
+        linecache.cache[filename] = (len(self.source), None,
+                self.source.splitlines(True), filename)
+        namespace = dict(generator.constants, graphFeatures=graphFeatures)
+        exec(compile(self.source, filename, 'exec'), namespace)
+        self.function = namespace['select']
+
+    def select(self, depGraph, address):
+        """Select the first rule whose conditions a node satisfies.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+            address: An integer denoting the address of a node in the
+                depGraph.
+
+        Returns:
+            The selected SemRepRule or None if no rule matches.
+        """
+        number = self.function(depGraph, address)
+        if number < 0:
+            return None
+        return self.rules[number]
+
+class _SourceGenerator:
+    """Generator of the source for CompiledRules.
+
+    Attributes:
+        constants: A dictionary mapping the names used in the source to
+            the objects they stand for.
+    """
+
+    def __init__(self):
+        self.constants = {}
+        self._names = {}
+
+    def generate(self, rules):
+        """Return the source of a function selecting from rules."""
+        lines = ['def select(depGraph, address):',
+                '    features = graphFeatures(depGraph)',
+                '    node = features.node(address)']
+        for n, r in enumerate(rules):
+            lines.append('    # Rule {}'.format(n))
+            conditions = getattr(r, 'testOrder', r.conditions)
+            if not conditions:
+                lines.append('    return {}'.format(n))
+                return '\n'.join(lines) + '\n'
+            for cond in conditions:
+                lines.append('    #   {}'.format(describe(cond)))
+            tests = [self.condition(c) for c in conditions]
+            lines.append('    if ({}):'.format(
+                '\n            and '.join(tests)))
+            lines.append('        return {}'.format(n))
+        lines.append('    return -1')
+        return '\n'.join(lines) + '\n'
+
+    def constant(self, prefix, value):
+        """Return the name under which the source refers to a value."""
+        key = (prefix, value)
+        try:
+            return self._names[key]
+        except KeyError:
+            name = '{}{}'.format(prefix, len(self._names))
+            self._names[key] = name
+            self.constants[name] = value
+            return name
+
+    def condition(self, cond):
+        """Return an expression testing a condition on node."""
+        path = getattr(cond.subj, 'path', None)
+        key = getattr(cond.subj, 'key', None)
+        test = None
+        if path is not None:
+            test = self.relation(cond.rel, cond.obj, key)
+        if test is None:
+            # Call the condition object itself.
+            return '{}(depGraph, address)'.format(
+                    self.constant('condition', cond))
+
+        expr = _traverse(test, 'node', path, 0)
+        if cond.transeunda:
+            transeunda = self.constant('transeunda',
+                    frozenset(cond.transeunda))
+            ancestor = 'a{}'.format(len(path))
+            expr = ('({} or any({} for {} in features.ancestors('
+                    'address, {})))').format(expr,
+                    _traverse(test, 'features.node({})'.format(ancestor),
+                        path, 0),
+                    ancestor, transeunda)
+        if cond.negated:
+            expr = 'not {}'.format(expr)
+        return expr
+
+    def relation(self, rel, obj, key):
+        """Return a test of a relation on a node or None.
+
+        The test is a format string with a single replacement field for
+        an expression evaluating to the node. The expression occurs only
+        once in the test.
+        """
+        if key != 'deps':
+            if rel == 'element':
+                return '({{}}[{!r}] in {})'.format(
+                        key, self.constant('values', frozenset(obj)))
+            elif rel == 'notElement':
+                return '({{}}[{!r}] not in {})'.format(
+                        key, self.constant('values', frozenset(obj)))
+            return None
+
+        mask = LABELS.mask(obj)
+        if rel == 'subset':
+            return '(features.depsMask({{}}) & {:#x} == 0)'.format(~mask)
+        elif rel == 'notSubset':
+            return '(features.depsMask({{}}) & {:#x} != 0)'.format(~mask)
+        elif rel == 'superset':
+            return '(features.depsMask({{}}) & {0:#x} == {0:#x})'.format(
+                    mask)
+        elif rel == 'notSuperset':
+            return '(features.depsMask({{}}) & {0:#x} != {0:#x})'.format(
+                    mask)
+        elif rel == 'cardinality':
+            cardinalities = set()
+            for o in obj:
+                try:
+                    cardinalities.add(int(o))
+                except ValueError:
+                    pass
+            return '(len({{}}[\'deps\']) in {})'.format(
+                    self.constant('cardinalities', frozenset(cardinalities)))
+        elif rel == 'notCardinality':
+            # Like makeNotCardinalityFixedObj, only use members that
+            # already are integers.
+            cardinalities = {o for o in obj if isinstance(o, int)}
+            return '(len({{}}[\'deps\']) not in {})'.format(
+                    self.constant('cardinalities', frozenset(cardinalities)))
+        elif rel == 'exist':
+            return '(len({}[\'deps\']) != 0)'
+        elif rel == 'notExist':
+            return '(len({}[\'deps\']) == 0)'
+        return None
+
+def _traverse(test, node, path, depth):
+    """Return an expression applying test to the nodes at a path.
+
+    Args:
+        test: A test as returned by _SourceGenerator.relation.
+        node: An expression evaluating to the start node.
+        path: The path of a subject.
+        depth: The number of the path element to start with.
+    """
+    for i in range(depth, len(path)):
+        if path[i] == '^':
+            node = 'features.parent({})'.format(node)
+        else:
+            child = 'n{}'.format(i)
+            return 'any({} for {} in features.children({}, {!r}))'.format(
+                    _traverse(test, child, path, i + 1), child, node,
+                    path[i])
+    return test.format(node)
+
+def describe(cond):
+    """Return a string describing a condition like in the rule files.
+
+    >>> from .condition import Condition
+    >>> describe(Condition.fromstring('! ^.NK.tag element^{NK} {ART, PIAT}'))
+    '! ^.NK.tag element^{NK} {ART, PIAT}'
+    """
+    path = getattr(cond.subj, 'path', None)
+    if path is None:
+        subj = repr(cond.subj)
+    else:
+        subj = '.'.join(path + (cond.subj.key,))
+    transeunda = ''
+    if cond.transeunda:
+        transeunda = '^{{{}}}'.format(', '.join(sorted(cond.transeunda)))
+    return '{}{} {}{} {{{}}}'.format('! ' if cond.negated else '', subj,
+            cond.rel, transeunda, ', '.join(sorted(map(str, cond.obj))))
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -5,6 +5,8 @@
 
 import re
 
+from .features import LABELS, graphFeatures
+
 def makeElementFixedObj(obj):
     """
     >>> alphabet = {chr(n) for n in range(0x61, 0x61 + 26)}
@@ -117,6 +119,111 @@ def makeNotExist(obj):
         return not bool(subj)
     return notExist
 
+def makeElementFixedMask(obj):
+    """
+    >>> inNouns = makeElementFixedMask({'NN', 'NE'})
+    >>> inNouns(LABELS.bit('NE'))
+    True
+    >>> inNouns(LABELS.bit('ART'))
+    False
+    """
+    objMask = LABELS.mask(obj)
+    def elementFixedMask(subjMask):
+        return subjMask & objMask != 0
+    return elementFixedMask
+
+def makeNotElementFixedMask(obj):
+    objMask = LABELS.mask(obj)
+    def notElementFixedMask(subjMask):
+        return subjMask & objMask == 0
+    return notElementFixedMask
+
+def makeSubsetFixedMask(obj):
+    """
+    >>> subNominal = makeSubsetFixedMask({'NK', 'MNR'})
+    >>> subNominal(LABELS.mask({'NK'}))
+    True
+    >>> subNominal(LABELS.mask({'NK', 'SB'}))
+    False
+    """
+    objMask = LABELS.mask(obj)
+    def subsetFixedMask(subjMask):
+        return subjMask & ~objMask == 0
+    return subsetFixedMask
+
+def makeNotSubsetFixedMask(obj):
+    objMask = LABELS.mask(obj)
+    def notSubsetFixedMask(subjMask):
+        return subjMask & ~objMask != 0
+    return notSubsetFixedMask
+
+def makeSupersetFixedMask(obj):
+    """
+    >>> superTransitive = makeSupersetFixedMask({'SB', 'OA'})
+    >>> superTransitive(LABELS.mask({'SB', 'OA', 'DA'}))
+    True
+    >>> superTransitive(LABELS.mask({'SB'}))
+    False
+    """
+    objMask = LABELS.mask(obj)
+    def supersetFixedMask(subjMask):
+        return subjMask & objMask == objMask
+    return supersetFixedMask
+
+def makeNotSupersetFixedMask(obj):
+    objMask = LABELS.mask(obj)
+    def notSupersetFixedMask(subjMask):
+        return subjMask & objMask != objMask
+    return notSupersetFixedMask
+
+def makeCardinalityFixedMask(obj):
+    """
+    >>> cardinalityOne = makeCardinalityFixedMask({'1'})
+    >>> cardinalityOne(LABELS.mask({'NK'}))
+    True
+    >>> cardinalityOne(LABELS.mask({'NK', 'MNR'}))
+    False
+    """
+    # The cardinalities are looked up as bits of an integer.
+    objMask = 0
+    for o in obj:
+        try:
+            objMask |= 1 << int(o)
+        except ValueError:
+            pass
+    def cardinalityFixedMask(subjMask):
+        return (1 << _popcount(subjMask)) & objMask != 0
+    return cardinalityFixedMask
+
+def makeNotCardinalityFixedMask(obj):
+    # Like makeNotCardinalityFixedObj, only use members that already are
+    # integers.
+    objMask = 0
+    for o in obj:
+        if isinstance(o, int):
+            objMask |= 1 << o
+    def notCardinalityFixedMask(subjMask):
+        return (1 << _popcount(subjMask)) & objMask == 0
+    return notCardinalityFixedMask
+
+def makeExistMask(obj):
+    def existMask(subjMask):
+        return subjMask != 0
+    return existMask
+
+def makeNotExistMask(obj):
+    def notExistMask(subjMask):
+        return subjMask == 0
+    return notExistMask
+
+def _popcount(n):
+    """Return the number of set bits in a non-negative integer."""
+    try:
+        return n.bit_count()
+    except AttributeError:
+        # Python versions before 3.10
+        return bin(n).count('1')
+
 class Condition():
     """A condition for nodes of an nltk.parse.DependencyGraph.
 
@@ -141,6 +248,11 @@ class Condition():
         relationFixedObj: A unary function that already incorporates the
             attribute obj. Applied to a subject, it evaluates to True or
             False, depending on the function and the fixed object.
+        relationFixedMask: A unary function like relationFixedObj, but
+            applied to the label mask of the subject (see
+            montesniere.features), or None if the condition cannot be
+            decided on label masks. Only subjects read from subject
+            strings are decided on label masks.
     """
     # TODO: Describe better what transeunda are used for.
 
@@ -179,6 +291,28 @@ class Condition():
             'notExist' : makeNotExist
             }
 
+    # These dictionaries map the relations that can be decided on label masks
+    # to the factory functions producing a version of the relation that takes
+    # the mask of the subject. The first dictionary is used for the label sets
+    # of the 'deps' key, the second for single labels under other keys.
+    setMaskRelationDict = {
+            'subset': makeSubsetFixedMask,
+            'notSubset': makeNotSubsetFixedMask,
+            'superset': makeSupersetFixedMask,
+            'notSuperset': makeNotSupersetFixedMask,
+            'cardinality': makeCardinalityFixedMask,
+            'notCardinality': makeNotCardinalityFixedMask,
+            'exist': makeExistMask,
+            'notExist' : makeNotExistMask
+            }
+    labelMaskRelationDict = {
+            'element': makeElementFixedMask,
+            'notElement': makeNotElementFixedMask
+            }
+
+    # Keys whose values are single labels.
+    labelKeys = {'tag', 'rel'}
+
     def __init__(self, subj, rel, obj, transeunda=frozenset(), negated=False):
         """Initialize Condition with the given values.
 
@@ -200,9 +334,26 @@ class Condition():
         self.rel = rel
         self.obj = obj
         self.transeunda = transeunda
+        self._transeundaKey = frozenset(transeunda)
         self.negated = negated
         objFixer = Condition.relationDict[self.rel]
         self.relationFixedObj = objFixer(self.obj)
+        self.relationFixedMask = None
+        # Only subject functions read from subject strings take a mask,
+        # other callable subjects are called with relationFixedObj only.
+        if getattr(self.subj, 'path', None) is None:
+            key = None
+        else:
+            key = self.subj.key
+        if key == 'deps':
+            maskFixer = Condition.setMaskRelationDict.get(self.rel)
+        elif key in Condition.labelKeys:
+            maskFixer = Condition.labelMaskRelationDict.get(self.rel)
+        else:
+            maskFixer = None
+        if maskFixer is not None:
+            self.relationFixedMask = maskFixer(self.obj)
+        self._hash = hash(self._identity())
 
     @classmethod
     def fromstring(cls, conditionString):
@@ -221,6 +372,41 @@ class Condition():
     def __str__(self):
         neg = '! ' if self.negated else ''
         return '{1}{0.subj} {0.rel}^{0.transeunda} {0.obj}'.format(self, neg)
+
+    def __eq__(self, other):
+        """Conditions are equal if they are bound to test the same."""
+        if not isinstance(other, Condition):
+            return NotImplemented
+        return self._identity() == other._identity()
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        """Pickle the condition by its subject string if it has one.
+
+        Subject functions read from subject strings cannot be pickled, so
+        they are read again when the condition is unpickled.
+        """
+        args = (self.rel, self.obj, self.transeunda, self.negated)
+        try:
+            subjString = '.'.join(self.subj.path + (self.subj.key,))
+        except AttributeError:
+            return (Condition, (self.subj,) + args)
+        return (_fromSubjString, (subjString,) + args)
+
+    def _identity(self):
+        """Return a hashable tuple determining what this condition tests.
+
+        Subjects read from a subject string are identified by their path
+        and key, all other subjects by the function itself.
+        """
+        try:
+            subj = (self.subj.path, self.subj.key)
+        except AttributeError:
+            subj = self.subj
+        return (self.negated, subj, self.rel, frozenset(self.transeunda),
+                frozenset(self.obj))
     
     def __call__(self, depGraph, address):
         """Test if a node of a DependencyGraph satisfies this condition.
@@ -232,17 +418,26 @@ class Condition():
         Returns:
             True, if the condition is satisfied; False otherwise.
         """
-        node = depGraph.get_by_address(address)
-        satisfied = self.subj(depGraph, address, self.relationFixedObj)
-        while node['rel'] in self.transeunda:
-            node = depGraph.get_by_address(node['head'])
-            satisfied = satisfied or self.subj(
-                    depGraph, node['address'], self.relationFixedObj)
+        satisfied = self._testSubj(depGraph, address)
+        if not satisfied and self.transeunda:
+            ancestors = graphFeatures(depGraph).ancestors(
+                    address, self._transeundaKey)
+            for a in ancestors:
+                if self._testSubj(depGraph, a):
+                    satisfied = True
+                    break
 
         if self.negated:
             return not satisfied
         else:
             return satisfied
+
+    def _testSubj(self, depGraph, address):
+        """Apply the relation to the subject of a node."""
+        if self.relationFixedMask is None:
+            return self.subj(depGraph, address, self.relationFixedObj)
+        return self.subj(depGraph, address, self.relationFixedObj,
+                self.relationFixedMask)
             
     def _testSubjSet(self, subjSet):
         """Test if a set satisfies the condition.
@@ -310,46 +505,147 @@ class Condition():
             raise ValueError(errMsg.format(conditionString))
         return negated, subj, rel, transeunda, obj
 
+class ConditionTable:
+    """A table of shared Condition objects.
+
+    A ConditionTable hands out a single Condition object for all equal
+    conditions, so that rules using the same condition share it and
+    results can be cached per condition.
+
+    >>> table = ConditionTable()
+    >>> c1 = table.fromstring('tag element {NN, NE}')
+    >>> c2 = table.fromstring('tag  element {NE,NN}')
+    >>> c1 is c2
+    True
+    >>> len(table)
+    1
+    """
+
+    def __init__(self):
+        """Initialize an empty ConditionTable."""
+        self._byString = {}
+        self._conditions = {}
+
+    def fromstring(self, conditionString):
+        """Return the shared Condition for a condition string.
+
+        Args:
+            conditionString: A string representing a condition.
+
+        Returns:
+            A Condition object.
+        """
+        try:
+            return self._byString[conditionString]
+        except KeyError:
+            pass
+        cond = self.intern(Condition.fromstring(conditionString))
+        self._byString[conditionString] = cond
+        return cond
+
+    def intern(self, cond):
+        """Return the shared Condition equal to cond.
+
+        If the table does not yet contain an equal condition, cond is
+        added to the table and returned.
+        """
+        return self._conditions.setdefault(cond, cond)
+
+    def __len__(self):
+        return len(self._conditions)
+
+    def __iter__(self):
+        return iter(self._conditions)
+
+def _fromSubjString(subjString, rel, obj, transeunda, negated):
+    """Return a Condition with the subject read from a subject string."""
+    return Condition(_getSubj(subjString), rel, obj, transeunda, negated)
+
 def _getSubj(subjString):
-    """Return a subject function from a subject string."""
+    """Return a subject function from a subject string.
+
+    The returned function has the attributes path (a tuple of the path
+    elements to traverse) and key (the key looked up in the final nodes).
+
+    >>> s = _getSubj('^.NK.tag')
+    >>> (s.path, s.key)
+    (('^', 'NK'), 'tag')
+    """
     # toTraverse contains the paths to the final node.
     toTraverse = [s.strip() for s in subjString.split('.')]
     # The last element is not a path and functions as a key for the
     # dict that is the final node.
     key = toTraverse.pop(-1)
 
+    walk = _compilePath(tuple(toTraverse))
+
     # Define the subject function
-    def subj(depGraph, address, relationFixedObj):
-        nodes = [depGraph.get_by_address(address)]
-        for t in toTraverse:
-            newNodes = []
-            if t == '^':
-                for n in nodes:
-                    try:
-                        newNodes.append(depGraph.get_by_address(n['head']))
-                    except KeyError:
-                        pass
-            else:
-                for n in nodes:
-                    try:
-                        newNodes.extend(
-                                [depGraph.get_by_address(a)
-                                    for a in n['deps'][t]]
-                                )
-                    except KeyError:
-                        pass
-            nodes = newNodes
-
-        subjElms = [n[key] for n in nodes]
-        subjElms = [set(s.keys()) if isinstance(s, dict) else s
-                for s in subjElms]
-        bools = {relationFixedObj(s) for s in subjElms}
-        return any(bools)
+    def subj(depGraph, address, relationFixedObj, relationFixedMask=None):
+        features = graphFeatures(depGraph)
+        return walk(features, features.node(address), key, relationFixedObj,
+                relationFixedMask)
+
+    # Expose the path and the key so that the structure of the subject can be
+    # inspected, e. g. for indexing rules.
+    subj.path = tuple(toTraverse)
+    subj.key = key
 
     # Return the subject function that now knows about the nodes it has to
     # traverse.
     return subj
 
+def _compilePath(path):
+    """Compile a path of a subject string into a traversal function.
+
+    The returned function takes GraphFeatures, a start node and the
+    arguments of _testNode apart from the features and the node. It
+    returns True as soon as one of the nodes reached by following the
+    path from the start node passes _testNode, and False if none does.
+
+    The traversal function is built as a chain of one small function per
+    path element, each passing the nodes it reaches on to the next one.
+
+    Args:
+        path: A tuple of path elements, each either '^' (go to the head)
+            or a dependency label (go to the dependents with that label).
+
+    Returns:
+        The traversal function.
+    """
+    walk = _testNode
+    for t in reversed(path):
+        if t == '^':
+            walk = _makeUpStep(walk)
+        else:
+            walk = _makeDownStep(t, walk)
+    return walk
+
+def _makeUpStep(walk):
+    """Return a traversal function going to the head first."""
+    def upStep(features, node, key, relationFixedObj, relationFixedMask):
+        return walk(features, features.parent(node), key, relationFixedObj,
+                relationFixedMask)
+    return upStep
+
+def _makeDownStep(label, walk):
+    """Return a traversal function going to the dependents first."""
+    def downStep(features, node, key, relationFixedObj, relationFixedMask):
+        for child in features.children(node, label):
+            if walk(features, child, key, relationFixedObj,
+                    relationFixedMask):
+                return True
+        return False
+    return downStep
+
+def _testNode(features, node, key, relationFixedObj, relationFixedMask):
+    """Apply a relation to the value of a node under key."""
+    if relationFixedMask is not None:
+        return relationFixedMask(features.mask(node, key))
+    value = node[key]
+    if isinstance(value, dict):
+        value = set(value.keys())
+    return relationFixedObj(value)
+
 def buildSet(setString):
     """Build a set of strings from a string representation of a set.
 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Compilation of ordered rule lists into decision DAGs."""
+
+from .index import indexableKey
+
+# Keys of a node whose values can be switched on directly.
+SWITCH_KEYS = {'tag', 'rel', 'lemma'}
+
+# The default for the most states a DecisionDAG may have.
+MAX_STATES = 10000
+
+class DecisionDAG:
+    """A decision DAG selecting the first rule whose conditions hold.
+
+    The DAG is built from an ordered list of SemRepRule objects. Each
+    inner vertex either tests a single Condition and branches on the
+    result or switches on the value of a node's 'tag', 'rel' or 'lemma',
+    which decides all plain element conditions on that key at once.
+    Each leaf holds the rule to apply or None if no rule matches.
+
+    On every path from the root to a leaf, each distinct condition is
+    tested at most once, whatever the number of rules sharing it.
+    Identical sub-decisions are shared, so the vertices form a DAG
+    rather than a tree.
+
+    The DAG has a vertex for each state of the rules, i. e. each
+    combination of rules that can still match with the conditions of
+    them that are not decided yet. The number of states can grow
+    exponentially with the number of distinct conditions, so building
+    stops with a TooManyStatesException once maxStates is exceeded. The
+    heuristic rules have 147 states.
+
+    Attributes:
+        rules: The list of SemRepRule objects the DAG was built from.
+        root: The root vertex of the DAG.
+        size: The number of distinct vertices in the DAG.
+        depth: The maximal number of tests on a path through the DAG.
+    """
+
+    def __init__(self, rules, maxStates=None):
+        """Initialize DecisionDAG by compiling the rules.
+
+        Args:
+            rules: A list of SemRepRule objects.
+            maxStates: The most states the DAG may have or None for
+                MAX_STATES. Default: None
+
+        Returns:
+            The initialized DecisionDAG.
+
+        Raises:
+            TooManyStatesException if the DAG would have more than
+                maxStates states.
+        """
+        self.rules = list(rules)
+        self.maxStates = MAX_STATES if maxStates is None else maxStates
+        self._vertices = {}
+        state = tuple(
+                (n, frozenset(r.conditions)) for n, r in enumerate(self.rules))
+        self.root = self._build(_truncate(state))
+        self.size = len(self._vertices)
+        self.depth = self.root.depth
+        del self._vertices
+
+    def select(self, depGraph, address):
+        """Select the first rule whose conditions a node satisfies.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+            address: An integer denoting the address of a node in the
+                depGraph.
+
+        Returns:
+            The selected SemRepRule or None if no rule matches.
+        """
+        vertex = self.root
+        node = depGraph.get_by_address(address)
+        while True:
+            if isinstance(vertex, _Test):
+                if vertex.condition(depGraph, address):
+                    vertex = vertex.ifTrue
+                else:
+                    vertex = vertex.ifFalse
+            elif isinstance(vertex, _Switch):
+                vertex = vertex.branches.get(node[vertex.key], vertex.default)
+            else:
+                return vertex.rule
+
+    def _build(self, state):
+        """Build the vertex deciding a state and those below it.
+
+        A state is a tuple of pairs of a rule number and the set of
+        conditions of that rule that are not decided yet. Rules that
+        have already failed are not part of the state.
+
+        The states are expanded depth-first with an explicit stack, so
+        that long chains of conditions do not exceed the recursion limit
+        of Python. The vertex of a state is built once those of all
+        states following it are, and memoized.
+        """
+        # The states expanded but not built yet, mapped to the function
+        # building their vertex and the states following them.
+        expanded = {}
+        stack = [state]
+        while stack:
+            current = stack[-1]
+            if current in self._vertices:
+                stack.pop()
+                continue
+            if current not in expanded:
+                if len(self._vertices) + len(expanded) >= self.maxStates:
+                    raise TooManyStatesException(
+                            'The decision DAG has more than {} states.'
+                            .format(self.maxStates))
+                expanded[current] = self._expand(current)
+                following = [s for s in expanded[current][1]
+                        if s not in self._vertices]
+                if following:
+                    stack.extend(following)
+                    continue
+            stack.pop()
+            make, following = expanded.pop(current)
+            self._vertices[current] = make(
+                    [self._vertices[s] for s in following])
+        return self._vertices[state]
+
+    def _expand(self, state):
+        """Return how to build the vertex deciding a state.
+
+        Returns:
+            A pair of a function building the vertex from a list of the
+            vertices of the following states and the following states.
+        """
+        if not state:
+            return (lambda vertices: _Leaf(None)), ()
+        number, open_ = state[0]
+        if not open_:
+            rule = self.rules[number]
+            return (lambda vertices: _Leaf(rule)), ()
+        # Decide the first open condition of the first candidate rule
+        # next, as the linear scan would.
+        cond = next(c for c in self.rules[number].conditions if c in open_)
+        key = indexableKey(cond)
+        if key in SWITCH_KEYS:
+            return self._expandSwitch(state, key)
+        following = (_decide(state, {cond: True}),
+                _decide(state, {cond: False}))
+        return (lambda vertices: _Test(cond, *vertices)), following
+
+    def _expandSwitch(self, state, key):
+        """Return how to build a vertex switching on a node's value under
+        key."""
+        conds = {c for _, open_ in state for c in open_
+                if indexableKey(c) == key}
+        values = set()
+        for c in conds:
+            values.update(c.obj)
+        values = list(values)
+        following = []
+        for v in values:
+            results = {c: bool(c.relationFixedObj(v)) for c in conds}
+            following.append(_decide(state, results))
+        # An object that is not mentioned in any condition.
+        other = object()
+        results = {c: bool(c.relationFixedObj(other)) for c in conds}
+        following.append(_decide(state, results))
+
+        def make(vertices):
+            return _Switch(key, dict(zip(values, vertices)), vertices[-1])
+        return make, following
+
+def _decide(state, results):
+    """Return the state after some conditions were decided."""
+    newState = []
+    for number, open_ in state:
+        decided = open_.intersection(results)
+        if any(not results[c] for c in decided):
+            # The rule cannot match anymore.
+            continue
+        newState.append((number, open_ - decided))
+    return _truncate(tuple(newState))
+
+def _truncate(state):
+    """Drop the rules after the first rule without open conditions."""
+    for i, (_, open_) in enumerate(state):
+        if not open_:
+            return state[:i + 1]
+    return state
+
+class TooManyStatesException(Exception):
+    pass
+
+class _Leaf:
+    depth = 0
+
+    def __init__(self, rule):
+        self.rule = rule
+
+class _Test:
+
+    def __init__(self, condition, ifTrue, ifFalse):
+        self.condition = condition
+        self.ifTrue = ifTrue
+        self.ifFalse = ifFalse
+        self.depth = 1 + max(ifTrue.depth, ifFalse.depth)
+
+class _Switch:
+
+    def __init__(self, key, branches, default):
+        self.key = key
+        self.branches = branches
+        self.default = default
+        self.depth = 1 + max(
+                [default.depth] + [b.depth for b in branches.values()])
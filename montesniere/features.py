@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Interned labels and cached features of DependencyGraph nodes."""
+
+# The tags of the Stuttgart-Tübingen-Tagset.
+STTS_TAGS = (
+        'ADJA', 'ADJD', 'ADV', 'APPR', 'APPRART', 'APPO', 'APZR', 'ART',
+        'CARD', 'FM', 'ITJ', 'KOUI', 'KOUS', 'KON', 'KOKOM', 'NN', 'NE',
+        'PDS', 'PDAT', 'PIS', 'PIAT', 'PIDAT', 'PPER', 'PPOSS', 'PPOSAT',
+        'PRELS', 'PRELAT', 'PRF', 'PWS', 'PWAT', 'PWAV', 'PAV', 'PTKZU',
+        'PTKNEG', 'PTKVZ', 'PTKANT', 'PTKA', 'TRUNC', 'VVFIN', 'VVIMP',
+        'VVINF', 'VVIZU', 'VVPP', 'VAFIN', 'VAIMP', 'VAINF', 'VAPP', 'VMFIN',
+        'VMINF', 'VMPP', 'XY', '$,', '$.', '$(')
+
+# The edge labels of the TIGER annotation scheme and the labels used for
+# roots and punctuation by our parses.
+TIGER_LABELS = (
+        'AC', 'ADC', 'AG', 'AMS', 'APP', 'AVC', 'CC', 'CD', 'CJ', 'CM', 'CP',
+        'CVC', 'DA', 'DM', 'EP', 'JU', 'MNR', 'MO', 'NG', 'NK', 'NMC', 'OA',
+        'OA2', 'OC', 'OG', 'OP', 'PAR', 'PD', 'PG', 'PH', 'PM', 'PNC', 'RC',
+        'RE', 'RS', 'SB', 'SBP', 'SP', 'SVP', 'UC', 'VO', 'ROOT', '--',
+        'PUNC')
+
+class LabelVocabulary:
+    """A vocabulary assigning a bit to each label.
+
+    Sets of labels are represented as integers in which the bits of
+    their members are set. Labels that are not yet in the vocabulary are
+    added when they are first encountered.
+
+    >>> vocabulary = LabelVocabulary(['SB', 'OA'])
+    >>> vocabulary.mask({'SB', 'OA'})
+    3
+    >>> vocabulary.mask(['DA'])
+    4
+    """
+
+    def __init__(self, labels=()):
+        """Initialize LabelVocabulary with some labels.
+
+        Args:
+            labels: An iterable of labels, e. g. strings, that are added
+                to the vocabulary in the given order.
+        """
+        self._bits = {}
+        for label in labels:
+            self.bit(label)
+
+    def bit(self, label):
+        """Return the integer with only the bit of label set."""
+        try:
+            return self._bits[label]
+        except KeyError:
+            bit = 1 << len(self._bits)
+            self._bits[label] = bit
+            return bit
+
+    def mask(self, labels):
+        """Return the integer with the bits of all labels set."""
+        mask = 0
+        for label in labels:
+            mask |= self.bit(label)
+        return mask
+
+    def __len__(self):
+        return len(self._bits)
+
+    def __contains__(self, label):
+        return label in self._bits
+
+# The vocabulary shared by all conditions and graphs.
+LABELS = LabelVocabulary(STTS_TAGS + TIGER_LABELS)
+
+class GraphFeatures:
+    """Cached features of the nodes of one DependencyGraph.
+
+    Besides the label masks, GraphFeatures provide an adjacency of the
+    nodes for traversing the graph. Unlike depGraph.get_by_address, it
+    never adds nodes or labels to the graph: Addresses that are not in
+    the graph, e. g. the head of the root, lead to an empty node that is
+    shared by the whole graph.
+
+    Attributes:
+        depGraph: The nltk.parse.DependencyGraph object.
+        vocabulary: The LabelVocabulary used for the masks.
+    """
+
+    def __init__(self, depGraph, vocabulary=LABELS):
+        """Initialize GraphFeatures for a DependencyGraph.
+
+        Args:
+            depGraph: An nltk.parse.DependencyGraph object.
+            vocabulary: The LabelVocabulary to use. Default: LABELS
+        """
+        self.depGraph = depGraph
+        self.vocabulary = vocabulary
+        self._depsMasks = {}
+        self._ancestors = {}
+        # The node nltk creates for addresses that are not in the graph.
+        self._missing = depGraph.nodes.default_factory()
+
+    def node(self, address):
+        """Return the node at an address without adding it to the graph."""
+        node = self.depGraph.nodes.get(address)
+        if node is None:
+            return self._missing
+        return node
+
+    def parent(self, node):
+        """Return the head of a node."""
+        return self.node(node['head'])
+
+    def children(self, node, label):
+        """Return the dependents of a node under a label."""
+        return [self.node(a) for a in node['deps'].get(label, ())]
+
+    def ancestors(self, address, transeunda):
+        """Return the heads reached by climbing over transeunda.
+
+        Starting at the node at address, the head is climbed to as long
+        as the 'rel' of the current node is in transeunda. The chain is
+        computed once per address and set of transeunda, so later
+        changes to the heads or rels of the graph are not reflected.
+
+        Args:
+            address: The address of the node to start at.
+            transeunda: A frozenset of dependency labels.
+
+        Returns:
+            A tuple of the addresses of the heads in the order they are
+            reached.
+        """
+        try:
+            return self._ancestors[address, transeunda]
+        except KeyError:
+            pass
+        chain = []
+        seen = {address}
+        node = self.node(address)
+        while node['rel'] in transeunda and node['head'] not in seen:
+            seen.add(node['head'])
+            chain.append(node['head'])
+            node = self.node(node['head'])
+        chain = tuple(chain)
+        self._ancestors[address, transeunda] = chain
+        return chain
+
+    def depsMask(self, node):
+        """Return the mask of the labels in a node's deps.
+
+        The mask is computed again if the node's deps have changed since
+        it was cached.
+        """
+        deps = node['deps']
+        try:
+            cachedDeps, length, mask = self._depsMasks[node['address']]
+            if cachedDeps is deps and length == len(deps):
+                return mask
+        except KeyError:
+            pass
+        mask = self.vocabulary.mask(deps)
+        self._depsMasks[node['address']] = (deps, len(deps), mask)
+        return mask
+
+    def mask(self, node, key):
+        """Return the mask of a node's value under key.
+
+        For 'deps', this is the mask of the dependency labels. For all
+        other keys, it is the bit of the value itself.
+        """
+        if key == 'deps':
+            return self.depsMask(node)
+        return self.vocabulary.bit(node[key])
+
+def graphFeatures(depGraph):
+    """Return the GraphFeatures of a DependencyGraph.
+
+    The GraphFeatures are created when they are first requested and
+    stored on the graph, so all conditions share them.
+    """
+    try:
+        return depGraph.montesniereFeatures
+    except AttributeError:
+        features = GraphFeatures(depGraph)
+        depGraph.montesniereFeatures = features
+        return features
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Indexes narrowing down the rules that can match a node."""
+
+# Relations whose result for a plain node value can be decided when the rules
+# are loaded.
+INDEXABLE_RELATIONS = {'element', 'notElement'}
+
+class RuleIndex:
+    """An index from a node's own features to the rules that could match.
+
+    For each indexed key (the node's 'tag' and 'rel'), the index knows
+    which rules can still be satisfied by a node with a given value under
+    that key. Only conditions of the form 'tag element {...}' or
+    'rel notElement {...}' are used for this: conditions that are
+    negated, that have transeunda or that traverse to other nodes never
+    exclude a rule from the candidates, so these rules are always tested.
+
+    The candidates for a node are ordered like the rules the index was
+    built from, so that testing them in order keeps the first-match
+    semantics of SemRepAssigner.
+
+    Attributes:
+        rules: The list of SemRepRule objects the index was built from.
+        keys: A tuple of the indexed keys.
+    """
+
+    keys = ('tag', 'rel')
+
+    def __init__(self, rules):
+        """Initialize RuleIndex by inspecting the conditions of the rules.
+
+        Args:
+            rules: A list of SemRepRule objects.
+
+        Returns:
+            The initialized RuleIndex.
+        """
+        self.rules = list(rules)
+        # For each key, a dict mapping values mentioned in conditions to
+        # the set of rule numbers allowing them and the set of rule
+        # numbers allowing any other value.
+        self._buckets = {}
+        for key in self.keys:
+            constraints = [
+                    [c for c in r.conditions if indexableKey(c) == key]
+                    for r in self.rules]
+            values = set()
+            for conds in constraints:
+                for c in conds:
+                    values.update(c.obj)
+            buckets = {v: _allowing(constraints, v) for v in values}
+            # An object that is not mentioned in any condition.
+            default = _allowing(constraints, object())
+            self._buckets[key] = (buckets, default)
+        self._candidates = {}
+
+    def candidates(self, node):
+        """Return the rules that could match a node.
+
+        Args:
+            node: A node of an nltk.parse.DependencyGraph object.
+
+        Returns:
+            A list of SemRepRule objects in their original order.
+        """
+        values = tuple(node[key] for key in self.keys)
+        try:
+            return self._candidates[values]
+        except KeyError:
+            pass
+        numbers = None
+        for key, value in zip(self.keys, values):
+            buckets, default = self._buckets[key]
+            allowed = buckets.get(value, default)
+            numbers = allowed if numbers is None else numbers & allowed
+        candidates = [self.rules[n] for n in sorted(numbers)]
+        self._candidates[values] = candidates
+        return candidates
+
+def indexableKey(cond):
+    """Return the key a condition can be indexed under or None.
+
+    A condition can be indexed, if it is not negated, has no transeunda,
+    does not traverse to other nodes and uses a relation whose result
+    only depends on the node's value under the key.
+
+    Args:
+        cond: A Condition object.
+
+    Returns:
+        The key (a string) or None if the condition cannot be indexed.
+    """
+    if cond.negated or cond.transeunda or cond.rel not in INDEXABLE_RELATIONS:
+        return None
+    path = getattr(cond.subj, 'path', None)
+    if path is None or len(path) > 0:
+        return None
+    return cond.subj.key
+
+def _allowing(constraints, value):
+    """Return the numbers of the rules whose constraints allow a value."""
+    return frozenset(
+            n for n, conds in enumerate(constraints)
+            if all(c.relationFixedObj(value) for c in conds))
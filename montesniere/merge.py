@@ -1,13 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8
 
-import copy
+import collections
 import itertools
+import sys
 
 from nltk.grammar import DependencyGrammar
 import nltk.parse as nlp
 import nltk.sem.logic as nll
 
+from .beta import betaNormalize
+from .semparse import SemRepParser
+from .semtypes import TYPES, internSignature, internType, sameType
+from .terms import TermTable
+
+tlp = SemRepParser(type_check=True)
+
+# The most plans, and the most impossible merges, that SemMergers keep
+# across sentences.
+PLAN_CACHE_SIZE = 1024
+
+# The most nodes and memoized results of the TermTable that SemMergers
+# with useTerms share across sentences. They take roughly 130 bytes
+# each, so that the table stays below about 15 MiB.
+TERM_TABLE_SIZE = 100000
+
 class SemMerger:
     """ Combines the logical expressions of each node and returns
     al logical expression of the entire sentence.
@@ -19,9 +36,38 @@ class SemMerger:
         dg: a nltk.parse.dependencygraph.DependencyGraph 
             object with logical expression assigned to each node.
         dependencies: a list of nodes being currenlty processed
+        planCounters: a dict counting the 'hits', 'misses' and
+            'explored' states of the MergePlanners of all merges and
+            the merges whose plan was 'cached'
+        deferNormalization: a bool denoting whether merges are left
+            unsimplified and only the semantics of the entire sentence
+            is beta-normalized
+        useTerms: a bool denoting whether merges are done on the terms
+            of montesniere.terms instead of nltk expressions
+        terms: the montesniere.terms.TermTable holding the terms of the
+            sentence, and those of earlier ones, if useTerms is True;
+            None otherwise
     """
+
+    # The plans of merges, shared by all SemMergers. Plans are found
+    # under the ids of the interned types of the expressions in order,
+    # as the plan depends on the order. Types that cannot be merged in
+    # any order are remembered by their sorted ids. Both hold at most
+    # PLAN_CACHE_SIZE entries and discard the least recently used one
+    # first. An entry holds a tuple of ids and a plan of one step less
+    # than the number of expressions, i. e. a few hundred bytes for
+    # usual numbers of dependents, so that the caches stay below a few
+    # MiB. The interned types are never discarded, so their ids are
+    # not reused.
+    _plans = collections.OrderedDict()
+    _impossible = collections.OrderedDict()
+    # The TermTable shared by the SemMergers with useTerms, so that the
+    # terms and normal forms of the rules are reused across sentences.
+    # It is replaced by an empty one for the next SemMerger once it
+    # holds more than TERM_TABLE_SIZE nodes and memoized results.
+    _termTable = None
         
-    def __init__(self, depGraph):
+    def __init__(self, depGraph, deferNormalization=False, useTerms=False):
         """Initializes SemMerger with given values. 
         dependencyGraph has to be an preprocessed DependencyGraph object
         with each node having a logical expression (semrep)
@@ -29,6 +75,21 @@ class SemMerger:
         Args:
             depedencyGraph: a nltk.parse.dependencygraph.DependencyGraph 
                 that has been preprocessed by a SemRepAssigner object
+            deferNormalization: a bool denoting whether the applications
+                of the merges are built without simplifying them. The
+                'mergedsemrep' of the root is then beta-normalized once
+                by getSemantics; those of the other nodes stay
+                unsimplified. Default: False
+            useTerms: a bool denoting whether the semreps are converted
+                into terms of a TermTable, which are applied to each
+                other and normalized instead of nltk expressions. The
+                table is shared by the SemMergers of all sentences, up
+                to TERM_TABLE_SIZE nodes and memoized results. The
+                merged nodes get the keys 'mergedterm' and 'mergedtype'
+                instead of 'mergedsemrep'. Only the 'mergedsemrep' of
+                the root is set by getSemantics, which converts its term
+                back into an nltk expression.
+                Default: False
         Returns:
             the initialized SemMerger object
         Raises:
@@ -37,6 +98,11 @@ class SemMerger:
         self.dg = depGraph
         self.root = self.getRoot()
         self.dependencies = []
+        self.deferNormalization = deferNormalization
+        self.useTerms = useTerms
+        self.terms = self._sharedTermTable() if useTerms else None
+        self.planCounters = {'hits': 0, 'misses': 0, 'explored': 0,
+                'cached': 0}
         # check type
         if isinstance(self.dg, nlp.dependencygraph.DependencyGraph):
             pass
@@ -48,6 +114,18 @@ class SemMerger:
     def mergeWithChildren(self, node, force=False):
         """Merge the semrep of a node with the ones of its children.
 
+        The children that were not merged yet are merged with their
+        children first. The tree is traversed in post-order with an
+        explicit stack, so that the traversal does not recurse once per
+        level of the tree. The merged representations nest deeper with
+        every level that adds to them. With deferNormalization or
+        useTerms, they are normalized and converted with explicit stacks
+        as well, so that chains of any depth can be merged. Otherwise,
+        each merge is simplified by nltk, which recurses into the
+        representation, so that chains whose representation grows on
+        every level exceed the recursion limit of Python after a few
+        hundred levels.
+
         Args:
             node: A node of a dependencyGraph object.
             force: A bool denoting if a merge should be forced, even if node
@@ -61,10 +139,33 @@ class SemMerger:
             sys.stderr.write('The node was merged already')
             return None
 
-        # Collect the children from self.dg.
-        children = self.getChildren(node)
+        # Each entry holds a node and its children once they were pushed.
+        stack = [(node, None)]
+        while stack:
+            current, children = stack.pop()
+            if children is None:
+                # Collect the children from self.dg.
+                children = self.getChildren(current)
+                if children:
+                    # Merge the children with their children first, in
+                    # order.
+                    stack.append((current, children))
+                    stack.extend((c, None) for c in reversed(children)
+                            if not self.isMerged(c))
+                    continue
+            self._mergeNode(current, children)
+
+    def _mergeNode(self, node, children):
+        """Merge the semrep of a node with those of its merged children.
 
-        if len(children) == 0:
+        Args:
+            node: A node of a dependencyGraph object.
+            children: The list of the child nodes of node.
+        """
+        if self.useTerms:
+            self._mergeNodeTerms(node, children)
+
+        elif len(children) == 0:
             # If a node has no children, there is nothing to merge.
             try:
                 node['mergedsemrep'] = node['semrep']
@@ -72,27 +173,77 @@ class SemMerger:
                 pass
 
         else:
-            # Merge the children with their children first.
-            for c in children:
-                if not self.isMerged(c):
-                    self.mergeWithChildren(c, force)
-
             # Now actually merge the node with its children.
             mergeDict = {node['address']: node['semrep']} if 'semrep' in node\
                     else {}
             mergeDict.update(
                     {c['address']: c['mergedsemrep'] for c in children
                         if 'mergedsemrep' in c})
+            c = children[-1]
             if self.doubleNamed(node, c):
                 node['mergedsemrep'] = self.doubleNamedEntity(node, c)
             else:    
                 node['mergedsemrep'] = self._merge(mergeDict)
 
-        # Mark node as merged and return.
+        # Mark node as merged.
         node['merged'] = True
 
+    def _mergeNodeTerms(self, node, children):
+        """Merge the term of a node with those of its merged children.
+
+        Args:
+            node: A node of a dependencyGraph object.
+            children: The list of the child nodes of node.
+        """
+        terms = []
+        types = []
+        if 'semrep' in node:
+            terms.append(self.terms.fromExpression(node['semrep']))
+            types.append(internType(node['semrep'].type))
+        for c in children:
+            if 'mergedterm' in c:
+                terms.append(c['mergedterm'])
+                types.append(c['mergedtype'])
+
+        if children and self.doubleNamed(node, children[-1]):
+            expr = self.doubleNamedEntity(node, children[-1])
+            node['mergedterm'] = self.terms.fromExpression(expr)
+            node['mergedtype'] = internType(expr.type)
+        elif terms or children:
+            node['mergedterm'], node['mergedtype'] = self._mergeTerms(terms,
+                    types)
+
+    def _mergeTerms(self, terms, types):
+        """Merge terms like _merge merges expressions.
+
+        Args:
+            terms: A list of terms of self.terms.
+            types: A list of the interned types of the terms.
+
+        Returns:
+            A pair of the merged term and its type.
+
+        Raises:
+            NoMergePossibleException if the types of the terms do not
+                allow a merge.
+        """
+        if len(terms) == 1:
+            return terms[0], types[0]
+        term, type_, _ = self._combine(terms, types, self.terms.apply,
+                self.terms.toExpression)
+        if not self.deferNormalization:
+            term = self.terms.normalize(term)
+        return term, type_
+
     def _merge(self, mergeDict):
         """Merge the lambda expressions in mergeDict.
+
+        The expressions are merged by applying them to each other one
+        pair at a time. The order of the applications is planned on the
+        types of the expressions alone by a MergePlanner. The
+        expressions are then combined once in that order. The planned
+        order is the first one that trying the ordered pairs and
+        backtracking on failure finds, so the result is the same.
         
         Args:
             mergeDict: A dictionary mapping any keys to
@@ -105,38 +256,124 @@ class SemMerger:
             NoMergePossibleException if the types of the expressions
                 do not allow a merge.
         """
-        # Don't change values of original dict. (Emulation of pass by value)
-        mergeDict = copy.deepcopy(mergeDict)
+        # The expressions are not copied: applyto and simplify build new
+        # expressions and share the unchanged parts of the old ones
+        # instead of changing them.
+        exprs = list(mergeDict.values())
+        if len(exprs) == 1:
+            return exprs[0]
+
+        types = [internType(e.type) for e in exprs]
+        merged, _, applications = self._combine(exprs, types,
+                lambda function, argument: function.applyto(argument))
+        if self.deferNormalization:
+            return merged
+        # Simplify as often as the search did, once per application.
+        for _ in range(applications):
+            merged = merged.simplify()
+        return merged
 
-        if len(mergeDict) == 1:
-            return list(mergeDict.values())[0]
-        else:
-            applicationTries = _generateApplicationTries(mergeDict.keys())
-            for t in applicationTries:
-                expr0, expr1 = mergeDict[t[0]], mergeDict[t[1]]
-                if isApplicableTo(expr0, expr1):
-                    firstMerge = expr0.applyto(expr1)
-                    # Generate new mergeDict without keys for expr1 and expr2
-                    newMergeDict = {
-                            k:v for k,v in mergeDict.items()
-                            if k != t[0] and k != t[1]
-                            }
-                    # But include the result of the application under a new key.
-                    newMergeDict[t] = firstMerge
-                    try:
-                        merged = self._merge(newMergeDict).simplify()
-                    except NoMergePossibleException:
-                        # The rest of the children cannot be merged.
-                        # Start with a different attempt at the first merge.
-                        continue
-                    return merged
+    def _combine(self, values, types, apply, describe=str):
+        """Apply values to each other in the planned order.
+
+        Args:
+            values: A list of the expressions or terms to merge.
+            types: A list of the interned types of the values.
+            apply: A function applying a value to another one.
+            describe: A function returning the string of a value for
+                error messages. Default: str
+
+        Returns:
+            A triple of the merged value, its type and the number of
+            applications.
+
+        Raises:
+            NoMergePossibleException if the types of the values do not
+                allow a merge.
+        """
+        plan = self._plan(types)
+        if plan is None:
+            # If all attempts to apply any type to another one fail,
+            # raise an Exception.
+            errMsg = "Could not merge the following types:"
+            for v in values:
+                errMsg = "{0}\n{1}".format(errMsg, describe(v))
+            raise NoMergePossibleException(errMsg)
+
+        for i, j in plan:
+            # The types of the applications are kept along with them, as
+            # nltk computes them anew from the whole expression.
+            applicable, definite = _applicability(types[i], types[j])
+            if not applicable:
+                errMsg = 'The planned merge of {} and {} is not possible.'
+                raise NoMergePossibleException(errMsg.format(
+                    describe(values[i]), describe(values[j])))
+            if not definite:
+                print("Warning: Type is not definite, application may be "
+                        "incorrect!")
+            merged = apply(values[i], values[j])
+            mergedType = _resultType(types[i])
+            values = [v for n, v in enumerate(values) if n != i and n != j]
+            values.append(merged)
+            types = [t for n, t in enumerate(types) if n != i and n != j]
+            types.append(mergedType)
+        return values[0], types[0], len(plan)
+
+    def _plan(self, types):
+        """Plan the merge of expressions with the given interned types.
+
+        Plans for canonical types are cached across all SemMergers, so
+        merges of the same types are usually only planned once.
+
+        Returns:
+            The plan of a MergePlanner or None if no merge is possible.
+        """
+        ids = None
+        if all(TYPES.isCanonical(t) for t in types):
+            ids = tuple(id(t) for t in types)
+            if ids in self._plans:
+                self._plans.move_to_end(ids)
+                self.planCounters['cached'] += 1
+                return self._plans[ids]
+            sortedIds = tuple(sorted(ids))
+            if sortedIds in self._impossible:
+                self._impossible.move_to_end(sortedIds)
+                self.planCounters['cached'] += 1
+                return None
+
+        planner = MergePlanner()
+        plan = planner.plan(types)
+        for key, count in planner.counters().items():
+            self.planCounters[key] += count
+
+        if ids is not None:
+            if plan is None:
+                _remember(self._impossible, sortedIds, None)
             else:
-                # If all attempts to apply any type to another one fail,
-                # raise an Exception.
-                errMsg = "Could not merge the following types:"
-                for v in mergeDict.values():
-                    errMsg = "{0}\n{1}".format(errMsg, v)
-                raise NoMergePossibleException(errMsg)
+                _remember(self._plans, ids, tuple(plan))
+        return plan
+
+    @classmethod
+    def clearPlanCache(cls):
+        """Discard the plans cached across all SemMergers."""
+        cls._plans.clear()
+        cls._impossible.clear()
+
+    @classmethod
+    def clearTermTable(cls):
+        """Discard the TermTable shared by the SemMergers with useTerms.
+
+        SemMergers created before keep using the old table.
+        """
+        cls._termTable = None
+
+    @classmethod
+    def _sharedTermTable(cls):
+        """Return the shared TermTable, replacing it by an empty one if
+        it has grown too large."""
+        if cls._termTable is None or len(cls._termTable) > TERM_TABLE_SIZE:
+            cls._termTable = TermTable()
+        return cls._termTable
 
     def isMerged(self, node):
         """Check if a node's semrep has been merged with its children."""
@@ -152,7 +389,6 @@ class SemMerger:
                 (child['tag'] == 'NE' and child['rel'] == 'PNC'))
 
     def doubleNamedEntity(self, head_node, node):
-        tlp = nll.LogicParser(type_check=True)
         """Fuse representations of first and last name of one entity 
             into one
             
@@ -177,11 +413,19 @@ class SemMerger:
             
         new_expr = rule.format(head_node)
         exprSig = {key.format(head_node): val for key, val in sig.items()}
-        return tlp.parse(new_expr, signature=exprSig)
+        return tlp.parse(new_expr, signature=internSignature(exprSig))
     
     def getSemantics(self):
         """ Returns logical expression of the entire sentence """
         self.mergeWithChildren(self.root)
+        if self.useTerms and 'mergedterm' in self.root:
+            term = self.root['mergedterm']
+            if self.deferNormalization:
+                term = self.terms.normalize(term)
+            self.root['mergedsemrep'] = self.terms.toExpression(term)
+        elif self.deferNormalization and 'mergedsemrep' in self.root:
+            self.root['mergedsemrep'] = betaNormalize(
+                    self.root['mergedsemrep'])
         return self.root['mergedsemrep']
 
     def getChildren(self, node):
@@ -222,6 +466,87 @@ class SemMerger:
             errMsg = 'The dependencyGraph has no root.'
             raise ValueError(errMsg)
 
+class MergePlanner:
+    """A planner of the order in which expressions are merged.
+
+    Whether an expression can be applied to another one only depends on
+    their types, and so does the type of the result. A MergePlanner
+    therefore searches for an order of applications on the types alone.
+
+    The ordered pairs are tried in the order of _generateApplicationTries
+    and the result of an application is put last, like the merged
+    expressions used to be. Sets of types that cannot be merged are
+    remembered, so that each of them is only searched once. The types
+    alone are remembered, without the keys of the expressions, as the
+    keys do not matter for whether the expressions can be merged.
+
+    Attributes:
+        hits: The number of states found to be impossible in the memo.
+        misses: The number of states looked up in the memo in vain.
+        explored: The number of states whose applications were tried.
+    """
+
+    def __init__(self):
+        """Initialize MergePlanner without known sets of types."""
+        # Sorted tuples of the ids of interned types that cannot be
+        # merged.
+        self._impossible = set()
+        self.hits = 0
+        self.misses = 0
+        self.explored = 0
+
+    def counters(self):
+        """Return the counters of the memo as a dictionary."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'explored': self.explored}
+
+    def plan(self, types):
+        """Plan the merge of expressions with the given types.
+
+        Args:
+            types: A list of the nltk.sem.logic types of the expressions,
+                preferably interned.
+
+        Returns:
+            A list of pairs of positions (i, j), denoting that the
+            expression at position i is applied to the one at position
+            j. The positions refer to the list of expressions without
+            the ones that were already applied and with the results of
+            the applications appended. None if the expressions cannot be
+            merged.
+        """
+        return self._search(tuple(internType(t) for t in types))
+
+    def _search(self, types):
+        if len(types) == 1:
+            return []
+        key = None
+        if all(TYPES.isCanonical(t) for t in types):
+            # Types containing ANY_TYPE are not identified by their ids.
+            key = tuple(sorted(id(t) for t in types))
+            if key in self._impossible:
+                self.hits += 1
+                return None
+            self.misses += 1
+        self.explored += 1
+        for i, j in _generateApplicationTries(range(len(types))):
+            if not _applicability(types[i], types[j])[0]:
+                continue
+            rest = tuple(t for n, t in enumerate(types) if n != i and n != j)
+            steps = self._search(rest + (_resultType(types[i]),))
+            if steps is not None:
+                return [(i, j)] + steps
+        if key is not None:
+            self._impossible.add(key)
+        return None
+
+def _remember(cache, key, value):
+    """Add an entry to a plan cache, discarding the least recently used
+    one if the cache is full."""
+    cache[key] = value
+    if len(cache) > PLAN_CACHE_SIZE:
+        cache.popitem(last=False)
+
 def _generateApplicationTries(iterable):
     """Generate all possible pairs in iterable.
     
@@ -241,6 +566,9 @@ class NoMergePossibleException(Exception):
 def isApplicableTo(expr1, expr2, strict=False):
     """Test whether expr1 can be applied to expr2.
 
+    The types are interned, so that equal types are mostly recognized
+    by identity.
+
     Args:
         expr1: An nltk.sem.logic.Expression object with resolved type.
         expr2: An nltk.sem.logic.Expression object with resolved type.
@@ -248,17 +576,34 @@ def isApplicableTo(expr1, expr2, strict=False):
     Returns:
         True if expr1 can be applied to expr2; False otherwise.
     """
-    if not isinstance(expr1.type, nll.ComplexType):
-        return False
-
-    elif expr1.type.first == expr2.type:
-        return True
-    
-    elif (not strict) and expr1.type.first.matches(expr2.type):
+    applicable, definite = _applicability(internType(expr1.type),
+            internType(expr2.type), strict)
+    if applicable and not definite:
         print("Warning: Type is not definite, application may be incorrect!")
-        return True
-    
-    return False
+    return applicable
+
+def _applicability(functionType, argumentType, strict=False):
+    """Check whether an expression can be applied to another by types.
+
+    Returns:
+        A pair of booleans: whether the application is possible and
+        whether the types match definitely rather than only because of
+        ANY_TYPE.
+    """
+    if not isinstance(functionType, nll.ComplexType):
+        return False, True
+
+    elif sameType(functionType.first, argumentType):
+        return True, True
+
+    elif (not strict) and functionType.first.matches(argumentType):
+        return True, False
+
+    return False, True
+
+def _resultType(functionType):
+    """Return the type of applying an expression of a ComplexType."""
+    return internType(functionType.second)
 
 def testUsualCase():
     import nltk.sem.logic as nll
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Ordering of the conditions of rules by cost and selectivity."""
+
+class ConditionOptimizer:
+    """An optimizer ordering the conditions of rules.
+
+    The conditions of a SemRepRule form a conjunction, so they can be
+    tested in any order without changing whether the rule matches. A
+    ConditionOptimizer orders them so that cheap conditions that are
+    likely to fail are tested first: by ascending cost / (1 - p), where p
+    is the estimated probability that the condition is satisfied.
+
+    The cost of a condition is estimated from the structure of its
+    subject. The probabilities are measured, either on a calibration
+    corpus with calibrate or while assigning with a SemRepAssigner that
+    uses the optimizer.
+
+    Attributes:
+        tested: A dictionary mapping Condition objects to the number of
+            times they were tested.
+        satisfied: A dictionary mapping Condition objects to the number
+            of times they were satisfied.
+    """
+
+    def __init__(self):
+        """Initialize ConditionOptimizer without measurements."""
+        self.tested = {}
+        self.satisfied = {}
+
+    def record(self, cond, satisfied):
+        """Record the result of testing a condition once."""
+        self.tested[cond] = self.tested.get(cond, 0) + 1
+        if satisfied:
+            self.satisfied[cond] = self.satisfied.get(cond, 0) + 1
+
+    def calibrate(self, rules, depGraphs):
+        """Measure the conditions of rules on the nodes of some graphs.
+
+        Every distinct condition of the rules is tested on every node.
+
+        Args:
+            rules: A list of SemRepRule objects.
+            depGraphs: An iterable of nltk.parse.DependencyGraph objects.
+        """
+        conditions = list({c: None for r in rules for c in r.conditions})
+        for depGraph in depGraphs:
+            for address in list(depGraph.nodes):
+                for cond in conditions:
+                    self.record(cond, cond(depGraph, address))
+
+    def probability(self, cond):
+        """Return the estimated probability that cond is satisfied.
+
+        Conditions that were never tested are estimated at 0.5.
+        """
+        satisfied = self.satisfied.get(cond, 0)
+        return (satisfied + 1) / (self.tested.get(cond, 0) + 2)
+
+    def rank(self, cond):
+        """Return the rank of a condition. Lower ranks are tested first."""
+        return estimateCost(cond) / (1 - self.probability(cond))
+
+    def order(self, conditions):
+        """Return the conditions sorted by rank.
+
+        Conditions with equal ranks keep their order.
+        """
+        return sorted(conditions, key=self.rank)
+
+    def optimize(self, rules):
+        """Set the order in which the conditions of rules are tested."""
+        for r in rules:
+            r.testOrder = self.order(r.conditions)
+
+def estimateCost(cond):
+    """Estimate the cost of testing a condition on a node.
+
+    Going to the head counts as one step and going to the dependents as
+    two, as there can be more than one. Climbing over transeunda is
+    counted as two steps. Subjects whose structure is unknown count as
+    four steps.
+
+    >>> from .condition import Condition
+    >>> estimateCost(Condition.fromstring('tag element {NN}'))
+    1
+    >>> estimateCost(Condition.fromstring('^.NK.tag element {ART}'))
+    4
+    """
+    path = getattr(cond.subj, 'path', None)
+    if path is None:
+        cost = 4
+    else:
+        cost = 1 + sum(1 if t == '^' else 2 for t in path)
+    if cond.transeunda:
+        cost += 2
+    return cost
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Profiling of the rules applied by a SemRepAssigner."""
+
+import time
+
+# The columns of the table: the keys of the report and their headers.
+_COLUMNS = (
+        ('tested', 'tested'),
+        ('conditions', 'conds'),
+        ('fired', 'fired'),
+        ('testTime', 'test ms'),
+        ('assignTime', 'assign ms'),
+        ('totalTime', 'total ms'),
+        )
+
+class RuleProfiler:
+    """A profiler recording what each rule of a SemRepAssigner costs.
+
+    For each rule, the profiler records how many nodes it was tested
+    on, how many conditions were tested on the nodes it was rejected
+    for, i. e. before rejection, how often it fired,
+    i. e. was applied to a node, and the time spent testing its
+    conditions and assigning its semantic representations.
+
+    Conditions are only tested one rule at a time if the rules are
+    selected by a linear scan or a RuleIndex. If they are selected by a
+    DecisionDAG, by CompiledRules or in batch, only the firing and the
+    assignment are recorded.
+
+    Attributes:
+        stats: A dictionary mapping SemRepRule objects to RuleStats.
+    """
+
+    def __init__(self):
+        """Initialize RuleProfiler without records."""
+        self.stats = {}
+
+    def ruleStats(self, rule):
+        """Return the RuleStats of a rule, creating them if necessary."""
+        try:
+            return self.stats[rule]
+        except KeyError:
+            stats = RuleStats()
+            self.stats[rule] = stats
+            return stats
+
+    def testConditions(self, rule, depGraph, address, memo=None,
+            optimizer=None):
+        """Test the conditions of a rule on a node and record the cost.
+
+        The conditions are tested by SemRepRule.testConditions. If the
+        rule is rejected, the conditions tested up to and including the
+        first one that was not satisfied are counted, also those whose
+        result is taken from the memo.
+
+        Returns:
+            True, if all conditions are satisfied.
+            False, if one or more conditions are not satisfied.
+        """
+        stats = self.ruleStats(rule)
+        tested = []
+        start = time.perf_counter()
+        satisfied = rule.testConditions(depGraph, address, memo, optimizer,
+                onTest=lambda cond, result: tested.append(cond))
+        stats.testTime += time.perf_counter() - start
+        stats.tested += 1
+        if not satisfied:
+            stats.conditions += len(tested)
+        return satisfied
+
+    def firstMatch(self, rules, depGraph, address, memo=None,
+            optimizer=None):
+        """Return the first rule whose conditions a node satisfies or None.
+
+        The cost of testing each rule is recorded.
+        """
+        for r in rules:
+            if self.testConditions(r, depGraph, address, memo, optimizer):
+                return r
+        return None
+
+    def recordAssignment(self, rule, seconds):
+        """Record that a rule fired and how long its assignment took."""
+        stats = self.ruleStats(rule)
+        stats.fired += 1
+        stats.assignTime += seconds
+
+    def reset(self):
+        """Discard all records."""
+        self.stats = {}
+
+    def report(self, rules):
+        """Return the records as a dictionary.
+
+        Args:
+            rules: The list of SemRepRule objects of the assigner, by
+                which the rules are numbered.
+
+        Returns:
+            A dictionary mapping the numbers of the rules to dictionaries
+            with the keys 'tested', 'conditions', 'fired', 'testTime',
+            'assignTime' and 'totalTime'. Times are in seconds. Rules
+            without records have zeros for all values.
+        """
+        return {n: self.stats.get(r, RuleStats()).asdict()
+                for n, r in enumerate(rules)}
+
+    def table(self, rules, sortBy='totalTime', limit=None):
+        """Return the records as a text table.
+
+        Args:
+            rules: The list of SemRepRule objects of the assigner, by
+                which the rules are numbered.
+            sortBy: The key of the report by which the rows are sorted
+                in descending order. Default: 'totalTime'
+            limit: The maximum number of rows or None for all rules.
+                Default: None
+
+        Returns:
+            A string holding the table. Times are in milliseconds.
+        """
+        report = self.report(rules)
+        numbers = sorted(report, key=lambda n: (-report[n][sortBy], n))
+        if limit is not None:
+            numbers = numbers[:limit]
+        lines = [' '.join(['{:>5}'.format('rule')]
+            + ['{:>10}'.format(header) for _, header in _COLUMNS]
+            + ['semRepPat'])]
+        for n in numbers:
+            cells = ['{:>5}'.format(n)]
+            for key, _ in _COLUMNS:
+                value = report[n][key]
+                if key.endswith('Time'):
+                    cells.append('{:>10.2f}'.format(value * 1000))
+                else:
+                    cells.append('{:>10}'.format(value))
+            cells.append(rules[n].semRepPat)
+            lines.append(' '.join(cells))
+        return '\n'.join(lines)
+
+class RuleStats:
+    """The records of a RuleProfiler for one rule.
+
+    Attributes:
+        tested: The number of nodes the rule was tested on.
+        conditions: The number of conditions tested on the nodes the
+            rule was rejected for, up to and including the first one
+            that was not satisfied. Conditions of nodes the rule fired
+            for are not counted.
+        fired: The number of nodes the rule was applied to.
+        testTime: The seconds spent testing the conditions.
+        assignTime: The seconds spent assigning representations.
+    """
+
+    __slots__ = ('tested', 'conditions', 'fired', 'testTime', 'assignTime')
+
+    def __init__(self):
+        self.tested = 0
+        self.conditions = 0
+        self.fired = 0
+        self.testTime = 0.0
+        self.assignTime = 0.0
+
+    def asdict(self):
+        """Return the records as a dictionary, including the total time."""
+        return {'tested': self.tested, 'conditions': self.conditions,
+                'fired': self.fired, 'testTime': self.testTime,
+                'assignTime': self.assignTime,
+                'totalTime': self.testTime + self.assignTime}
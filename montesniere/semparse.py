@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""A fast parser for the logic used in semRepPats."""
+
+import functools
+import re
+
+import nltk.sem.logic as nll
+
+# Tokens of the supported subset of the logic: lambdas, quantifiers,
+# conjunctions, implications, negations and applications. Characters
+# starting other symbols of nltk, e. g. '|' or '=', are not allowed in
+# names, so that they are reported as unsupported.
+_TOKENS = re.compile(r'[ \t\n]*(?:(->|[\\.(),&!-])'
+        r'|([^ \t\n&^|\-=<\\.(),!]+)|(.))')
+
+# The symbols of the subset.
+_SYMBOLS = {'\\', '.', '(', ')', ',', '&', '->', '-', '!'}
+
+# The maximum nesting of expressions; nltk does not parse deeper ones.
+_MAX_DEPTH = getattr(nll.LogicParser, 'MAX_PARSE_DEPTH', 200)
+
+# The precedence of operators as in nltk.sem.logic.LogicParser.
+_APP = nll.APP
+_PRECEDENCE = {'\\': 1, '-': 2, '!': 2, _APP: 3, '&': 6, '->': 8, None: 10}
+for _quant in nll.Tokens.EXISTS_LIST + nll.Tokens.ALL_LIST:
+    _PRECEDENCE[_quant] = 5
+
+_BOOLEANS = {'&': nll.AndExpression, '->': nll.ImpExpression}
+_QUANTIFIERS = dict(
+        [(q, nll.ExistsExpression) for q in nll.Tokens.EXISTS_LIST]
+        + [(q, nll.AllExpression) for q in nll.Tokens.ALL_LIST])
+
+class SemRepParser:
+    """A parser for the logic used in semRepPats.
+
+    SemRepParser parses a subset of the logic of nltk.sem.logic into the
+    same Expression objects as nltk.sem.logic.LogicParser: lambda
+    expressions, the quantifiers all and exists, the operators &, -> and
+    the negations - and !, and applications of predicates and variables.
+    The subset is parsed by a dedicated tokenizer and a recursive
+    descent over the same precedence of operators as nltk's. Strings
+    outside the subset as well as invalid strings are passed on to
+    nltk's LogicParser, which also raises the errors.
+
+    If type_check is True, the types of the parsed expression are
+    inferred by nltk like by LogicParser.
+
+    >>> parser = SemRepParser(type_check=True)
+    >>> expr = parser.parse(r'\\P Q. exists x. (P(x) & Q(x))')
+    >>> expr == nll.LogicParser().parse(r'\\P Q. exists x. (P(x) & Q(x))')
+    True
+    >>> parser.parse(r'\\x. (x = Peter)')
+    <LambdaExpression \\x.(x = Peter)>
+    """
+
+    def __init__(self, type_check=False):
+        """Initialize SemRepParser.
+
+        Args:
+            type_check: A boolean indicating whether the types of the
+                parsed expressions should be inferred. Default: False
+        """
+        self.type_check = type_check
+        self._fallback = nll.LogicParser(type_check=type_check)
+
+    def parse(self, data, signature=None):
+        """Parse a string into an nltk.sem.logic.Expression.
+
+        Args:
+            data: The string to parse.
+            signature: A dictionary mapping names to types or to string
+                representations of types as used by the type check.
+                Default: None
+
+        Returns:
+            The parsed nltk.sem.logic.Expression.
+
+        Raises:
+            nltk.sem.logic.LogicalExpressionException if the string
+                cannot be parsed.
+        """
+        try:
+            expr = _Parse(data.rstrip()).expression()
+        except _Unsupported:
+            return self._fallback.parse(data, signature)
+        if self.type_check:
+            expr.typecheck(signature)
+        return expr
+
+class _Unsupported(Exception):
+    """Raised for strings that SemRepParser leaves to nltk."""
+    pass
+
+class _Parse:
+    """The state of parsing one string."""
+
+    def __init__(self, data):
+        self.tokens = []
+        for symbol, name, other in _TOKENS.findall(data):
+            if other:
+                raise _Unsupported()
+            self.tokens.append(symbol or name)
+        self.position = 0
+        self.depth = 0
+
+    def expression(self):
+        """Parse the whole string."""
+        expr = self.next(None)
+        if self.position < len(self.tokens):
+            raise _Unsupported()
+        return expr
+
+    def peek(self):
+        """Return the next token or None at the end."""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self):
+        """Return the next token and advance."""
+        if self.position >= len(self.tokens):
+            raise _Unsupported()
+        tok = self.tokens[self.position]
+        self.position += 1
+        return tok
+
+    def next(self, context):
+        """Parse the next complete expression in a context."""
+        self.depth += 1
+        if self.depth > _MAX_DEPTH:
+            raise _Unsupported()
+        tok = self.take()
+        if tok in _QUANTIFIERS:
+            expr = self.binder(tok, _QUANTIFIERS[tok])
+        elif tok == '\\':
+            expr = self.binder(tok, nll.LambdaExpression)
+        elif tok == '-' or tok == '!':
+            expr = nll.NegatedExpression(self.next('-'))
+        elif tok == '(':
+            expr = self.next(None)
+            self.expect(')')
+        elif _isName(tok):
+            expr = self.variable(tok)
+        else:
+            raise _Unsupported()
+        expr = self.adjuncts(expr, context)
+        self.depth -= 1
+        return expr
+
+    def variable(self, tok):
+        """Parse a variable or constant and the arguments applied to it."""
+        expr = _variableExpression(tok)
+        if self.peek() == '(':
+            if not isinstance(expr, (nll.FunctionVariableExpression,
+                    nll.ConstantExpression)):
+                raise _Unsupported()
+            self.take()
+            expr = self.arguments(expr)
+        return expr
+
+    def binder(self, tok, factory):
+        """Parse the variables and the term of a lambda or quantifier."""
+        variables = [self.boundVariable()]
+        while True:
+            nextTok = self.peek()
+            if nextTok is None or (nextTok == '.'
+                    and self.position + 1 >= len(self.tokens)):
+                raise _Unsupported()
+            if nextTok in nll.Tokens.TOKENS:
+                break
+            variables.append(self.boundVariable())
+        if self.peek() == '.':
+            self.take()
+        expr = self.next(tok)
+        while variables:
+            expr = factory(variables.pop(), expr)
+        return expr
+
+    def boundVariable(self):
+        """Parse a variable bound by a lambda or quantifier."""
+        tok = self.take()
+        if (tok in _SYMBOLS
+                or isinstance(_variableExpression(tok), nll.ConstantExpression)):
+            raise _Unsupported()
+        return _variable(tok)
+
+    def adjuncts(self, expr, context):
+        """Parse the applications and operators following an expression."""
+        position = None
+        while position != self.position:
+            position = self.position
+            if (_hasPriority(_APP, context) and self.peek() == '('):
+                if not isinstance(expr, (nll.LambdaExpression,
+                        nll.ApplicationExpression,
+                        nll.FunctionVariableExpression,
+                        nll.ConstantExpression)):
+                    raise _Unsupported()
+                self.take()
+                expr = self.arguments(expr)
+            chain = 0
+            while True:
+                tok = self.peek()
+                if tok in _BOOLEANS and _hasPriority(tok, context):
+                    chain += 1
+                    if self.depth + chain > _MAX_DEPTH:
+                        raise _Unsupported()
+                    self.take()
+                    expr = _BOOLEANS[tok](expr, self.next(tok))
+                else:
+                    break
+        return expr
+
+    def arguments(self, function):
+        """Parse the arguments after '(' and apply the function to them."""
+        expr = nll.ApplicationExpression(function, self.next(_APP))
+        while self.peek() == ',':
+            self.take()
+            expr = nll.ApplicationExpression(expr, self.next(_APP))
+        self.expect(')')
+        return expr
+
+    def expect(self, expected):
+        if self.take() != expected:
+            raise _Unsupported()
+
+def _hasPriority(operation, context):
+    """Check whether an operation binds stronger than its context."""
+    return (_PRECEDENCE[operation] < _PRECEDENCE[context]
+            or (operation == _APP and context == _APP))
+
+def _isName(tok):
+    """Check whether a token is a name.
+
+    Keywords of nltk, e. g. 'or', are not names.
+    """
+    return tok not in nll.Tokens.TOKENS
+
+def _variableExpression(name):
+    """Return a new variable expression of the right class for a name."""
+    return _expressionClass(name)(_variable(name))
+
+# The names are mostly lemmas, so the classes and Variables are only cached
+# for the most recently used names.
+@functools.lru_cache(maxsize=4096)
+def _expressionClass(name):
+    """Return the class of the variable expressions for a name."""
+    return nll.VariableExpression(nll.Variable(name)).__class__
+
+@functools.lru_cache(maxsize=4096)
+def _variable(name):
+    """Return the shared nltk.sem.logic.Variable for a name."""
+    return nll.Variable(name)
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
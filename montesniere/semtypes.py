@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Interned types of semantic representations."""
+
+import nltk.sem.logic as nll
+
+class TypeTable:
+    """A table of interned nltk.sem.logic types.
+
+    The table holds one canonical Type object for each distinct type,
+    so that equal types can be compared by identity. Type strings like
+    '<e,<e,t>>' are parsed once and then looked up.
+
+    Types containing the undetermined type ANY_TYPE are not interned,
+    as nltk treats them as equal to other types in irregular ways.
+
+    >>> table = TypeTable()
+    >>> table.parse('<e,t>') is table.parse('<e, t>')
+    True
+    >>> t = nll.ComplexType(nll.ENTITY_TYPE, nll.TRUTH_TYPE)
+    >>> table.intern(t) is table.parse('<e,t>')
+    True
+    >>> table.isCanonical(table.parse('<?,t>'))
+    False
+    """
+
+    def __init__(self):
+        """Initialize TypeTable with the basic types of nltk."""
+        self._parsed = {}
+        self._canonical = {}
+        # The canonical types by their ids, for checking canonicity.
+        self._ids = {}
+        for basicType in (nll.ENTITY_TYPE, nll.TRUTH_TYPE, nll.EVENT_TYPE):
+            self._register(str(basicType), basicType)
+
+    def parse(self, typeString):
+        """Return the interned type for a type string.
+
+        Raises:
+            nltk.sem.logic.LogicalExpressionException or AssertionError
+                like nltk.sem.logic.read_type if the string is not a
+                type.
+        """
+        try:
+            return self._parsed[typeString]
+        except KeyError:
+            pass
+        type_ = self.intern(nll.read_type(typeString))
+        self._parsed[typeString] = type_
+        return type_
+
+    def intern(self, type_):
+        """Return the canonical type equal to a type.
+
+        Types containing ANY_TYPE are returned unchanged.
+        """
+        if self._ids.get(id(type_)) is type_:
+            return type_
+        if isinstance(type_, nll.AnyType):
+            return type_
+        if isinstance(type_, nll.ComplexType):
+            first = self.intern(type_.first)
+            second = self.intern(type_.second)
+            if not (self.isCanonical(first) and self.isCanonical(second)):
+                return type_
+            key = (id(first), id(second))
+            try:
+                return self._canonical[key]
+            except KeyError:
+                pass
+            if type_.first is not first or type_.second is not second:
+                type_ = nll.ComplexType(first, second)
+        else:
+            key = str(type_)
+            try:
+                return self._canonical[key]
+            except KeyError:
+                pass
+        self._register(key, type_)
+        return type_
+
+    def isCanonical(self, type_):
+        """Check whether a type is the canonical object of its type."""
+        return self._ids.get(id(type_)) is type_
+
+    def _register(self, key, type_):
+        self._canonical[key] = type_
+        self._ids[id(type_)] = type_
+
+# The table shared by all rules and mergers.
+TYPES = TypeTable()
+
+def parseType(typeString):
+    """Return the interned type for a type string."""
+    return TYPES.parse(typeString)
+
+def internType(type_):
+    """Return the canonical type equal to a type."""
+    return TYPES.intern(type_)
+
+def internSignature(signature):
+    """Return a signature with interned types instead of type strings.
+
+    >>> internSignature({'Taube': '<e,t>'})['Taube'] is parseType('<e,t>')
+    True
+    """
+    return {k: v if isinstance(v, nll.Type) else parseType(v)
+            for k, v in signature.items()}
+
+def internExpressionTypes(expr):
+    """Replace the types stored in an expression with interned types.
+
+    Only variable and constant expressions store their types; the types
+    of the other expressions are computed from them.
+    """
+    if isinstance(expr, nll.AbstractVariableExpression):
+        # Types that were never set are those of the class, which are
+        # the basic types of nltk.
+        if 'type' in vars(expr):
+            expr.type = internType(expr.type)
+        return
+    for e in expr.visit(lambda e: e, list):
+        internExpressionTypes(e)
+
+def sameType(type1, type2):
+    """Check whether two types are equal.
+
+    Canonical types are compared by identity, all others with ==.
+    """
+    if type1 is type2:
+        return True
+    if TYPES.isCanonical(type1) and TYPES.isCanonical(type2):
+        return False
+    return type1 == type2
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Precompiled templates for the semantic representations of rules."""
+
+import copy
+import functools
+import re
+import string
+
+import nltk.sem.logic as nll
+
+from .semparse import SemRepParser
+from .semtypes import internExpressionTypes, internSignature, internType
+
+tlp = SemRepParser(type_check=True)
+
+# Prefix of the constants standing in for the format fields of a semRepPat
+# while the template is parsed.
+PLACEHOLDER_PREFIX = 'montesniereField'
+
+class SemRepTemplate:
+    """A typed expression skeleton for a semRepPat and its semSig.
+
+    The semRepPat is parsed a single time with a placeholder constant for
+    each of its format fields (typically {[lemma]}). A node's semantic
+    representation is then built by copying the skeleton and putting the
+    node's values in place of the placeholders instead of formatting and
+    parsing the semRepPat again.
+
+    A value can only be put in place of a placeholder if parsing the
+    formatted semRepPat would have yielded a constant with that name at
+    the position of the placeholder. For all other values, instantiate
+    returns None and the caller has to fall back to parsing.
+
+    Attributes:
+        skeleton: The nltk.sem.logic.Expression parsed from the semRepPat
+            with placeholders for the format fields.
+        fields: A dictionary mapping the names of the placeholders to
+            format strings producing the value of the field from a node.
+        names: A set of the names of all variables and constants that
+            occur in the skeleton apart from the placeholders.
+        type: The interned type of the skeleton, which is also the type
+            of all instantiated expressions.
+    """
+
+    def __init__(self, semRepPat, semSig):
+        """Initialize SemRepTemplate by parsing the semRepPat.
+
+        Args:
+            semRepPat: A string holding a template for a semantic
+                representation as used by SemRepRule.
+            semSig: A dictionary mapping expressions from the semRepPat
+                to a string representation of their types.
+
+        Returns:
+            The initialized SemRepTemplate.
+
+        Raises:
+            ValueError if the semRepPat or the semSig cannot be compiled
+                into a template, e. g. because a format field is only a
+                part of a name.
+        """
+        self.fields = {}
+        placeholders = {}
+        pattern = []
+        for literal, fieldName, formatSpec, conversion in \
+                string.Formatter().parse(semRepPat):
+            pattern.append(literal)
+            if fieldName is None:
+                continue
+            fieldString = _fieldString(fieldName, formatSpec, conversion)
+            if fieldString not in placeholders:
+                placeholder = '{}{}'.format(
+                        PLACEHOLDER_PREFIX, len(placeholders))
+                placeholders[fieldString] = placeholder
+                self.fields[placeholder] = fieldString
+            pattern.append(placeholders[fieldString])
+        pattern = ''.join(pattern)
+
+        signature = {}
+        for key, value in semSig.items():
+            if key in placeholders:
+                signature[placeholders[key]] = value
+            elif '{' in key or '}' in key:
+                errMsg = 'semSig key {} is not a single format field.'
+                raise ValueError(errMsg.format(key))
+            else:
+                signature[key] = value
+
+        try:
+            self.skeleton = tlp.parse(pattern,
+                    signature=internSignature(signature))
+        except (nll.LogicalExpressionException, nll.TypeException) as e:
+            errMsg = 'semRepPat {} cannot be parsed: {}'
+            raise ValueError(errMsg.format(semRepPat, e))
+
+        # Every placeholder has to be a complete constant of its own.
+        # Otherwise it was merged with surrounding characters into a
+        # different name.
+        self.names = _names(self.skeleton)
+        if not set(self.fields).issubset(self.names):
+            errMsg = 'semRepPat {} uses a format field as part of a name.'
+            raise ValueError(errMsg.format(semRepPat))
+        self.names.difference_update(self.fields)
+        if any(n.startswith(PLACEHOLDER_PREFIX) for n in self.names):
+            errMsg = 'semRepPat {} uses a reserved name.'
+            raise ValueError(errMsg.format(semRepPat))
+        # The instantiated expressions share the types of the skeleton.
+        internExpressionTypes(self.skeleton)
+        self.type = internType(self.skeleton.type)
+
+    def __setstate__(self, state):
+        # Unpickled skeletons, e. g. from a rule cache, hold copies of
+        # the types that have to be interned again.
+        self.__dict__.update(state)
+        internExpressionTypes(self.skeleton)
+        self.type = internType(self.skeleton.type)
+
+    def instantiate(self, node, transliterate=None):
+        """Build the semantic representation of a node from this template.
+
+        Args:
+            node: A node of an nltk.parse.DependencyGraph object.
+            transliterate: A function applied to each field value before
+                it is put into the template, e. g. to make it
+                ascii-compatible. Default: None
+
+        Returns:
+            The nltk.sem.logic.Expression for the node or None if the
+            values of the node cannot be put into the template safely.
+        """
+        substitutions = self._substitutions(node, transliterate)
+        if substitutions is None:
+            return None
+        return _substitute(self.skeleton, substitutions)
+
+    def accepts(self, node, transliterate=None):
+        """Check whether the values of a node can be put into the template.
+
+        If so, instantiate returns an expression of the type of the
+        skeleton for the node.
+        """
+        return self._substitutions(node, transliterate) is not None
+
+    def _substitutions(self, node, transliterate=None):
+        """Return the names to put in place of the placeholders or None."""
+        substitutions = {}
+        for placeholder, fieldString in self.fields.items():
+            value = fieldString.format(node)
+            if transliterate is not None:
+                value = transliterate(value)
+            if value in self.names or not isPlainConstant(value):
+                return None
+            substitutions[placeholder] = value
+        if len(set(substitutions.values())) < len(substitutions):
+            # Two fields with the same value would be one constant.
+            return None
+        return substitutions
+
+# Field values are mostly lemmas, so only the most recently used ones are
+# cached.
+@functools.lru_cache(maxsize=4096)
+def isPlainConstant(name):
+    """Check whether a name is parsed as a single constant.
+
+    >>> isPlainConstant('Taube')
+    True
+    >>> isPlainConstant('x')
+    False
+    >>> isPlainConstant('all')
+    False
+    >>> isPlainConstant('Peter-Mueller')
+    False
+    """
+    plain = False
+    if re.fullmatch(r'\w+', name) and name not in nll.Tokens.TOKENS:
+        try:
+            expr = nll.LogicParser().parse(name)
+        except nll.LogicalExpressionException:
+            pass
+        else:
+            plain = (isinstance(expr, nll.ConstantExpression)
+                    and expr.variable.name == name)
+    return plain
+
+def _substitute(expr, substitutions):
+    """Copy an expression and rename the constants in substitutions.
+
+    The copied variable expressions keep the types that were inferred
+    for the original ones.
+    """
+    if isinstance(expr, nll.AbstractVariableExpression):
+        newExpr = copy.copy(expr)
+        if expr.variable.name in substitutions:
+            newExpr.variable = nll.Variable(
+                    substitutions[expr.variable.name])
+        return newExpr
+    if isinstance(expr, nll.VariableBinderExpression):
+        variable = expr.variable
+        if variable.name in substitutions:
+            variable = nll.Variable(substitutions[variable.name])
+        return expr.__class__(variable, _substitute(expr.term, substitutions))
+    return expr.visit_structured(
+            lambda e: _substitute(e, substitutions), expr.__class__)
+
+def _names(expr):
+    """Return the names of all variables and constants in an expression."""
+    if isinstance(expr, nll.AbstractVariableExpression):
+        return {expr.variable.name}
+    names = set()
+    if isinstance(expr, nll.VariableBinderExpression):
+        names.add(expr.variable.name)
+    for n in expr.visit(_names, list):
+        names.update(n)
+    return names
+
+def _fieldString(fieldName, formatSpec, conversion):
+    """Rebuild the format string for a single format field."""
+    s = '{' + fieldName
+    if conversion:
+        s += '!' + conversion
+    if formatSpec:
+        s += ':' + formatSpec
+    return s + '}'
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
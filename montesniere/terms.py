@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Hash-consed lambda terms with de Bruijn indices."""
+
+import nltk.sem.logic as nll
+
+from .semtypes import TYPES, internType
+
+# The tags of the nodes of terms.
+_VAR = 0
+_FREE = 1
+_LAM = 2
+_EXISTS = 3
+_ALL = 4
+_APP = 5
+_NOT = 6
+_AND = 7
+_OR = 8
+_IMP = 9
+_IFF = 10
+_EQ = 11
+
+_BINDERS = {nll.LambdaExpression: _LAM, nll.ExistsExpression: _EXISTS,
+        nll.AllExpression: _ALL}
+_BINARIES = {nll.AndExpression: _AND, nll.OrExpression: _OR,
+        nll.ImpExpression: _IMP, nll.IffExpression: _IFF,
+        nll.EqualityExpression: _EQ}
+_CLASSES = {tag: cls for cls, tag in
+        list(_BINDERS.items()) + list(_BINARIES.items())}
+
+# The steps of converting a term or an expression: visiting it and
+# building the result from those of its parts.
+_VISIT = 0
+_BUILD = 1
+
+class TermTable:
+    """A table of hash-consed lambda terms.
+
+    A term is an int denoting a node of the table. Each node is held
+    once, so that equal terms are the same int. Variables bound by
+    lambdas and quantifiers are de Bruijn indices, so that terms equal
+    up to the names of bound variables are the same int as well. The
+    first name of the variable of each binder is kept for converting
+    terms back into nltk.sem.logic expressions.
+
+    The terms cover the expressions of the rules: lambdas, the
+    quantifiers exists and all, applications, negations, the boolean
+    operators and equality, and variables and constants with their
+    types.
+
+    Normalization and substitution are memoized on the nodes, so that
+    each normal form is computed once. The table and its memos are never
+    pruned; len gives the number of nodes and memoized results held, so
+    that a user can clear the table or replace it once it grows too
+    large.
+
+    Terms are converted, normalized and substituted with explicit
+    stacks instead of recursion, so that deeply nested terms do not
+    exceed the recursion limit of Python. Terms of typed expressions,
+    like those of the rules, always have a normal form.
+
+    >>> table = TermTable()
+    >>> lp = nll.LogicParser()
+    >>> det = table.fromExpression(lp.parse(r'\\P Q. exists x. (P(x) & Q(x))'))
+    >>> noun = table.fromExpression(lp.parse(r'\\y. taube(y)'))
+    >>> term = table.normalize(table.apply(det, noun))
+    >>> table.toExpression(term)
+    <LambdaExpression \\Q.exists x.(taube(x) & Q(x))>
+    >>> term == table.fromExpression(lp.parse(r'\\R. exists y. (taube(y) & R(y))'))
+    True
+    """
+
+    def __init__(self):
+        """Initialize TermTable without terms."""
+        self.clear()
+
+    def clear(self):
+        """Discard all terms and memos."""
+        # The nodes by term and the terms by node. A node is a tuple of
+        # a tag and the names, types and terms it consists of.
+        self._nodes = []
+        self._terms = {}
+        # The names of the variables of binders, by term. A binder keeps
+        # the name it was first created with.
+        self._hints = {}
+        # The number of enclosing binders a term refers to, by term.
+        self._loose = []
+        # The types of variables and constants and their keys.
+        self._types = []
+        self._typeKeys = {}
+        self._normal = {}
+        self._instantiated = {}
+        self._shifted = {}
+        self._freeNames = {}
+        self._expressions = {}
+
+    def __len__(self):
+        """Return the number of nodes and memoized results held."""
+        return (len(self._nodes) + len(self._normal)
+                + len(self._instantiated) + len(self._shifted)
+                + len(self._freeNames) + len(self._expressions))
+
+    def apply(self, function, argument):
+        """Return the term applying a term to another one."""
+        return self._node((_APP, function, argument),
+                max(self._loose[function], self._loose[argument]))
+
+    def normalize(self, term):
+        """Return the beta-normal form of a term."""
+        normal = self._normal
+        if term in normal:
+            return normal[term]
+        nodes = self._nodes
+        # The terms whose normal forms are needed, the next one on top. A
+        # term stays on the stack until the normal forms of its parts are
+        # known.
+        stack = [term]
+        while stack:
+            current = stack[-1]
+            if current in normal:
+                stack.pop()
+                continue
+            node = nodes[current]
+            tag = node[0]
+            if tag == _APP:
+                function = normal.get(node[1])
+                argument = normal.get(node[2])
+                if function is None or argument is None:
+                    if argument is None:
+                        stack.append(node[2])
+                    if function is None:
+                        stack.append(node[1])
+                    continue
+                functionNode = nodes[function]
+                if functionNode[0] == _LAM:
+                    reduced = self._instantiate(functionNode[2], argument, 0)
+                    result = normal.get(reduced)
+                    if result is None:
+                        stack.append(reduced)
+                        continue
+                else:
+                    result = self.apply(function, argument)
+            elif tag == _LAM or tag == _EXISTS or tag == _ALL:
+                body = normal.get(node[2])
+                if body is None:
+                    stack.append(node[2])
+                    continue
+                result = self._binder(tag, self._hints[current], node[1], body)
+            elif tag == _NOT:
+                negated = normal.get(node[1])
+                if negated is None:
+                    stack.append(node[1])
+                    continue
+                result = self._unary(negated)
+            elif tag >= _AND:
+                first = normal.get(node[1])
+                second = normal.get(node[2])
+                if first is None or second is None:
+                    if second is None:
+                        stack.append(node[2])
+                    if first is None:
+                        stack.append(node[1])
+                    continue
+                result = self._binary(tag, first, second)
+            else:
+                result = current
+            stack.pop()
+            normal[current] = result
+            normal[result] = result
+        return normal[term]
+
+    def fromExpression(self, expr):
+        """Return the term of an nltk.sem.logic.Expression.
+
+        Raises:
+            ValueError if the expression is not covered by terms.
+        """
+        # The enclosing binders, the innermost last. Each is a list of
+        # its Variable and the key of the type of its first occurrence.
+        context = []
+        # The terms of the parts converted, the last one on top.
+        results = []
+        stack = [(_VISIT, expr)]
+        while stack:
+            step, expr = stack.pop()
+            cls = type(expr)
+            if step == _BUILD:
+                if cls is nll.ApplicationExpression:
+                    argument = results.pop()
+                    results.append(self.apply(results.pop(), argument))
+                elif cls in _BINDERS:
+                    binder = context.pop()
+                    results.append(self._binder(_BINDERS[cls],
+                        expr.variable.name, binder[1], results.pop()))
+                elif cls is nll.NegatedExpression:
+                    results.append(self._unary(results.pop()))
+                else:
+                    second = results.pop()
+                    results.append(self._binary(_BINARIES[cls],
+                        results.pop(), second))
+
+            elif cls is nll.ApplicationExpression:
+                stack.append((_BUILD, expr))
+                stack.append((_VISIT, expr.argument))
+                stack.append((_VISIT, expr.function))
+
+            elif isinstance(expr, nll.AbstractVariableExpression):
+                results.append(self._variableTerm(expr, context))
+
+            elif cls in _BINDERS:
+                context.append([expr.variable, -1])
+                stack.append((_BUILD, expr))
+                stack.append((_VISIT, expr.term))
+
+            elif cls is nll.NegatedExpression:
+                stack.append((_BUILD, expr))
+                stack.append((_VISIT, expr.term))
+
+            elif cls in _BINARIES:
+                stack.append((_BUILD, expr))
+                stack.append((_VISIT, expr.second))
+                stack.append((_VISIT, expr.first))
+
+            else:
+                raise ValueError(
+                        'Expressions of {} are not covered by terms.'.format(
+                            cls.__name__))
+        return results[0]
+
+    def toExpression(self, term):
+        """Return the nltk.sem.logic.Expression of a term.
+
+        Bound variables keep their names, unless they would capture
+        another variable or a constant. Then they are renamed like by
+        nltk.
+        """
+        expressions = self._expressions
+        loose = self._loose
+        nodes = self._nodes
+        # The Variables of the enclosing binders and their type keys, the
+        # innermost last.
+        context = []
+        # The expressions of the parts converted, the last one on top.
+        results = []
+        stack = [(_VISIT, term)]
+        while stack:
+            step, current = stack.pop()
+            node = nodes[current]
+            tag = node[0]
+            if step == _VISIT:
+                if loose[current] == 0 and current in expressions:
+                    results.append(expressions[current])
+                    continue
+                if tag == _VAR:
+                    variable, typeKey = context[-1 - node[1]]
+                    results.append(self._variableExpression(variable,
+                        typeKey))
+                    continue
+                if tag == _FREE:
+                    expr = self._variableExpression(nll.Variable(node[1]),
+                            node[2])
+                    self._remember(current, expr, results)
+                    continue
+                stack.append((_BUILD, current))
+                if tag == _NOT:
+                    stack.append((_VISIT, node[1]))
+                elif tag == _APP or tag >= _AND:
+                    stack.append((_VISIT, node[2]))
+                    stack.append((_VISIT, node[1]))
+                else:
+                    context.append((self._binderVariable(current, context),
+                        node[1]))
+                    stack.append((_VISIT, node[2]))
+                continue
+
+            if tag == _APP:
+                argument = results.pop()
+                expr = nll.ApplicationExpression(results.pop(), argument)
+            elif tag == _NOT:
+                expr = nll.NegatedExpression(results.pop())
+            elif tag >= _AND:
+                second = results.pop()
+                expr = _CLASSES[tag](results.pop(), second)
+            else:
+                variable, _ = context.pop()
+                expr = _CLASSES[tag](variable, results.pop())
+            self._remember(current, expr, results)
+        return results[0]
+
+    def _variableTerm(self, expr, context):
+        """Return the term of a variable expression under binders."""
+        variable = expr.variable
+        for index in range(len(context)):
+            binder = context[-1 - index]
+            if binder[0] == variable:
+                if binder[1] == -1:
+                    binder[1] = self._typeKey(expr)
+                return self._var(index)
+        return self._node((_FREE, variable.name, self._typeKey(expr)), 0)
+
+    def _binderVariable(self, term, context):
+        """Return the Variable to convert a binder with.
+
+        Args:
+            term: A term of a binder.
+            context: The Variables of the enclosing binders and their
+                type keys, the innermost last.
+        """
+        body = self._nodes[term][2]
+        hint = self._hints[term]
+        # The names the variable must not take: the free names of the
+        # body and the enclosing variables the body refers to.
+        avoid = set(self.freeNames(body))
+        for index in range(1, self._loose[body]):
+            avoid.add(context[-index][0].name)
+        variable = nll.Variable(hint)
+        if hint in avoid:
+            variable = nll.unique_variable(pattern=variable,
+                    ignore={nll.Variable(name) for name in avoid})
+        return variable
+
+    def _remember(self, term, expr, results):
+        """Add the expression of a term to results and keep it if the term
+        is closed."""
+        if self._loose[term] == 0:
+            self._expressions[term] = expr
+        results.append(expr)
+
+    def _node(self, node, loose):
+        try:
+            return self._terms[node]
+        except KeyError:
+            term = len(self._nodes)
+            self._nodes.append(node)
+            self._loose.append(loose)
+            self._terms[node] = term
+            return term
+
+    def _var(self, index):
+        return self._node((_VAR, index), index + 1)
+
+    def _binder(self, tag, hint, typeKey, body):
+        term = self._node((tag, typeKey, body), max(self._loose[body] - 1, 0))
+        self._hints.setdefault(term, hint)
+        return term
+
+    def _unary(self, term):
+        return self._node((_NOT, term), self._loose[term])
+
+    def _binary(self, tag, first, second):
+        return self._node((tag, first, second),
+                max(self._loose[first], self._loose[second]))
+
+    def _typeKey(self, expr):
+        """Return the key of the type stored in a variable expression.
+
+        Types that were never stored are those of the class and have the
+        key -1. Equal types have equal keys: interned types are looked up
+        by identity, those containing ANY_TYPE by their strings.
+        """
+        type_ = vars(expr).get('type')
+        if type_ is None:
+            return -1
+        type_ = internType(type_)
+        lookup = id(type_) if TYPES.isCanonical(type_) else str(type_)
+        key = self._typeKeys.get(lookup)
+        if key is None:
+            key = len(self._types)
+            self._types.append(type_)
+            self._typeKeys[lookup] = key
+        return key
+
+    def _instantiate(self, term, argument, depth):
+        """Substitute a term for the variable with index depth.
+
+        Variables with higher indices are decremented, as their binder
+        was removed.
+        """
+        def replace(index, depth):
+            if index == depth:
+                return self._shift(argument, depth, 0)
+            return self._var(index - 1)
+        return self._mapLoose(term, depth, self._instantiated, argument,
+                replace)
+
+    def _shift(self, term, distance, cutoff):
+        """Add distance to the indices of the variables bound outside."""
+        if distance == 0:
+            return term
+        return self._mapLoose(term, cutoff, self._shifted, distance,
+                lambda index, depth: self._var(index + distance))
+
+    def _mapLoose(self, term, cutoff, memo, operand, replace):
+        """Replace the variables of a term bound outside of it.
+
+        Args:
+            term: A term of the table.
+            cutoff: The number of binders enclosing the term that are
+                kept.
+            memo: A dictionary mapping triples of a term, the operand
+                and a cutoff to the results, which is looked up and
+                added to.
+            operand: The term or distance the variables are replaced
+                with, as part of the keys of memo.
+            replace: A function returning the term replacing a variable,
+                given its index and the number of binders enclosing it,
+                including the cutoff.
+
+        Returns:
+            The term with the variables replaced.
+        """
+        loose = self._loose
+        if loose[term] <= cutoff:
+            return term
+        if (term, operand, cutoff) in memo:
+            return memo[term, operand, cutoff]
+        nodes = self._nodes
+
+        def result(part, depth):
+            if loose[part] <= depth:
+                return part
+            return memo.get((part, operand, depth))
+
+        # Pairs of a term and the number of binders enclosing it, whose
+        # results are needed, the next one on top.
+        stack = [(term, cutoff)]
+        while stack:
+            current, depth = stack[-1]
+            if (current, operand, depth) in memo:
+                stack.pop()
+                continue
+            node = nodes[current]
+            tag = node[0]
+            if tag == _VAR:
+                mapped = replace(node[1], depth)
+            elif tag == _NOT:
+                negated = result(node[1], depth)
+                if negated is None:
+                    stack.append((node[1], depth))
+                    continue
+                mapped = self._unary(negated)
+            elif tag == _APP or tag >= _AND:
+                first = result(node[1], depth)
+                second = result(node[2], depth)
+                if first is None or second is None:
+                    if second is None:
+                        stack.append((node[2], depth))
+                    if first is None:
+                        stack.append((node[1], depth))
+                    continue
+                if tag == _APP:
+                    mapped = self.apply(first, second)
+                else:
+                    mapped = self._binary(tag, first, second)
+            else:
+                body = result(node[2], depth + 1)
+                if body is None:
+                    stack.append((node[2], depth + 1))
+                    continue
+                mapped = self._binder(tag, self._hints[current], node[1],
+                        body)
+            stack.pop()
+            memo[current, operand, depth] = mapped
+        return memo[term, operand, cutoff]
+
+    def _variableExpression(self, variable, typeKey):
+        expr = nll.VariableExpression(variable)
+        if typeKey != -1:
+            expr.type = self._types[typeKey]
+        return expr
+
+    def freeNames(self, term):
+        """Return the frozenset of the names of constants and free
+        variables in a term."""
+        freeNames = self._freeNames
+        nodes = self._nodes
+        stack = [term]
+        while stack:
+            current = stack[-1]
+            if current in freeNames:
+                stack.pop()
+                continue
+            node = nodes[current]
+            tag = node[0]
+            if tag == _VAR:
+                names = frozenset()
+            elif tag == _FREE:
+                names = frozenset([node[1]])
+            else:
+                if tag == _NOT:
+                    parts = (node[1],)
+                elif tag == _APP or tag >= _AND:
+                    parts = node[1:]
+                else:
+                    parts = (node[2],)
+                missing = [p for p in parts if p not in freeNames]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                names = frozenset().union(*(freeNames[p] for p in parts))
+            stack.pop()
+            freeNames[current] = names
+        return freeNames[term]
+
+def test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+import io
+import json
+import shutil
+import tempfile
+import contextlib
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepRule = montesniere.assign.SemRepRule
+RuleAnalysis = montesniere.analyze.RuleAnalysis
+
+def makeRules(*conditionLists):
+    return [SemRepRule(conditions, '{[lemma]}', {'{[lemma]}': 'e'})
+            for conditions in conditionLists]
+
+class Unsatisfiable(unittest.TestCase):
+
+    def assertUnsatisfiable(self, *conditions):
+        analysis = RuleAnalysis(makeRules(list(conditions)))
+        self.assertEqual(analysis.unsatisfiable, [0])
+
+    def assertSatisfiable(self, *conditions):
+        analysis = RuleAnalysis(makeRules(list(conditions)))
+        self.assertEqual(analysis.unsatisfiable, [])
+
+    def testElement(self):
+        self.assertUnsatisfiable('tag element {NN}', 'tag notElement {NN}')
+        self.assertUnsatisfiable('tag element {NN}', 'tag element {NE}')
+        self.assertUnsatisfiable('tag element {NN}', '! tag element {NN, NE}')
+        self.assertSatisfiable('tag element {NN, NE}', 'tag notElement {NN}')
+
+    def testLabels(self):
+        self.assertUnsatisfiable('deps superset {NK}', 'deps subset {SB}')
+        self.assertUnsatisfiable('deps superset {NK}', 'deps notExist {}')
+        self.assertUnsatisfiable('deps cardinality {1}',
+                'deps superset {NK, SB}')
+        self.assertUnsatisfiable('deps superset {NK}',
+                'deps notSuperset {NK}')
+        self.assertSatisfiable('deps superset {NK}', 'deps cardinality {2}')
+
+    def testOpaque(self):
+        self.assertUnsatisfiable('NK.tag element {ART}',
+                '! NK.tag element {ART}')
+        self.assertSatisfiable('NK.tag element {ART}',
+                'NK.tag notElement {ART}')
+
+class Shadowed(unittest.TestCase):
+
+    def testSubsumed(self):
+        rules = makeRules(
+                ['tag element {NN, NE}'],
+                ['tag element {NN}', 'rel element {SB}'])
+        self.assertEqual(RuleAnalysis(rules).shadowed, {1: 0})
+
+    def testNotShadowedInOtherOrder(self):
+        rules = makeRules(
+                ['tag element {NN}', 'rel element {SB}'],
+                ['tag element {NN, NE}'])
+        self.assertEqual(RuleAnalysis(rules).removable, [])
+
+    def testLabels(self):
+        rules = makeRules(
+                ['deps exist {}'],
+                ['deps superset {NK}', 'deps subset {NK, SB}'])
+        self.assertEqual(RuleAnalysis(rules).shadowed, {1: 0})
+
+    def testPath(self):
+        rules = makeRules(
+                ['! NK.tag element {ART}'],
+                ['tag element {NN}', '! NK.tag element {ART}'],
+                ['tag element {NN}', 'NK.tag notElement {ART}'])
+        self.assertEqual(RuleAnalysis(rules).shadowed, {1: 0})
+
+    def testDuplicated(self):
+        rules = makeRules(
+                ['tag element {NN}', 'rel element {SB}'],
+                ['rel element {SB}', 'tag element {NN}'])
+        analysis = RuleAnalysis(rules)
+        self.assertEqual(analysis.duplicated, {1: 0})
+        self.assertEqual(analysis.prune(), rules[:1])
+
+class HeuristicRules(unittest.TestCase):
+
+    def testPrunedAssignerSelectsSame(self):
+        assigner = montesniere.assign.SemRepAssigner.fromfile(RULES)
+        rules = assigner.rules + makeRules(
+                ['tag element {NN}', 'tag notElement {NN}'])
+        pruned = montesniere.assign.SemRepAssigner(rules, prune=True)
+        self.assertEqual(pruned.rules, assigner.rules)
+
+    def testReport(self):
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        rules = makeRules(['tag element {NN, NE}'],
+                ['tag element {NE}', 'rel element {OA}'])
+        report = RuleAnalysis(rules).report([depGraph])
+        self.assertIn('rule 1: shadowed by rule 0', report)
+        self.assertIn('saves 4 of 10 condition tests', report)
+
+    def testCommandLine(self):
+        directory = tempfile.mkdtemp()
+        try:
+            rulesFile = os.path.join(directory, 'rules.json')
+            pruneFile = os.path.join(directory, 'pruned.json')
+            with open(rulesFile, 'w') as f:
+                json.dump([
+                    {'conditions': ['tag element {NN}'],
+                        'semRepPat': '{[lemma]}', 'semSig': {}},
+                    {'conditions': ['tag element {NN}'],
+                        'semRepPat': '{[lemma]}', 'semSig': {}},
+                    ], f)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                montesniere.analyze.main([rulesFile, '--prune', pruneFile])
+            self.assertIn('1 duplicated', output.getvalue())
+            with open(pruneFile) as f:
+                self.assertEqual(len(json.load(f)), 1)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
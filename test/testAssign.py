@@ -5,6 +5,9 @@ import unittest
 import sys
 import os
 import inspect
+import json
+import shutil
+import tempfile
 
 import nltk.parse as nlp
 import nltk.sem.logic as nll
@@ -931,6 +934,224 @@ class LeckeresFutter(unittest.TestCase):
         expected = tlp.parse(semRepPat, signature=semSig)
         self.assertEqual(assigned, expected)
 
+class SharedConditions(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, indexed=False)
+
+    def testShared(self):
+        rules = SharedConditions.assigner.rules
+        # 'tag element {NN}' in the third and fourth rule
+        self.assertIs(rules[2].conditions[0], rules[3].conditions[0])
+
+    def testTestedOncePerNode(self):
+        conllFile = os.path.join(TEST_DIR, 'schenkender_hase.conll')
+        with open(conllFile) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        tested = []
+        Condition = montesniere.condition.Condition
+        call = Condition.__call__
+        def countingCall(cond, depGraph, address):
+            tested.append((address, cond))
+            return call(cond, depGraph, address)
+        Condition.__call__ = countingCall
+        try:
+            SharedConditions.assigner.assignToDependencyGraph(depGraph)
+        finally:
+            Condition.__call__ = call
+        self.assertEqual(len(tested), len(set(tested)))
+
+    def testOnTest(self):
+        conllFile = os.path.join(TEST_DIR, 'schenkender_hase.conll')
+        with open(conllFile) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        rule = SharedConditions.assigner.rules[2]
+        memo = {}
+        for _ in range(2):
+            tested = []
+            satisfied = rule.testConditions(depGraph, 2, memo,
+                    onTest=lambda cond, result: tested.append((cond, result)))
+            # Results from the memo are reported as well.
+            self.assertEqual(tested[-1][1], satisfied)
+            self.assertEqual([c for c, _ in tested],
+                    rule.testOrder[:len(tested)])
+
+class LazySemReps(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, lazy=True)
+        cls.eagerAssigner = montesniere.assign.SemRepAssigner.fromfile(RULES)
+
+    def readGraph(self, conllFile):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            return nlp.DependencyGraph(f.read())
+
+    def testBuiltWhenRead(self):
+        depGraph = self.readGraph('schenkender_hase.conll')
+        LazySemReps.assigner.assignToDependencyGraph(depGraph)
+        node = depGraph.get_by_address(2)
+        self.assertIsInstance(dict.get(node, 'semrep'),
+                montesniere.assign.LazySemRep)
+        semRep = node['semrep']
+        self.assertEqual(semRep, tlp.parse(r'\x. hase(x)'))
+        self.assertIs(dict.get(node, 'semrep'), semRep)
+
+    def testSameAsEager(self):
+        lazyGraph = self.readGraph('lehrender_lehrer.conll')
+        eagerGraph = self.readGraph('lehrender_lehrer.conll')
+        LazySemReps.assigner.assignToDependencyGraph(lazyGraph)
+        LazySemReps.eagerAssigner.assignToDependencyGraph(eagerGraph)
+        for address in eagerGraph.nodes:
+            self.assertEqual(lazyGraph.get_by_address(address).get('semrep'),
+                    eagerGraph.get_by_address(address).get('semrep'))
+
+    def testFieldsBound(self):
+        depGraph = self.readGraph('beissende_taube.conll')
+        LazySemReps.assigner.assignToDependencyGraph(depGraph)
+        node = depGraph.get_by_address(2)
+        node['lemma'] = 'Hund'
+        self.assertEqual(node['semrep'], tlp.parse(r'\x. Taube(x)'))
+
+    def testRootReplaced(self):
+        depGraph = self.readGraph('beissende_taube.conll')
+        LazySemReps.assigner.assignToDependencyGraph(depGraph)
+        self.assertIs(depGraph.root,
+                depGraph.get_by_address(depGraph.root['address']))
+
+class ResultTypes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.assigner = montesniere.assign.SemRepAssigner.fromfile(RULES)
+
+    def testRuleTypes(self):
+        rule = montesniere.assign.SemRepRule(['tag element {NN}'],
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        self.assertIs(rule.resultType,
+                montesniere.semtypes.parseType('<e,t>'))
+        for r in self.assigner.rules:
+            self.assertTrue(
+                    montesniere.semtypes.TYPES.isCanonical(r.resultType))
+
+    def testSameAsBuilt(self):
+        for conllFile in ['schenkender_hase.conll', 'keine_wanduhr.conll',
+                'doppelte_objekt.conll']:
+            with open(os.path.join(TEST_DIR, conllFile)) as f:
+                depGraph = nlp.DependencyGraph(f.read())
+            self.assigner.assignTypes(depGraph)
+            self.assertFalse(any('semrep' in n
+                for n in depGraph.nodes.values()))
+            self.assigner.assignToDependencyGraph(depGraph)
+            for node in depGraph.nodes.values():
+                self.assertEqual('semrep' in node, 'semtype' in node)
+                if 'semrep' in node:
+                    self.assertIs(node['semtype'],
+                            montesniere.semtypes.internType(
+                                node['semrep'].type))
+
+    def testUnknownType(self):
+        rule = montesniere.assign.SemRepRule(['tag element {NN}'],
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        self.assertIsNone(rule.semType({'lemma': 'all'}))
+        self.assertIs(rule.semType({'lemma': 'Taube'}), rule.resultType)
+
+class ASCIITransliteration(unittest.TestCase):
+
+    def testTransliterate(self):
+        toASCII = montesniere.assign._toASCII
+        self.assertEqual(toASCII('Größe'), 'Groesse')
+        self.assertEqual(toASCII('ẞÄÖÜ'), 'SSAEOEUE')
+        self.assertEqual(toASCII('Café 5€'), 'Caf? 5?')
+        self.assertEqual(toASCII('Taube'), 'Taube')
+
+    def testCachedValues(self):
+        valueToASCII = montesniere.assign._valueToASCII
+        self.assertEqual(valueToASCII('Bär'), 'Baer')
+        self.assertIs(valueToASCII('Bär'), valueToASCII('Bär'))
+
+    def testCacheIsBounded(self):
+        cache = montesniere.assign._cachedToASCII
+        for n in range(cache.cache_info().maxsize + 10):
+            montesniere.assign._valueToASCII('Bär{}'.format(n))
+        self.assertEqual(cache.cache_info().currsize,
+                cache.cache_info().maxsize)
+
+    def testAssigned(self):
+        rule = montesniere.assign.SemRepRule(['tag element {NN}'],
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        self.assertEqual(rule.buildSemRep({'lemma': 'Bär'}, ascii=True),
+                tlp.parse(r'\x. Baer(x)'))
+
+class RuleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rules = os.path.join(self.directory, 'rules.json')
+        self.cache = os.path.join(self.directory, 'rules.cache')
+        shutil.copy(RULES, self.rules)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assignTaube(self, assigner):
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        assigner.assignToDependencyGraph(depGraph)
+        return depGraph.get_by_address(2)['semrep']
+
+    def testCachedRules(self):
+        fromfile = montesniere.assign.SemRepAssigner.fromfile
+        expected = self.assignTaube(fromfile(self.rules))
+        self.assignTaube(fromfile(self.rules, cache=self.cache))
+        self.assertTrue(os.path.exists(self.cache))
+        cached = fromfile(self.rules, cache=self.cache)
+        self.assertEqual(self.assignTaube(cached), expected)
+        # Equal conditions are still shared.
+        self.assertIs(cached.rules[2].conditions[0],
+                cached.rules[3].conditions[0])
+        # The types are interned again.
+        self.assertTrue(montesniere.semtypes.TYPES.isCanonical(
+            cached.rules[0].resultType))
+
+    def testChangedRules(self):
+        fromfile = montesniere.assign.SemRepAssigner.fromfile
+        fromfile(self.rules, cache=self.cache)
+        with open(self.rules) as f:
+            rules = json.load(f)
+        for r in rules:
+            if r['semRepPat'] == r'\x. {[lemma]}(x)':
+                r['semRepPat'] = r'\y. {[lemma]}(y)'
+        with open(self.rules, 'w') as f:
+            json.dump(rules, f)
+        assigner = fromfile(self.rules, cache=self.cache)
+        self.assertEqual(self.assignTaube(assigner),
+                tlp.parse(r'\y. Taube(y)'))
+
+    def testDamagedCache(self):
+        with open(self.cache, 'wb') as f:
+            f.write(b'no pickle')
+        assigner = montesniere.assign.SemRepAssigner.fromfile(
+                self.rules, cache=self.cache)
+        self.assertEqual(self.assignTaube(assigner),
+                tlp.parse(r'\x. Taube(x)'))
+
+    def testNoTemporaryFileLeft(self):
+        def failingDump(*args, **kwargs):
+            raise ValueError('pickling failed')
+        dump = montesniere.assign.pickle.dump
+        montesniere.assign.pickle.dump = failingDump
+        try:
+            with self.assertRaises(ValueError):
+                montesniere.assign.SemRepAssigner.fromfile(self.rules,
+                        cache=self.cache)
+        finally:
+            montesniere.assign.pickle.dump = dump
+        self.assertEqual(os.listdir(self.directory), ['rules.json'])
+
 if __name__ == '__main__':
     global RULES
     global TEST_DIR
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+import json
+import copy
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+Condition = montesniere.condition.Condition
+batch = montesniere.batch
+
+@unittest.skipIf(batch.np is None, 'NumPy is not available')
+class Evaluation(unittest.TestCase):
+    """Vectorized conditions must agree with the conditions node by node."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(RULES) as f:
+            strings = {c for r in json.load(f) for c in r['conditions']}
+        extra = ['deps notSubset {NK}', 'deps cardinality {0, 2}',
+                'deps notCardinality {0, 1}', 'deps exist {}',
+                'deps notExist {}', 'OA.deps subset {NK}',
+                '^.^.tag element {VVFIN}', 'NK.NK.lemma element {Hase}',
+                '! rel element^{NK, CJ} {SB}', 'SB.deps superset {XY}']
+        cls.conditions = [Condition.fromstring(c)
+                for c in sorted(strings) + extra]
+        cls.depGraphs = []
+        for conllFile in ['schenkender_hase.conll', 'doppelte_objekt.conll',
+                'tag_in_hängematte.conll', 'nicht_jeder_mensch.conll']:
+            with open(os.path.join(TEST_DIR, conllFile)) as f:
+                depGraph = nlp.DependencyGraph(f.read())
+                cls.depGraphs.append((depGraph, sorted(depGraph.nodes)))
+
+    def testSameResults(self):
+        for depGraph, addresses in Evaluation.depGraphs:
+            arrays = batch.GraphArrays(depGraph)
+            for cond in Evaluation.conditions:
+                results = dict(zip(arrays.addresses,
+                    batch.evaluate(cond, arrays)))
+                for address in addresses:
+                    # Testing a condition node by node can add empty
+                    # labels to the deps, so each test gets a fresh copy.
+                    self.assertEqual(results[address],
+                            cond(copy.deepcopy(depGraph), address),
+                            msg='{} at {}'.format(cond, address))
+
+    def testUnsupportedCondition(self):
+        depGraph = Evaluation.depGraphs[0][0]
+        cond = Condition(lambda g, a, f: f(a), 'element', {2})
+        arrays = batch.GraphArrays(depGraph)
+        results = dict(zip(arrays.addresses, batch.evaluate(cond, arrays)))
+        self.assertEqual({a for a in results if results[a]}, {2})
+
+@unittest.skipIf(batch.np is None, 'NumPy is not available')
+class BatchAssignment(unittest.TestCase):
+    """Assign in batch mode while comparing to the linear scan."""
+
+    def assertVerified(self, conllFile):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, batch=True, verify=True)
+        assigner.assignToDependencyGraph(depGraph)
+        self.assertIn('semrep', depGraph.get_by_address(1))
+
+    def testSchenkenderHase(self):
+        self.assertVerified('schenkender_hase.conll')
+
+    def testKeineWanduhr(self):
+        self.assertVerified('keine_wanduhr.conll')
+
+    def testDoppelteObjekt(self):
+        self.assertVerified('doppelte_objekt.conll')
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepRule = montesniere.assign.SemRepRule
+Condition = montesniere.condition.Condition
+CompiledRules = montesniere.codegen.CompiledRules
+
+class Source(unittest.TestCase):
+
+    def testReadable(self):
+        rules = [SemRepRule(['tag element {NN}', '! NK.tag element {ART}'],
+            '{[lemma]}', {'{[lemma]}': 'e'})]
+        source = CompiledRules(rules).source
+        self.assertIn('def select(depGraph, address):', source)
+        self.assertIn('# Rule 0', source)
+        self.assertIn('! NK.tag element {ART}', source)
+
+    def testCustomSubject(self):
+        cond = Condition(lambda g, a, f: f(a), 'element', {2})
+        rules = [SemRepRule([cond], '{[lemma]}', {'{[lemma]}': 'e'})]
+        compiled = CompiledRules(rules)
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        self.assertIs(compiled.select(depGraph, 2), rules[0])
+        self.assertIsNone(compiled.select(depGraph, 3))
+
+class SameRules(unittest.TestCase):
+    """The compiled rules must select the rules a linear scan selects."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, verify=True)
+        cls.assigner.compile()
+
+    def assertSameRules(self, conllFile):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        SameRules.assigner.assignToDependencyGraph(depGraph)
+
+    def testSchenkenderHase(self):
+        self.assertSameRules('schenkender_hase.conll')
+
+    def testKeineWanduhr(self):
+        self.assertSameRules('keine_wanduhr.conll')
+
+    def testNichtEinHund(self):
+        self.assertSameRules('nicht_ein_hund.conll')
+
+    def testDoppelteObjekt(self):
+        self.assertSameRules('doppelte_objekt.conll')
+
+    def testTagInHaengematte(self):
+        self.assertSameRules('tag_in_hängematte.conll')
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+import json
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+Condition = montesniere.condition.Condition
+
+class LabelMasks(unittest.TestCase):
+    """Conditions decided on label masks must agree with the set relations."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(RULES) as f:
+            strings = {c for r in json.load(f) for c in r['conditions']}
+        extra = ['deps notSubset {NK}', 'deps notCardinality {0, 1}',
+                'deps exist {}', 'deps notExist {}', 'OA.deps subset {NK}',
+                'tag notElement {NN, NE}']
+        cls.conditions = [Condition.fromstring(c)
+                for c in sorted(strings) + extra]
+        cls.depGraphs = []
+        for conllFile in ['schenkender_hase.conll', 'doppelte_objekt.conll',
+                'tag_in_hängematte.conll', 'nicht_jeder_mensch.conll']:
+            with open(os.path.join(TEST_DIR, conllFile)) as f:
+                depGraph = nlp.DependencyGraph(f.read())
+                cls.depGraphs.append((depGraph, sorted(depGraph.nodes)))
+
+    def testMasksUsed(self):
+        masked = [c for c in LabelMasks.conditions
+                if c.relationFixedMask is not None]
+        self.assertGreater(len(masked), 20)
+
+    def testSameResults(self):
+        for cond in LabelMasks.conditions:
+            unmasked = Condition(cond.subj, cond.rel, cond.obj,
+                    cond.transeunda, cond.negated)
+            unmasked.relationFixedMask = None
+            for depGraph, addresses in LabelMasks.depGraphs:
+                for address in addresses:
+                    self.assertEqual(
+                            cond(depGraph, address),
+                            unmasked(depGraph, address),
+                            msg='{} at {}'.format(cond, address))
+
+    def testChangedDeps(self):
+        depGraph = nlp.DependencyGraph(
+                '1\tPeter\tPeter\tNOUN\tNE\t_\t0\tROOT\t_\t_\n')
+        cond = Condition.fromstring('deps superset {NK}')
+        self.assertFalse(cond(depGraph, 1))
+        depGraph.get_by_address(1)['deps']['NK'] = []
+        self.assertTrue(cond(depGraph, 1))
+
+    def testCustomSubjectWithKey(self):
+        def subj(depGraph, address, relationFixedObj):
+            return relationFixedObj(depGraph.get_by_address(address)['tag'])
+        subj.key = 'tag'
+        cond = Condition(subj, 'element', {'NN'})
+        self.assertIsNone(cond.relationFixedMask)
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        self.assertEqual([a for a in sorted(depGraph.nodes)
+                if cond(depGraph, a)],
+            [a for a in sorted(depGraph.nodes)
+                if depGraph.get_by_address(a)['tag'] == 'NN'])
+
+class Paths(unittest.TestCase):
+    """Subjects with paths are traversed without changing the graph."""
+
+    def setUp(self):
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            self.depGraph = nlp.DependencyGraph(f.read())
+
+    def testHead(self):
+        cond = Condition.fromstring('^.tag element {VVFIN}')
+        self.assertTrue(cond(self.depGraph, 2))
+        self.assertFalse(cond(self.depGraph, 1))
+
+    def testHeadAndDependents(self):
+        cond = Condition.fromstring('^.NK.tag element {ART}')
+        self.assertTrue(cond(self.depGraph, 1))
+        self.assertFalse(cond(self.depGraph, 4))
+
+    def testMissingHead(self):
+        cond = Condition.fromstring('^.^.tag notElement {TOP}')
+        self.assertTrue(cond(self.depGraph, 3))
+        self.assertNotIn(None, self.depGraph.nodes)
+
+    def testGraphUnchanged(self):
+        cond = Condition.fromstring('OA.deps subset {NK}')
+        self.assertTrue(cond(self.depGraph, 3))
+        self.assertFalse(cond(self.depGraph, 2))
+        self.assertNotIn('OA', self.depGraph.get_by_address(2)['deps'])
+
+class Transeunda(unittest.TestCase):
+    """Conditions climb over transeunda to the ancestors of a node."""
+
+    def setUp(self):
+        # A chain of NK dependents below a subject.
+        lines = ['1\tHaus\tHaus\tNOUN\tNN\t_\t5\tSB\t_\t_']
+        for n in range(2, 5):
+            lines.append('{0}\tx{0}\tx{0}\tNOUN\tNN\t_\t{1}\tNK\t_\t_'
+                    .format(n, n - 1))
+        lines.append('5\tsteht\tstehen\tVERB\tVVFIN\t_\t0\tROOT\t_\t_')
+        self.depGraph = nlp.DependencyGraph('\n'.join(lines))
+
+    def testClimb(self):
+        cond = Condition.fromstring('rel element^{NK} {SB}')
+        for address in range(1, 5):
+            self.assertTrue(cond(self.depGraph, address))
+        self.assertFalse(cond(self.depGraph, 5))
+
+    def testAncestors(self):
+        features = montesniere.features.graphFeatures(self.depGraph)
+        self.assertEqual(features.ancestors(4, frozenset({'NK'})), (3, 2, 1))
+        self.assertEqual(features.ancestors(1, frozenset({'NK'})), ())
+
+    def testCycle(self):
+        self.depGraph.get_by_address(2)['head'] = 3
+        cond = Condition.fromstring('rel element^{NK} {SB}')
+        self.assertFalse(cond(self.depGraph, 4))
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
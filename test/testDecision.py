@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepRule = montesniere.assign.SemRepRule
+fromstring = montesniere.condition.Condition.fromstring
+
+class CountingSubject:
+    """A subject function counting how often it is called."""
+
+    def __init__(self, key):
+        self.key = key
+        self.calls = 0
+
+    def __call__(self, depGraph, address, relationFixedObj):
+        self.calls += 1
+        return relationFixedObj(depGraph.get_by_address(address)[self.key])
+
+class Selection(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        conllFile = os.path.join(TEST_DIR, 'beissende_taube.conll')
+        with open(conllFile) as f:
+            cls.depGraph = nlp.DependencyGraph(f.read())
+
+    def testSharedConditionTestedOnce(self):
+        subj = CountingSubject('lemma')
+        cond = montesniere.condition.Condition(subj, 'element', {'Peter'})
+        rules = [
+                SemRepRule([cond, fromstring('tag element {NN}')],
+                    '{[lemma]}', {'{[lemma]}': 'e'}),
+                SemRepRule([cond, fromstring('rel element {SB}')],
+                    '{[lemma]}', {'{[lemma]}': 'e'}),
+                SemRepRule([cond], '{[lemma]}', {'{[lemma]}': 'e'}),
+                ]
+        dag = montesniere.decision.DecisionDAG(rules)
+        self.assertIs(dag.select(Selection.depGraph, 4), rules[2])
+        self.assertEqual(subj.calls, 1)
+
+    def testNoMatch(self):
+        rules = [SemRepRule(['tag element {NN}', 'rel element {OA}'],
+            '{[lemma]}', {'{[lemma]}': 'e'})]
+        dag = montesniere.decision.DecisionDAG(rules)
+        self.assertIsNone(dag.select(Selection.depGraph, 2))
+
+    def testFirstMatch(self):
+        rules = [
+                SemRepRule(['tag element {NN}', 'deps superset {NK}'],
+                    '{[lemma]}', {'{[lemma]}': 'e'}),
+                SemRepRule(['tag element {NN}'], '{[lemma]}',
+                    {'{[lemma]}': 'e'}),
+                ]
+        dag = montesniere.decision.DecisionDAG(rules)
+        self.assertIs(dag.select(Selection.depGraph, 2), rules[0])
+
+class Building(unittest.TestCase):
+
+    def testLongChain(self):
+        # A rule with more conditions than the recursion limit, each
+        # tested after the other.
+        conds = ['deps notCardinality {{{}}}'.format(n)
+                for n in range(sys.getrecursionlimit() + 100)]
+        rules = [SemRepRule(conds, '{[lemma]}', {'{[lemma]}': 'e'})]
+        dag = montesniere.decision.DecisionDAG(rules)
+        self.assertEqual(dag.depth, len(conds))
+
+    def testTooManyStates(self):
+        rules = [SemRepRule(['deps superset {{{}}}'.format(label)],
+            '{[lemma]}', {'{[lemma]}': 'e'})
+            for label in ['SB', 'OA', 'DA', 'NK', 'MO']]
+        self.assertRaises(montesniere.decision.TooManyStatesException,
+                montesniere.decision.DecisionDAG, rules, maxStates=4)
+        maxStates = montesniere.decision.MAX_STATES
+        montesniere.decision.MAX_STATES = 4
+        try:
+            assigner = montesniere.assign.SemRepAssigner(rules, dag=True)
+        finally:
+            montesniere.decision.MAX_STATES = maxStates
+        self.assertIsNone(assigner.dag)
+        self.assertIsNotNone(assigner.index)
+
+class VerifiedAssignment(unittest.TestCase):
+    """Assign with the decision DAG while comparing to the linear scan."""
+
+    def assertVerified(self, conllFile):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, dag=True, verify=True)
+        assigner.assignToDependencyGraph(depGraph)
+
+    def testSchenkenderHase(self):
+        self.assertVerified('schenkender_hase.conll')
+
+    def testKeineWanduhr(self):
+        self.assertVerified('keine_wanduhr.conll')
+
+    def testNichtEinHund(self):
+        self.assertVerified('nicht_ein_hund.conll')
+
+    def testDoppelteObjekt(self):
+        self.assertVerified('doppelte_objekt.conll')
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
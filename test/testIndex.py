@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepRule = montesniere.assign.SemRepRule
+
+class Candidates(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rules = [
+                SemRepRule(['tag element {NE}', 'rel element {SB}'],
+                    r'\P. P({[lemma]})', {'P': '<e,t>', '{[lemma]}': 'e'}),
+                SemRepRule(['tag element {NN}', 'rel element^{NK} {SB}'],
+                    r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'}),
+                SemRepRule(['! tag element {NE}'],
+                    r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'}),
+                SemRepRule(['tag notElement {ART}', 'rel element {OA}'],
+                    r'{[lemma]}', {'{[lemma]}': 'e'}),
+                ]
+        cls.index = montesniere.index.RuleIndex(cls.rules)
+
+    def testTagAndRel(self):
+        candidates = Candidates.index.candidates({'tag': 'NE', 'rel': 'SB'})
+        self.assertEqual(candidates, [Candidates.rules[0], Candidates.rules[2]])
+
+    def testTranseunda(self):
+        # The transeunda condition does not exclude the second rule.
+        candidates = Candidates.index.candidates({'tag': 'NN', 'rel': 'NK'})
+        self.assertEqual(candidates, [Candidates.rules[1], Candidates.rules[2]])
+
+    def testUnknownValues(self):
+        candidates = Candidates.index.candidates({'tag': 'XY', 'rel': 'OA'})
+        self.assertEqual(candidates, [Candidates.rules[2], Candidates.rules[3]])
+
+class IndexedAssignment(unittest.TestCase):
+
+    def assertSameAssignment(self, conllFile):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            conll = f.read()
+        indexed = nlp.DependencyGraph(conll)
+        linear = nlp.DependencyGraph(conll)
+        montesniere.assign.SemRepAssigner.fromfile(
+                RULES, indexed=True).assignToDependencyGraph(indexed)
+        montesniere.assign.SemRepAssigner.fromfile(
+                RULES, indexed=False).assignToDependencyGraph(linear)
+        for address in linear.nodes:
+            self.assertEqual(
+                    indexed.get_by_address(address).get('semrep'),
+                    linear.get_by_address(address).get('semrep'))
+
+    def testSchenkenderHase(self):
+        self.assertSameAssignment('schenkender_hase.conll')
+
+    def testNichtJederMensch(self):
+        self.assertSameAssignment('nicht_jeder_mensch.conll')
+
+    def testGutesLeckeresFutter(self):
+        self.assertSameAssignment('gutes_leckeres_futter.conll')
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
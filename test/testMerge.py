@@ -17,12 +17,14 @@ from context import montesniere
 
 tlp = nll.LogicParser(type_check=True)
 
-def getMergedRepresentation(conllFile, rules):
+def getMergedRepresentation(conllFile, rules, deferNormalization=False,
+        useTerms=False):
     with open(conllFile) as f:
         depGraph = nlp.DependencyGraph(f.read())
     assigner = montesniere.assign.SemRepAssigner.fromfile(rules, ascii=True)
     assigner.assignToDependencyGraph(depGraph)
-    merger = montesniere.merge.SemMerger(depGraph)
+    merger = montesniere.merge.SemMerger(depGraph,
+            deferNormalization=deferNormalization, useTerms=useTerms)
     return merger.getSemantics()
 
 def assertEquivalent(self, expr1, expr2):
@@ -400,6 +402,325 @@ class LeckeresFutter(unittest.TestCase):
         expected = tlp.parse(semRep, signature=semSig)
         self.assertEquivalent(assigned, expected)
 
+class MergePlanning(unittest.TestCase):
+
+    def setUp(self):
+        self.planner = montesniere.merge.MergePlanner()
+        self.parseType = montesniere.semtypes.parseType
+        self.depGraph = nlp.DependencyGraph('Peter\tNE\t0\tROOT\n')
+        montesniere.merge.SemMerger.clearPlanCache()
+
+    def testPlanFollowsSearchOrder(self):
+        types = [self.parseType(t)
+                for t in ['<e,t>', 'e', '<<e,t>,<e,t>>']]
+        # Applying <e,t> to e first leaves <<e,t>,<e,t>> and t, so the
+        # search backtracks to applying <<e,t>,<e,t>> to <e,t>.
+        plan = self.planner.plan(types)
+        self.assertEqual(plan, [(2, 0), (1, 0)])
+
+    def testImpossiblePlan(self):
+        types = [self.parseType(t) for t in ['e', 'e', '<e,t>']]
+        self.assertIsNone(self.planner.plan(types))
+        # Applying <e,t> to either e leaves e and t.
+        self.assertEqual(self.planner.counters(),
+                {'hits': 1, 'misses': 2, 'explored': 2})
+
+    def testMergeCountsPlans(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        mergeDict = {1: tlp.parse('peter'), 2: tlp.parse('maria'),
+                3: tlp.parse(r'\x. laufen(x)', signature={'laufen': '<e,t>'})}
+        with self.assertRaises(montesniere.merge.NoMergePossibleException):
+            merger._merge(mergeDict)
+        self.assertEqual(merger.planCounters,
+                {'hits': 1, 'misses': 2, 'explored': 2, 'cached': 0})
+
+    def testPlansAreCached(self):
+        mergeDict = {1: tlp.parse(r'\x. laufen(x)', signature={'laufen': '<e,t>'}),
+                2: tlp.parse('peter')}
+        impossibleDict = {1: tlp.parse('peter'), 2: tlp.parse('maria')}
+        first = montesniere.merge.SemMerger(self.depGraph)
+        first._merge(mergeDict)
+        self.assertRaises(montesniere.merge.NoMergePossibleException,
+                first._merge, impossibleDict)
+        self.assertEqual(first.planCounters['cached'], 0)
+
+        second = montesniere.merge.SemMerger(self.depGraph)
+        mergeDict[2] = tlp.parse('maria')
+        self.assertEqual(second._merge(mergeDict), tlp.parse('laufen(maria)'))
+        self.assertRaises(montesniere.merge.NoMergePossibleException,
+                second._merge, impossibleDict)
+        self.assertEqual(second.planCounters,
+                {'hits': 0, 'misses': 0, 'explored': 0, 'cached': 2})
+
+    def testCachedPlansKeepOrder(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        laufen = tlp.parse(r'\x. laufen(x)', signature={'laufen': '<e,t>'})
+        peter = tlp.parse('peter')
+        self.assertEqual(merger._merge({1: laufen, 2: peter}),
+                tlp.parse('laufen(peter)'))
+        self.assertEqual(merger._merge({1: peter, 2: laufen}),
+                tlp.parse('laufen(peter)'))
+
+    def testPlanCacheIsBounded(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        size = montesniere.merge.PLAN_CACHE_SIZE
+        montesniere.merge.PLAN_CACHE_SIZE = 2
+        try:
+            plans = [[self.parseType(t), self.parseType('e')]
+                    for t in ['<e,t>', '<e,e>', '<e,<e,t>>']]
+            merger._plan(plans[0])
+            merger._plan(plans[1])
+            # Using the first plan again keeps it, the second is the least
+            # recently used one.
+            merger._plan(plans[0])
+            merger._plan(plans[2])
+            cache = montesniere.merge.SemMerger._plans
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(list(cache),
+                    [tuple(id(t) for t in plans[n]) for n in (0, 2)])
+        finally:
+            montesniere.merge.PLAN_CACHE_SIZE = size
+
+    def testMergeExecutesPlan(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        mergeDict = {
+                1: tlp.parse(r'\P Q. exists x. (P(x) & Q(x))'),
+                2: tlp.parse(r'\x. taube(x)', signature={'taube': '<e,t>'}),
+                3: tlp.parse(r'\x. fliegen(x)', signature={'fliegen': '<e,t>'})
+                }
+        merged = merger._merge(mergeDict)
+        expected = tlp.parse(r'exists x. (taube(x) & fliegen(x))')
+        self.assertEqual(merged, expected)
+        self.assertEqual(merged.type, nll.TRUTH_TYPE)
+
+    def testMergeKeepsExpressions(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        mergeDict = {
+                1: tlp.parse(r'\P Q. exists x. (P(x) & Q(x))'),
+                2: tlp.parse(r'\x. taube(x)', signature={'taube': '<e,t>'}),
+                3: tlp.parse(r'\x. fliegen(x)', signature={'fliegen': '<e,t>'})
+                }
+        strings = {k: str(v) for k, v in mergeDict.items()}
+        types = {k: v.type for k, v in mergeDict.items()}
+        merger._merge(mergeDict)
+        self.assertEqual({k: str(v) for k, v in mergeDict.items()}, strings)
+        self.assertEqual({k: v.type for k, v in mergeDict.items()}, types)
+
+    def testMergeImpossible(self):
+        merger = montesniere.merge.SemMerger(self.depGraph)
+        mergeDict = {1: tlp.parse('peter'), 2: tlp.parse('maria')}
+        with self.assertRaises(montesniere.merge.NoMergePossibleException):
+            merger._merge(mergeDict)
+
+class DeferredNormalization(unittest.TestCase):
+
+    conllFiles = [
+                'beissende_taube.conll',
+                'furie_in_kleid.conll',
+                'haus_in_russland.conll',
+                'heute_baden.conll',
+                'kein_mensch_zahlt.conll',
+                'keine_wanduhr.conll',
+                'leckeres_futter.conll',
+                'lehrender_lehrer.conll',
+                'lehrling_sein.conll',
+                'nicht_ein_hund.conll',
+                'nicht_jeder_mensch.conll',
+                'schenkender_hase.conll',
+                'schuppige_beine.conll',
+                'schuppiges_bein.conll',
+                'singt_und_tanzt.conll',
+                'waldgurken.conll',
+                ]
+
+    def testSameSemantics(self):
+        for conllFile in self.conllFiles:
+            path = os.path.join(TEST_DIR, conllFile)
+            merged = getMergedRepresentation(path, RULES)
+            deferred = getMergedRepresentation(path, RULES,
+                    deferNormalization=True)
+            # Expressions are equal if they are alpha-equivalent.
+            self.assertEqual(deferred, merged, conllFile)
+
+    def testMergeIsNotSimplified(self):
+        depGraph = nlp.DependencyGraph('Peter\tNE\t0\tROOT\n')
+        merger = montesniere.merge.SemMerger(depGraph,
+                deferNormalization=True)
+        merged = merger._merge({
+                1: tlp.parse(r'\x. laufen(x)', signature={'laufen': '<e,t>'}),
+                2: tlp.parse('peter')})
+        self.assertIsInstance(merged, nll.ApplicationExpression)
+        self.assertEqual(merged.simplify(), tlp.parse('laufen(peter)'))
+
+class MergeTerms(unittest.TestCase):
+
+    def testSameSemantics(self):
+        for conllFile in DeferredNormalization.conllFiles:
+            path = os.path.join(TEST_DIR, conllFile)
+            merged = getMergedRepresentation(path, RULES)
+            for deferNormalization in [False, True]:
+                terms = getMergedRepresentation(path, RULES,
+                        deferNormalization=deferNormalization,
+                        useTerms=True)
+                self.assertEqual(terms, merged, conllFile)
+
+    def testMergedTerms(self):
+        depGraph = nlp.DependencyGraph(
+                'Der\tART\t2\tNK\nMann\tNN\t3\tSB\n'
+                'lacht\tVVFIN\t0\tROOT\n')
+        depGraph.nodes[1]['semrep'] = tlp.parse(
+                r'\P Q. exists x. (P(x) & Q(x))',
+                signature={'P': '<e,t>', 'Q': '<e,t>'})
+        depGraph.nodes[2]['semrep'] = tlp.parse(r'\x. mann(x)',
+                signature={'mann': '<e,t>'})
+        depGraph.nodes[3]['semrep'] = tlp.parse(r'\x. lachen(x)',
+                signature={'lachen': '<e,t>'})
+        merger = montesniere.merge.SemMerger(depGraph, useTerms=True)
+        self.assertEqual(merger.getSemantics(),
+                tlp.parse('exists x. (mann(x) & lachen(x))'))
+        node = depGraph.nodes[2]
+        self.assertNotIn('mergedsemrep', node)
+        self.assertEqual(merger.terms.toExpression(node['mergedterm']),
+                tlp.parse(r'\Q. exists x. (mann(x) & Q(x))'))
+        self.assertEqual(node['mergedtype'], nll.read_type('<<e,t>,t>'))
+
+    def sentence(self, n):
+        depGraph = nlp.DependencyGraph(
+                'Der\tART\t2\tNK\nMann{0}\tNN\t3\tSB\n'
+                'lacht{0}\tVVFIN\t0\tROOT\n'.format(n))
+        depGraph.nodes[1]['semrep'] = tlp.parse(
+                r'\P Q. exists x. (P(x) & Q(x))',
+                signature={'P': '<e,t>', 'Q': '<e,t>'})
+        depGraph.nodes[2]['semrep'] = tlp.parse(
+                r'\x. mann{}(x)'.format(n),
+                signature={'mann{}'.format(n): '<e,t>'})
+        depGraph.nodes[3]['semrep'] = tlp.parse(
+                r'\x. lachen{}(x)'.format(n),
+                signature={'lachen{}'.format(n): '<e,t>'})
+        return depGraph
+
+    def testTableIsShared(self):
+        montesniere.merge.SemMerger.clearTermTable()
+        first = montesniere.merge.SemMerger(self.sentence(0), useTerms=True)
+        first.getSemantics()
+        size = len(first.terms)
+        second = montesniere.merge.SemMerger(self.sentence(0), useTerms=True)
+        self.assertIs(second.terms, first.terms)
+        second.getSemantics()
+        # The terms and normal forms of the first sentence are reused.
+        self.assertEqual(len(second.terms), size)
+
+    def testTableIsBounded(self):
+        montesniere.merge.SemMerger.clearTermTable()
+        size = montesniere.merge.TERM_TABLE_SIZE
+        montesniere.merge.TERM_TABLE_SIZE = 50
+        try:
+            tables = []
+            for n in range(20):
+                merger = montesniere.merge.SemMerger(self.sentence(n),
+                        useTerms=True)
+                self.assertEqual(merger.getSemantics(), tlp.parse(
+                        r'exists x. (mann{0}(x) & lachen{0}(x))'.format(n)))
+                if merger.terms not in tables:
+                    tables.append(merger.terms)
+            # Each table was replaced after growing beyond the limit by
+            # the fewer than 30 nodes and results of a sentence.
+            self.assertGreater(len(tables), 1)
+            for table in tables[:-1]:
+                self.assertLess(len(table), 50 + 30)
+        finally:
+            montesniere.merge.TERM_TABLE_SIZE = size
+            montesniere.merge.SemMerger.clearTermTable()
+
+class DeepGraphs(unittest.TestCase):
+
+    def testChainDeeperThanRecursionLimit(self):
+        depth = sys.getrecursionlimit() + 100
+        lines = ['Peter\tNE\t0\tROOT']
+        lines.extend('Peter\tNE\t{}\tNK'.format(n) for n in range(1, depth))
+        depGraph = nlp.DependencyGraph('\n'.join(lines) + '\n')
+        depGraph.nodes[depth]['semrep'] = tlp.parse('peter')
+        merger = montesniere.merge.SemMerger(depGraph)
+        self.assertEqual(merger.getSemantics(), tlp.parse('peter'))
+        self.assertTrue(all(merger.isMerged(depGraph.nodes[n])
+            for n in range(1, depth + 1)))
+
+    def testChainWithSemRepsOnAllLevels(self):
+        # Each level adds a conjunct, so the merged representation nests
+        # as deep as the chain. nltk processes it recursively, which
+        # bounds the depth that can be merged.
+        depth = 150
+        results = []
+        for kwargs in [{}, {'deferNormalization': True}, {'useTerms': True}]:
+            lines = ['Wort\tNN\t0\tROOT']
+            lines.extend('Wort\tNN\t{}\tMO'.format(n)
+                    for n in range(1, depth))
+            depGraph = nlp.DependencyGraph('\n'.join(lines) + '\n')
+            for n in range(1, depth):
+                depGraph.nodes[n]['semrep'] = tlp.parse(
+                        r'\P x. (P(x) & rot{}(x))'.format(n),
+                        signature={'P': '<e,t>', 'rot{}'.format(n): '<e,t>'})
+            depGraph.nodes[depth]['semrep'] = tlp.parse(r'\x. rot0(x)',
+                    signature={'rot0': '<e,t>'})
+            merger = montesniere.merge.SemMerger(depGraph, **kwargs)
+            results.append(merger.getSemantics())
+        # The conjunct of the leaf comes first, then those of its heads.
+        conjuncts = 'rot0(x)'
+        for n in range(depth - 1, 0, -1):
+            conjuncts = '({} & rot{}(x))'.format(conjuncts, n)
+        expected = tlp.parse(r'\x. {}'.format(conjuncts))
+        for result in results:
+            self.assertEqual(result, expected)
+            self.assertEqual(result.type, nll.read_type('<e,t>'))
+
+    def testDeepChainWithSemRepsOnAllLevels(self):
+        depth = 3000
+        for kwargs in [{'deferNormalization': True}, {'useTerms': True},
+                {'deferNormalization': True, 'useTerms': True}]:
+            lines = ['Wort\tNN\t0\tROOT']
+            lines.extend('Wort\tNN\t{}\tMO'.format(n)
+                    for n in range(1, depth))
+            depGraph = nlp.DependencyGraph('\n'.join(lines) + '\n')
+            for n in range(1, depth):
+                depGraph.nodes[n]['semrep'] = tlp.parse(
+                        r'\P x. (P(x) & rot(x))',
+                        signature={'P': '<e,t>', 'rot': '<e,t>'})
+            depGraph.nodes[depth]['semrep'] = tlp.parse(r'\x. wort(x)',
+                    signature={'wort': '<e,t>'})
+            merger = montesniere.merge.SemMerger(depGraph, **kwargs)
+            result = merger.getSemantics()
+            # The result nests deeper than nltk can compare or print, so
+            # its conjuncts are checked one after the other.
+            self.assertIsInstance(result, nll.LambdaExpression)
+            variable = result.variable
+            conjunction = result.term
+            for _ in range(1, depth):
+                self.assertIsInstance(conjunction, nll.AndExpression)
+                self.assertEqual(conjunction.second,
+                        nll.ApplicationExpression(nll.ConstantExpression(
+                            nll.Variable('rot')),
+                            nll.VariableExpression(variable)))
+                conjunction = conjunction.first
+            self.assertEqual(str(conjunction),
+                    'wort({})'.format(variable.name), kwargs)
+
+    def testChildrenAreMergedFirst(self):
+        depGraph = nlp.DependencyGraph(
+                'Der\tART\t2\tNK\nMann\tNN\t3\tSB\n'
+                'lacht\tVVFIN\t0\tROOT\n')
+        depGraph.nodes[1]['semrep'] = tlp.parse(
+                r'\P Q. exists x. (P(x) & Q(x))',
+                signature={'P': '<e,t>', 'Q': '<e,t>'})
+        depGraph.nodes[2]['semrep'] = tlp.parse(r'\x. mann(x)',
+                signature={'mann': '<e,t>'})
+        depGraph.nodes[3]['semrep'] = tlp.parse(r'\x. lachen(x)',
+                signature={'lachen': '<e,t>'})
+        merger = montesniere.merge.SemMerger(depGraph)
+        self.assertEqual(merger.getSemantics(),
+                tlp.parse('exists x. (mann(x) & lachen(x))'))
+        self.assertEqual(depGraph.nodes[2]['mergedsemrep'],
+                tlp.parse(r'\Q. exists x. (mann(x) & Q(x))'))
+
 if __name__ == '__main__':
     unittest.TestCase.assertEquivalent = assertEquivalent
     global RULES
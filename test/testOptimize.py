@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepRule = montesniere.assign.SemRepRule
+fromstring = montesniere.condition.Condition.fromstring
+ConditionOptimizer = montesniere.optimize.ConditionOptimizer
+
+CONLL_FILES = ['beissende_taube.conll', 'schenkender_hase.conll',
+        'lehrender_lehrer.conll', 'keine_wanduhr.conll',
+        'doppelte_objekt.conll', 'nicht_ein_hund.conll']
+
+def readGraphs():
+    depGraphs = []
+    for conllFile in CONLL_FILES:
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            depGraphs.append(nlp.DependencyGraph(f.read()))
+    return depGraphs
+
+class Ordering(unittest.TestCase):
+
+    def testCheapFirst(self):
+        path = fromstring('^.NK.tag element {ART}')
+        tag = fromstring('tag element {NN}')
+        rule = SemRepRule([path, tag], '{[lemma]}', {'{[lemma]}': 'e'})
+        ConditionOptimizer().optimize([rule])
+        self.assertEqual(rule.testOrder, [tag, path])
+        self.assertEqual(rule.conditions, [path, tag])
+
+    def testSelectiveFirst(self):
+        tag = fromstring('tag element {VVFIN}')
+        rel = fromstring('rel notElement {ROOT}')
+        rule = SemRepRule([rel, tag], '{[lemma]}', {'{[lemma]}': 'e'})
+        optimizer = ConditionOptimizer()
+        optimizer.calibrate([rule], readGraphs())
+        self.assertLess(optimizer.probability(tag),
+                optimizer.probability(rel))
+        optimizer.optimize([rule])
+        self.assertEqual(rule.testOrder, [tag, rel])
+
+    def testNeverTested(self):
+        self.assertEqual(
+                ConditionOptimizer().probability(fromstring('tag element {}')),
+                0.5)
+
+class SameRules(unittest.TestCase):
+    """Optimized rules must select the same rules as the original ones."""
+
+    def selectAll(self, assigner):
+        selected = []
+        for depGraph in readGraphs():
+            for address in sorted(depGraph.nodes):
+                selected.append(assigner.selectRule(depGraph, address))
+        return selected
+
+    def testCalibrated(self):
+        assigner = montesniere.assign.SemRepAssigner.fromfile(RULES)
+        expected = self.selectAll(assigner)
+        optimizer = ConditionOptimizer()
+        optimizer.calibrate(assigner.rules, readGraphs())
+        optimizer.optimize(assigner.rules)
+        self.assertTrue(any(r.testOrder != r.conditions
+            for r in assigner.rules))
+        self.assertEqual(self.selectAll(assigner), expected)
+
+    def testRuntime(self):
+        optimizer = ConditionOptimizer()
+        assigner = montesniere.assign.SemRepAssigner.fromfile(
+                RULES, optimizer=optimizer, verify=True)
+        for depGraph in readGraphs():
+            assigner.assignToDependencyGraph(depGraph)
+        self.assertGreater(len(optimizer.tested), 0)
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+
+from context import montesniere
+
+SemRepAssigner = montesniere.assign.SemRepAssigner
+SemRepRule = montesniere.assign.SemRepRule
+RuleProfiler = montesniere.profiler.RuleProfiler
+
+CONLL_FILES = ['beissende_taube.conll', 'schenkender_hase.conll',
+        'lehrender_lehrer.conll', 'keine_wanduhr.conll',
+        'doppelte_objekt.conll', 'nicht_ein_hund.conll']
+
+def readGraphs():
+    depGraphs = []
+    for conllFile in CONLL_FILES:
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            depGraphs.append(nlp.DependencyGraph(f.read()))
+    return depGraphs
+
+class Records(unittest.TestCase):
+
+    def testCounts(self):
+        rules = [
+                SemRepRule(['tag element {NN}', 'rel element {SB}'],
+                    r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'}),
+                SemRepRule(['tag element {NN}'],
+                    r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'}),
+                ]
+        profiler = RuleProfiler()
+        assigner = SemRepAssigner(rules, indexed=False, profiler=profiler)
+        with open(os.path.join(TEST_DIR, 'beissende_taube.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        assigner.assignToDependencyGraph(depGraph)
+        report = profiler.report(rules)
+        nodes = len(depGraph.nodes)
+        # Taube is the subject and the only NN.
+        self.assertEqual(report[0]['tested'], nodes)
+        # The conditions of Taube, for which the rule fired, are not
+        # counted.
+        self.assertEqual(report[0]['conditions'], nodes - 1)
+        self.assertEqual(report[0]['fired'], 1)
+        self.assertEqual(report[1]['tested'], nodes - 1)
+        self.assertEqual(report[1]['conditions'], nodes - 1)
+        self.assertEqual(report[1]['fired'], 0)
+        self.assertGreater(report[0]['assignTime'], 0)
+        self.assertEqual(report[1]['assignTime'], 0)
+        self.assertAlmostEqual(report[0]['totalTime'],
+                report[0]['testTime'] + report[0]['assignTime'])
+
+    def testSameAssignments(self):
+        profiler = RuleProfiler()
+        plain = SemRepAssigner.fromfile(RULES)
+        profiled = SemRepAssigner.fromfile(RULES, profiler=profiler,
+                verify=True)
+        fired = 0
+        for expected, depGraph in zip(readGraphs(), readGraphs()):
+            plain.assignToDependencyGraph(expected)
+            profiled.assignToDependencyGraph(depGraph)
+            for address in expected.nodes:
+                self.assertEqual(expected.nodes[address].get('semrep'),
+                        depGraph.nodes[address].get('semrep'))
+                if 'semrep' in depGraph.nodes[address]:
+                    fired += 1
+        report = profiler.report(profiled.rules)
+        self.assertEqual(sum(r['fired'] for r in report.values()), fired)
+
+    def testDecisionDAG(self):
+        profiler = RuleProfiler()
+        assigner = SemRepAssigner.fromfile(RULES, dag=True,
+                profiler=profiler)
+        for depGraph in readGraphs():
+            assigner.assignToDependencyGraph(depGraph)
+        report = profiler.report(assigner.rules)
+        self.assertGreater(sum(r['fired'] for r in report.values()), 0)
+        self.assertEqual(sum(r['tested'] for r in report.values()), 0)
+
+    def testReset(self):
+        profiler = RuleProfiler()
+        assigner = SemRepAssigner.fromfile(RULES, profiler=profiler)
+        assigner.assignToDependencyGraph(readGraphs()[0])
+        profiler.reset()
+        self.assertEqual(profiler.stats, {})
+
+class Table(unittest.TestCase):
+
+    def testSorted(self):
+        profiler = RuleProfiler()
+        assigner = SemRepAssigner.fromfile(RULES, profiler=profiler)
+        for depGraph in readGraphs():
+            assigner.assignToDependencyGraph(depGraph)
+        lines = profiler.table(assigner.rules, sortBy='tested').splitlines()
+        self.assertEqual(lines[0].split()[:3], ['rule', 'tested', 'conds'])
+        self.assertEqual(len(lines), len(assigner.rules) + 1)
+        tested = [int(line.split()[1]) for line in lines[1:]]
+        self.assertEqual(tested, sorted(tested, reverse=True))
+
+    def testLimit(self):
+        profiler = RuleProfiler()
+        assigner = SemRepAssigner.fromfile(RULES, profiler=profiler)
+        assigner.assignToDependencyGraph(readGraphs()[0])
+        table = profiler.table(assigner.rules, limit=3)
+        self.assertEqual(len(table.splitlines()), 4)
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
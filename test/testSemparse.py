@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+import json
+
+import nltk.sem.logic as nll
+
+from context import montesniere
+
+SemRepParser = montesniere.semparse.SemRepParser
+
+def structure(expr):
+    """Return a string showing the classes, names and types of expr."""
+    if isinstance(expr, nll.AbstractVariableExpression):
+        return '{}:{}:{}'.format(expr.__class__.__name__,
+                expr.variable.name, expr.type)
+    if isinstance(expr, nll.VariableBinderExpression):
+        return '{}[{}]({})'.format(expr.__class__.__name__,
+                expr.variable.name, structure(expr.term))
+    return '{}({})'.format(expr.__class__.__name__,
+            ','.join(expr.visit(structure, list)))
+
+def outcome(parser, s, signature=None):
+    try:
+        return structure(parser.parse(s, signature=signature))
+    except (nll.LogicalExpressionException, nll.TypeException) as e:
+        return 'error: {}'.format(e)
+
+class SameAsNLTK(unittest.TestCase):
+
+    def assertSame(self, s, signature=None, typeCheck=True):
+        self.assertEqual(
+                outcome(SemRepParser(type_check=typeCheck), s, signature),
+                outcome(nll.LogicParser(type_check=typeCheck), s, signature))
+
+    def testRules(self):
+        with open(RULES) as f:
+            rules = json.load(f)
+        for lemma in ['Taube', 'beissen', 'x', 'P', 'all', 'e1']:
+            node = {'lemma': lemma}
+            for r in rules:
+                semSig = {k.format(node): v for k, v in r['semSig'].items()}
+                self.assertSame(r['semRepPat'].format(node), semSig)
+
+    def testPrecedence(self):
+        self.assertSame(r'\x. P(x) & Q(x) -> R(x)', typeCheck=False)
+        self.assertSame(r'all x. P(x) & Q(x) -> - R(x)', typeCheck=False)
+        self.assertSame(r'- \x. P(x) & Q(x)', typeCheck=False)
+        self.assertSame(r'(\x. P(x))(y) & Q(y)', typeCheck=False)
+        self.assertSame(r'exists x y. R(x)(y, x)', typeCheck=False)
+        self.assertSame(r'\P.P(x)(y)', typeCheck=False)
+
+    def testOutsideSubset(self):
+        self.assertSame(r'\x. (P(x) | Q(x))')
+        self.assertSame(r'\x y. (x = y)')
+        self.assertSame(r'P(x) and Q(x)', typeCheck=False)
+        self.assertSame(r'\x. Peter-Mueller(x)')
+
+    def testErrors(self):
+        self.assertSame(r'\x. P(x')
+        self.assertSame(r'\Taube. P(Taube)')
+        self.assertSame(r'x(y)')
+        self.assertSame(r'all x.')
+        self.assertSame('')
+
+class Fallback(unittest.TestCase):
+
+    def testUnsupported(self):
+        parse = montesniere.semparse._Parse
+        Unsupported = montesniere.semparse._Unsupported
+        parse(r'\P Q. exists x. (P(x) & Q(x))').expression()
+        for s in [r'P(x) | Q(x)', r'x = y', r'iota x. P(x)', r'P(x) or Q(x)']:
+            with self.assertRaises(Unsupported):
+                parse(s).expression()
+
+if __name__ == '__main__':
+    global RULES
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+import pickle
+
+import nltk.parse as nlp
+import nltk.sem.logic as nll
+
+from context import montesniere
+
+semtypes = montesniere.semtypes
+tlp = nll.LogicParser(type_check=True)
+
+def constantTypes(expr):
+    if isinstance(expr, nll.ConstantExpression):
+        return [expr.type]
+    elif isinstance(expr, nll.AbstractVariableExpression):
+        return []
+    types = []
+    for t in expr.visit(constantTypes, list):
+        types.extend(t)
+    return types
+
+class Interning(unittest.TestCase):
+
+    def testParse(self):
+        eet = semtypes.parseType('<e,<e,t>>')
+        self.assertIs(eet, semtypes.parseType('<e,<e,t>>'))
+        self.assertIs(eet.second, semtypes.parseType('<e,t>'))
+        self.assertIs(semtypes.parseType('e'), nll.ENTITY_TYPE)
+
+    def testIntern(self):
+        et = nll.read_type('<e,t>')
+        self.assertIsNot(et, semtypes.parseType('<e,t>'))
+        self.assertIs(semtypes.internType(et), semtypes.parseType('<e,t>'))
+        self.assertIs(semtypes.internType(pickle.loads(pickle.dumps(et))),
+                semtypes.parseType('<e,t>'))
+
+    def testAnyType(self):
+        anyType = nll.read_type('<?,t>')
+        self.assertIs(semtypes.internType(anyType), anyType)
+        self.assertTrue(semtypes.sameType(nll.ANY_TYPE, nll.ANY_TYPE))
+        self.assertEqual(
+                semtypes.sameType(anyType, semtypes.parseType('<e,t>')),
+                anyType == semtypes.parseType('<e,t>'))
+
+    def testSameType(self):
+        self.assertTrue(semtypes.sameType(nll.read_type('<e,t>'),
+            semtypes.parseType('<e,t>')))
+        self.assertFalse(semtypes.sameType(semtypes.parseType('<e,t>'),
+            semtypes.parseType('<t,e>')))
+
+    def testExpression(self):
+        expr = tlp.parse(r'\x. beissen(x, Peter)',
+                signature={'beissen': '<e,<e,t>>'})
+        semtypes.internExpressionTypes(expr)
+        for t in constantTypes(expr):
+            self.assertTrue(semtypes.TYPES.isCanonical(t))
+
+class AssignedTypes(unittest.TestCase):
+
+    def assertCanonical(self, depGraph):
+        for node in depGraph.nodes.values():
+            if 'semrep' in node:
+                for t in constantTypes(node['semrep']):
+                    self.assertTrue(semtypes.TYPES.isCanonical(t))
+
+    def testAssigned(self):
+        assigner = montesniere.assign.SemRepAssigner.fromfile(RULES)
+        with open(os.path.join(TEST_DIR, 'schenkender_hase.conll')) as f:
+            depGraph = nlp.DependencyGraph(f.read())
+        assigner.assignToDependencyGraph(depGraph)
+        self.assertCanonical(depGraph)
+
+    def testPickledTemplate(self):
+        rule = montesniere.assign.SemRepRule(['tag element {NN}'],
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        rule = pickle.loads(pickle.dumps(rule))
+        semRep = rule.buildSemRep({'lemma': 'Taube'})
+        self.assertIs(semRep.term.function.type,
+                semtypes.parseType('<e,t>'))
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.parse as nlp
+import nltk.sem.logic as nll
+
+from context import montesniere
+
+tlp = nll.LogicParser(type_check=True)
+
+class Instantiation(unittest.TestCase):
+
+    def testPredicate(self):
+        template = montesniere.template.SemRepTemplate(
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        instantiated = template.instantiate({'lemma': 'Taube'})
+        expected = tlp.parse(r'\x. Taube(x)', signature={'Taube': '<e,t>'})
+        self.assertEqual(instantiated, expected)
+        self.assertEqual(str(instantiated), str(expected))
+        self.assertEqual(instantiated.type, expected.type)
+
+    def testConstant(self):
+        template = montesniere.template.SemRepTemplate(
+                r'\P. P({[lemma]})', {'P': '<e,t>', '{[lemma]}': 'e'})
+        instantiated = template.instantiate({'lemma': 'Peter'})
+        expected = tlp.parse(r'\P. P(Peter)',
+                signature={'P': '<e,t>', 'Peter': 'e'})
+        self.assertEqual(instantiated, expected)
+        self.assertEqual(instantiated.type, expected.type)
+
+    def testSkeletonUnchanged(self):
+        template = montesniere.template.SemRepTemplate(
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        template.instantiate({'lemma': 'Taube'})
+        skeleton = str(template.skeleton)
+        template.instantiate({'lemma': 'Hase'})
+        self.assertEqual(str(template.skeleton), skeleton)
+
+    def testVariableLemma(self):
+        template = montesniere.template.SemRepTemplate(
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        self.assertIsNone(template.instantiate({'lemma': 'x'}))
+        self.assertIsNone(template.instantiate({'lemma': 'P'}))
+
+    def testComplexLemma(self):
+        template = montesniere.template.SemRepTemplate(
+                r'\x. {[lemma]}(x)', {'{[lemma]}': '<e,t>'})
+        self.assertIsNone(template.instantiate({'lemma': 'Peter-Mueller'}))
+        self.assertIsNone(template.instantiate({'lemma': 'all'}))
+
+    def testFieldInName(self):
+        with self.assertRaises(ValueError):
+            montesniere.template.SemRepTemplate(
+                    r'\x. {[lemma]}_ish(x)', {'{[lemma]}_ish': '<e,t>'})
+
+class AssignedRepresentations(unittest.TestCase):
+    """The templates must yield what parsing the semRepPat yields."""
+
+    def assertSameAssignment(self, conllFile, ascii):
+        with open(os.path.join(TEST_DIR, conllFile)) as f:
+            conll = f.read()
+        templated = nlp.DependencyGraph(conll)
+        parsed = nlp.DependencyGraph(conll)
+        assigner = montesniere.assign.SemRepAssigner.fromfile(RULES, ascii)
+        assigner.assignToDependencyGraph(templated)
+        for r in assigner.rules:
+            r.template = r.asciiTemplate = None
+        assigner.assignToDependencyGraph(parsed)
+        for address in templated.nodes:
+            node = templated.get_by_address(address)
+            if 'semrep' not in node:
+                self.assertNotIn('semrep', parsed.get_by_address(address))
+                continue
+            expected = parsed.get_by_address(address)['semrep']
+            self.assertEqual(str(node['semrep']), str(expected))
+            self.assertEqual(node['semrep'].type, expected.type)
+
+    def testSchenkenderHase(self):
+        self.assertSameAssignment('schenkender_hase.conll', False)
+
+    def testBeissendeTaube(self):
+        self.assertSameAssignment('beissende_taube.conll', False)
+        self.assertSameAssignment('beissende_taube.conll', True)
+
+    def testAlteGrueneBaeume(self):
+        self.assertSameAssignment('alte_grüne_bäume.conll', True)
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()
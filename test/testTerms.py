@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import sys
+import os
+import inspect
+
+import nltk.sem.logic as nll
+
+from context import montesniere
+
+terms = montesniere.terms
+tlp = nll.LogicParser(type_check=True)
+
+class Conversion(unittest.TestCase):
+
+    def setUp(self):
+        self.table = terms.TermTable()
+
+    def testRoundTrip(self):
+        for semRep in [r'\P Q. exists x. (P(x) & Q(x))',
+                r'\P Q. all x. (P(x) -> -Q(x))',
+                r'\x. ((x = peter) | (x = maria))',
+                r'\R x. exists y. (bein(y) & R(y, x))']:
+            expr = tlp.parse(semRep)
+            converted = self.table.toExpression(
+                    self.table.fromExpression(expr))
+            self.assertEqual(str(converted), str(expr))
+
+    def testTypesAreKept(self):
+        expr = tlp.parse(r'\x. essen(x, peter)',
+                signature={'essen': '<e,<e,t>>'})
+        converted = self.table.toExpression(self.table.fromExpression(expr))
+        self.assertEqual(converted.type, expr.type)
+        self.assertEqual(converted.term.function.function.type,
+                nll.read_type('<e,<e,t>>'))
+
+    def testAlphaEquivalentTermsAreShared(self):
+        first = self.table.fromExpression(tlp.parse(r'\x. taube(x)'))
+        second = self.table.fromExpression(tlp.parse(r'\y. taube(y)'))
+        self.assertEqual(first, second)
+        third = self.table.fromExpression(tlp.parse(r'\y. taube(x)'))
+        self.assertNotEqual(first, third)
+
+    def testDeepExpression(self):
+        depth = sys.getrecursionlimit() * 3
+        expr = tlp.parse('laufen(peter)')
+        for _ in range(depth):
+            expr = nll.NegatedExpression(expr)
+        term = self.table.fromExpression(nll.ApplicationExpression(
+            tlp.parse(r'\P. P'), expr))
+        converted = self.table.toExpression(self.table.normalize(term))
+        for _ in range(depth):
+            self.assertIsInstance(converted, nll.NegatedExpression)
+            converted = converted.term
+        self.assertEqual(converted, tlp.parse('laufen(peter)'))
+
+    def testUnsupportedExpression(self):
+        expr = tlp.parse(r'iota x. taube(x)')
+        self.assertRaises(ValueError, self.table.fromExpression, expr)
+
+class Normalization(unittest.TestCase):
+
+    def setUp(self):
+        self.table = terms.TermTable()
+
+    def normalize(self, expr):
+        term = self.table.normalize(self.table.fromExpression(expr))
+        return self.table.toExpression(term)
+
+    def testLikeSimplify(self):
+        for semRep in [
+                r'(\P Q. exists x. (P(x) & Q(x)))(\x. taube(x))',
+                r'(\P. P(peter))(\x y. sehen(x, y))',
+                r'(\R x. exists y. (bein(y) & R(y, x)))(\y x. haben(x, y))',
+                r'\Q. ((\x. (P(x) & Q(x)))(peter))']:
+            expr = tlp.parse(semRep)
+            self.assertEqual(self.normalize(expr), expr.simplify(), semRep)
+
+    def testNoCapture(self):
+        expr = tlp.parse(r'(\x y. sehen(x, y))(y)')
+        normal = self.normalize(expr)
+        self.assertEqual(normal, expr.simplify())
+        self.assertNotEqual(normal.variable, nll.Variable('y'))
+
+    def testNormalFormsAreMemoized(self):
+        term = self.table.fromExpression(
+                tlp.parse(r'(\P. P(peter))(\x. laufen(x))'))
+        normal = self.table.normalize(term)
+        self.assertEqual(normal,
+                self.table.fromExpression(tlp.parse('laufen(peter)')))
+        self.assertEqual(self.table.normalize(normal), normal)
+
+if __name__ == '__main__':
+    global RULES
+    global TEST_DIR
+    pathToHere = inspect.getfile(inspect.currentframe())
+    pathToTop = os.path.dirname(os.path.dirname(pathToHere))
+    RULES = os.path.join(pathToTop, 'rules/heuristic_rules.json')
+    TEST_DIR = os.path.join(pathToTop, 'test/conll/')
+
+    unittest.main()